@@ -7,10 +7,29 @@ from datetime import datetime, timedelta
 from dateutil.parser import parse
 import io
 import json
+import time
+from functools import partial
 from utils.data_processor import DataProcessor
 from utils.kpi_calculator import KPICalculator
+from utils.chunked_kpi_engine import ChunkedKPIEngine
 from utils.chart_generator import ChartGenerator
-from utils.export_manager import ExportManager
+from utils.export_service import export_service, BACKGROUND_ROW_THRESHOLD
+from utils.export_manager import COLUMNAR_COMPRESSIONS
+from utils.figure_cache import figure_cache
+from utils.figure_serializer import figure_exporter
+from utils.report_builder import DashboardReportBuilder
+from utils.bundle_exporter import artifact_bundler
+from utils.data_loader import data_loader, UPLOAD_TYPES
+from utils.dataset_store import dataset_store, content_key
+from utils.aggregate_cube import cube_engine, CUBE_STATS
+from utils.anomaly_detector import anomaly_detector, OUTLIER_METHODS, METHOD_LABELS
+from utils.crosstab_engine import crosstab_engine, CROSSTAB_STATS
+from utils.preview_engine import preview_engine, DEFAULT_SAMPLE_ROWS, CONFIDENCE_LEVELS
+from utils.warmup_service import warmup_service
+from utils.cache_utils import dataset_fingerprint
+from utils.top_n_engine import top_n_engine
+from utils.filter_engine import filter_engine, range_filter, in_filter, date_window, prefix_filter
+from utils.execution_backend import BACKENDS, TIME_BUCKETS, available_backends, get_backend, check_parity, bucket_codes
 from utils.tracker import log_to_google_sheets
 from utils.help_guide import help_guide_page
 from welcome import show_lottie_welcome
@@ -65,6 +84,7 @@ def main():
             page="Sidebar",
             user_info=get_user_location(),
             notes="Session Cleared")
+            warmup_service.cancel(st.session_state.get("warmup_key"))
             st.session_state.clear()
             st.rerun()
     with st.sidebar:
@@ -110,6 +130,18 @@ def main():
         "</div>",
         unsafe_allow_html=True)
     
+def parse_date_columns(data):
+    """Convert text columns whose values look like dates (runs once, before the dataset is shared)"""
+    for col in data.columns:
+        if data[col].dtype == 'object' and data[col].notna().any():
+            sample_value = data[col].dropna().iloc[0]
+            if looks_like_date(sample_value):
+                try:
+                    data[col] = pd.to_datetime(data[col], errors='coerce')
+                except:
+                    pass
+    return data
+
 def data_upload_page():
     log_to_google_sheets(
     event="Page Viewed",
@@ -118,43 +150,87 @@ def data_upload_page():
     notes="Viewed Data Upload"
 )
     st.header("📁 Data Upload & Preview")
-    # File uploader
-    uploaded_file = st.file_uploader(
-        "Choose a CSV file",
-        type=['csv'],
-        help="Upload your CSV file to begin analysis. The file should contain structured data with column headers."
+    # File uploader (one file per region/day can be uploaded together)
+    uploaded_files = st.file_uploader(
+        "Choose one or more data files",
+        type=UPLOAD_TYPES,
+        accept_multiple_files=True,
+        help="Upload CSV (optionally .gz/.zst/.zip compressed), Parquet or Feather/Arrow files with column headers. "
+             "Several files are parsed in parallel and stacked, with a source_file column. "
+             "Parquet and Arrow load fastest."
     )
 
-    if uploaded_file is not None:
+    if uploaded_files:
         try:
-            # Read CSV file
-            data = pd.read_csv(uploaded_file)
+            sources = [(uploaded_file, uploaded_file.name) for uploaded_file in uploaded_files]
+            file_ids = tuple(uploaded_file.file_id for uploaded_file in uploaded_files)
+            
+            # Read only the schemas first so unused columns are never parsed
+            all_columns = data_loader.columns_many(sources)
+            selected_columns = st.multiselect(
+                "Columns to load",
+                all_columns,
+                default=all_columns,
+                key=f"load_columns_{hash(file_ids)}",
+                help="Deselect columns your dashboards do not need to load large files faster with less memory"
+            )
+            if not selected_columns:
+                st.warning("⚠️ Select at least one column to load.")
+                return
+            
+            def load_dataset():
+                if len(sources) == 1:
+                    return parse_date_columns(data_loader.load(*sources[0], columns=selected_columns))
+                data, timings = data_loader.load_many(sources, columns=selected_columns)
+                st.session_state.parse_timings = timings
+                return parse_date_columns(data)
+            
+            # Identical files (same content and columns) are parsed once and shared by every session
+            load_key = (file_ids, tuple(selected_columns))
+            handle = st.session_state.get("dataset_handle")
+            if handle is None or st.session_state.get("dataset_load_key") != load_key:
+                st.session_state.pop("parse_timings", None)
+                handle = dataset_store.acquire(
+                    content_key([uploaded_file for uploaded_file, _ in sources],
+                                [name for _, name in sources], selected_columns),
+                    load_dataset
+                )
+                # Replacing the handle releases this session's reference to the previous dataset
+                st.session_state.dataset_handle = handle
+                st.session_state.dataset_load_key = load_key
+            data = handle.data
+            new_dataset = st.session_state.data is not data
+            if new_dataset:
+                # Filters and the cube definition refer to the previous dataset's columns and values
+                st.session_state.row_filters = []
+                st.session_state.cube_spec = None
             st.session_state.data = data
-            for col in data.columns:
-                if data[col].dtype == 'object' and data[col].notna().any():
-                    sample_value = data[col].dropna().iloc[0]
-                    if looks_like_date(sample_value):
-                        try:
-                            data[col] = pd.to_datetime(data[col], errors='coerce')
-                        except:
-                            pass
             
             # Initialize data processor
             processor = DataProcessor(data)
             processed_info = processor.analyze_data()
             
-            date_cols = [col for col in data.columns if np.issubdtype(data[col].dtype, np.datetime64)]
+            date_cols = [col for col in data.columns if pd.api.types.is_datetime64_any_dtype(data[col])]
             processed_info['date_columns'] = date_cols
             
             st.session_state.processed_data = processed_info
             st.session_state.file_uploaded = True
+            if new_dataset:
+                # Precompute the first dashboard and chart work while the user looks at the preview
+                warmup_service.cancel(st.session_state.get("warmup_key"))
+                st.session_state.warmup_key = warmup_service.start(
+                    handle.key, warmup_steps(data, processed_info, handle.key), keep=("profile",)
+                )
             
-            st.success(f"✅ File uploaded successfully! Dataset contains {len(data)} rows and {len(data.columns)} columns.")
+            st.success(f"✅ {len(sources)} file(s) uploaded successfully! Dataset contains {len(data)} rows and {len(data.columns)} columns.")
+            if st.session_state.get("parse_timings") is not None:
+                with st.expander("⏱️ Per-file parse times", expanded=False):
+                    st.dataframe(st.session_state.parse_timings, use_container_width=True)
             log_to_google_sheets(
             event="File Uploaded",
             page="Data Upload",
             user_info=get_user_location(),
-            notes=uploaded_file.name)
+            notes=", ".join(name for _, name in sources))
             # Inside the uploaded_file block after reading and parsing
         except Exception as e:
             st.error(f"❌ Error reading file: {str(e)}")
@@ -180,29 +256,40 @@ def data_upload_page():
             
             # Column analysis
         st.subheader("🔍 Column Analysis")
+        warmup_key = st.session_state.get("warmup_key")
+        profile = warmup_service.result(warmup_key, "profile")
+        if profile is None and warmup_service.pending(warmup_key, "profile"):
+            # The background warm-up profiles first; show it as soon as it is ready
+            show_warmup_progress(warmup_key)
+            return
+        if profile is None:
+            profile = DataProcessor(data).profile()
+        warmup_status = warmup_service.status(warmup_key)
+        if warmup_status['state'] in ('queued', 'running'):
+            st.caption(f"🔥 Preparing dashboards in the background: {warmup_status['message']} "
+                       f"({warmup_status['progress']:.0%})")
             
         col1, col2 = st.columns(2)
             
         with col1:
             st.write("**Numeric Columns:**")
             for col in processed_info['numeric_columns']:
-                stats = data[col].describe()
-                st.write(f"• **{col}**: {stats['count']} values, Mean: {stats['mean']:.2f}")
+                count, mean = profile['numeric'][col]
+                st.write(f"• **{col}**: {count} values, Mean: {mean:.2f}")
             if processed_info['date_columns']:
                 st.write("**Date Columns:**")
                 for col in processed_info['date_columns']:
-                    min_date = data[col].min()
-                    max_date = data[col].max()
+                    min_date, max_date = profile['dates'][col]
                     st.write(f"• **{col}**: From {min_date.date()} to {max_date.date()}")                           
         with col2:
             st.write("**Text/Categorical Columns:**")
             for col in processed_info['text_columns']:
-                unique_count = data[col].nunique()
+                unique_count = profile['unique'][col]
                 st.write(f"• **{col}**: {unique_count} unique values")
             
             # Data quality check
         st.subheader("🔍 Data Quality")
-        missing_data = data.isnull().sum()
+        missing_data = profile['missing']
         if missing_data.sum() > 0:
             st.warning("⚠️ Missing values detected:")
             for col, missing_count in missing_data[missing_data > 0].items():
@@ -211,8 +298,8 @@ def data_upload_page():
             st.success("✅ No missing values detected!")
             
     else:
-        st.info("👆 Please upload a CSV file to get started.")
-        st.info("⚠️ This app does not save your uploaded files. If the connection drops or page refreshes, please re-upload your CSV.")
+        st.info("👆 Please upload a CSV, Parquet or Feather/Arrow file to get started.")
+        st.info("⚠️ This app does not save your uploaded files. If the connection drops or page refreshes, please re-upload your file.")
 
             
         
@@ -236,12 +323,32 @@ def kpi_dashboard_page():
     """)
 
     
-    data = st.session_state.data
     processed_info = st.session_state.processed_data
+    data = row_filter_section(st.session_state.data, processed_info, "kpi")
+    if data is None:
+        return
     
     # Initialize KPI calculator
-    kpi_calc = KPICalculator(data)
+    kpi_calc = get_kpi_calculator(data)
+    
+    # Each section is a fragment: its widgets rerun only that section, which gets the rows, the column
+    # profile and the calculator it depends on as arguments. Row filters and building a cube rerun the page.
+    aggregate_cube_section(st.session_state.data, processed_info)
+    kpi_section(data, processed_info, kpi_calc)
     
+    cube = active_cube()
+    if cube is not None:
+        cube_explorer_section(cube)
+    
+    crosstab_section(data, processed_info)
+    
+    anomaly_section(data, processed_info)
+    
+    custom_kpi_section(kpi_calc, processed_info)
+
+@st.fragment
+def kpi_section(data, processed_info, kpi_calc):
+    """KPI configuration, basic, advanced and grouped KPIs, and their exports"""
     # KPI Configuration
     with st.expander("⚙️ KPI Configuration", expanded=True):
         col1, col2 = st.columns(2)
@@ -265,8 +372,41 @@ def kpi_dashboard_page():
             )
     
     if selected_kpi_columns:
-        # Calculate KPIs
-        kpis = kpi_calc.calculate_basic_kpis(selected_kpi_columns)
+        date_col = processed_info['date_columns'][0] if processed_info['date_columns'] else None
+        cube_grouped = None
+        if grouping_column != "None":
+            cube_grouped = cube_grouped_kpis(selected_kpi_columns, grouping_column)
+        
+        # Calculate KPIs: directly, or in preview mode from a sample while a worker computes the exact values.
+        # Exact results are cached per rows and selection, so the warm-up after upload or a rerun reuses them
+        kpi_key = ("kpis", preview_key(data), tuple(selected_kpi_columns), grouping_column, date_col)
+        sample = preview_sample(data)
+        if sample is None:
+            results = preview_engine.compute(kpi_key, partial(
+                exact_kpi_results, kpi_calc, selected_kpi_columns, grouping_column, date_col, cube_grouped
+            ))
+        else:
+            exact_calc = KPICalculator(data, backend=get_backend(st.session_state.get("execution_backend")))
+            job_key = preview_engine.submit(kpi_key, partial(
+                exact_kpi_results, exact_calc, selected_kpi_columns, grouping_column, date_col, cube_grouped
+            ))
+            status = preview_engine.status(job_key)
+            results = status.get('data')
+            if results is None:
+                confidence = st.session_state.get("preview_confidence", 0.95)
+                st.caption(f"⚡ Preview: estimated from a {sample.rows:,}-row sample ({sample.fraction:.1%} of rows) "
+                           f"with {confidence:.0%} confidence intervals. Exact results replace them when ready.")
+                if status['state'] == 'running':
+                    show_exact_progress(job_key)
+                elif status['state'] == 'error':
+                    st.error(f"❌ Exact KPI calculation failed: {status['message']}")
+                    st.button("🔁 Retry exact calculation", key="retry_exact_kpis",
+                              on_click=preview_engine.retry, args=(job_key,))
+        
+        if results is not None:
+            kpis = results['kpis']
+        else:
+            kpis = sample.estimate_kpis(selected_kpi_columns, confidence)
         
         # Display KPIs in metrics
         st.subheader("📊 Key Performance Indicators")
@@ -275,16 +415,28 @@ def kpi_dashboard_page():
         cols = st.columns(len(selected_kpi_columns))
         for i, col in enumerate(selected_kpi_columns):
             with cols[i]:
-                st.metric(
-                    f"Total {col}",
-                    f"{kpis[col]['sum']:,.0f}",
-                    help=f"Sum of all values in {col}"
-                )
-                st.metric(
-                    f"Average {col}",
-                    f"{kpis[col]['mean']:,.2f}",
-                    help=f"Mean value of {col}"
-                )
+                if results is None:
+                    st.metric(
+                        f"Total {col}",
+                        f"≈ {kpis[col]['sum']:,.0f} ± {kpis[col]['sum_ci']:,.0f}",
+                        help=f"Sample estimate of the sum of {col}, with its {confidence:.0%} confidence interval"
+                    )
+                    st.metric(
+                        f"Average {col}",
+                        f"≈ {kpis[col]['mean']:,.2f} ± {kpis[col]['mean_ci']:,.2f}",
+                        help=f"Sample estimate of the mean of {col}, with its {confidence:.0%} confidence interval"
+                    )
+                else:
+                    st.metric(
+                        f"Total {col}",
+                        f"{kpis[col]['sum']:,.0f}",
+                        help=f"Sum of all values in {col}"
+                    )
+                    st.metric(
+                        f"Average {col}",
+                        f"{kpis[col]['mean']:,.2f}",
+                        help=f"Mean value of {col}"
+                    )
         
         # Additional KPIs
         st.subheader("📈 Advanced KPIs")
@@ -296,29 +448,39 @@ def kpi_dashboard_page():
         
         with col2:
             # Growth rate calculation if date column exists
-            if processed_info['date_columns']:
-                date_col = processed_info['date_columns'][0]
-                if len(selected_kpi_columns) > 0:
-                    growth_rate = kpi_calc.calculate_growth_rate(selected_kpi_columns[0], date_col)
-                    st.metric("Growth Rate", f"{growth_rate:.1f}%")
+            if date_col is not None:
+                if results is None:
+                    st.metric("Growth Rate", "…", help="Needs the first and last rows; computing on all rows")
+                else:
+                    st.metric("Growth Rate", f"{results['growth_rate']:.1f}%")
         
         with col3:
             # Data completeness
-            completeness = (1 - data.isnull().sum().sum() / (len(data) * len(data.columns))) * 100
-            st.metric("Data Completeness", f"{completeness:.1f}%")
+            if results is None:
+                st.metric("Data Completeness", f"≈ {sample.estimate_completeness():.1f}%")
+            else:
+                completeness = results['completeness']
+                st.metric("Data Completeness", f"{completeness:.1f}%")
         
         with col4:
             # Unique records ratio
-            unique_ratio = 100.0
-            if len(data.columns) > 0:
-                unique_ratio = len(data.drop_duplicates()) / len(data) * 100
+            if results is None:
+                st.metric("Unique Records", "…", help="Duplicates cannot be estimated from a sample; computing on all rows")
+            else:
+                unique_ratio = results['unique_ratio']
                 st.metric("Unique Records", f"{unique_ratio:.1f}%")
         
         # Grouped KPIs if grouping column is selected
         grouped_kpis = pd.DataFrame()
         if grouping_column != "None":
             st.subheader(f"📊 KPIs by {grouping_column}")
-            grouped_kpis = kpi_calc.calculate_grouped_kpis(selected_kpi_columns, grouping_column)
+            if results is None:
+                grouped_kpis = sample.estimate_grouped_kpis(selected_kpi_columns, grouping_column, confidence)
+                st.caption("⚡ Estimated sums and means with ± half-widths; groups missing from the sample are not shown.")
+            else:
+                grouped_kpis = results['grouped']
+                if cube_grouped is not None:
+                    st.caption("🧊 Answered from the aggregate cube.")
             
             # Display grouped KPIs as a table
             st.dataframe(grouped_kpis, use_container_width=True)
@@ -329,131 +491,14 @@ def kpi_dashboard_page():
                     grouped_kpis.reset_index(),
                     x=grouping_column,
                     y=f"{col}_sum",
+                    error_y=f"{col}_sum_ci" if results is None else None,
                     title=f"Total {col} by {grouping_column}"
                 )
                 st.plotly_chart(fig, use_container_width=True)
         
-        # Custom KPI Formula Section
-        st.subheader("🧮 Custom KPI Formula")
-        
-        with st.expander("Create Custom KPI", expanded=False):
-            # Quick templates
-            st.write("**Quick KPI Templates:**")
-            templates = {
-                "Growth Rate %": "((sum(col2) - sum(col1)) / sum(col1)) * 100",
-                "Average Ratio": "mean(col1) / mean(col2)",
-                "Profit Margin %": "((sum(revenue) - sum(costs)) / sum(revenue)) * 100",
-                "Efficiency Ratio": "sum(output) / sum(input)",
-                "Conversion Rate %": "(sum(conversions) / sum(total)) * 100"
-            }
-            
-            template_cols = st.columns(len(templates))
-            for i, (name, formula) in enumerate(templates.items()):
-                with template_cols[i]:
-                    if st.button(f"📋 {name}", key=f"template_{i}"):
-                        st.session_state.template_formula = formula
-                        st.session_state.template_name = name
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.write("**Build your custom KPI formula:**")
-                
-                # Show available functions
-                functions_info = kpi_calc.get_available_functions()
-                
-                st.write("**Available Functions:**")
-                st.write(f"• **Math:** {', '.join(functions_info['Mathematical'])}")
-                st.write(f"• **Operators:** {', '.join(functions_info['Operators'])}")
-                
-                # Column mapping
-                st.write("**Map your columns to simple names:**")
-                column_mapping = {}
-                available_cols = processed_info['numeric_columns'] + processed_info['text_columns']
-                
-                num_mappings = st.number_input("Number of columns to use:", min_value=1, max_value=5, value=2)
-                
-                for i in range(num_mappings):
-                    col_map1, col_map2 = st.columns(2)
-                    with col_map1:
-                        alias = st.text_input(f"Simple name {i+1}:", value=f"col{i+1}", key=f"alias_{i}")
-                    with col_map2:
-                        column = st.selectbox(f"Maps to column:", available_cols, key=f"column_{i}")
-                    
-                    if alias and column:
-                        column_mapping[alias] = column
-                
-                # Formula input
-                default_formula = "sum(col1) / sum(col2) * 100"
-                default_name = "Custom Ratio"
-                
-                # Use template if selected
-                if hasattr(st.session_state, 'template_formula'):
-                    default_formula = st.session_state.template_formula
-                    default_name = st.session_state.template_name
-                
-                formula = st.text_area(
-                    "Enter your formula:",
-                    value=default_formula,
-                    help="Use the simple names you defined above. Example: sum(sales) / count(sales)"
-                )
-                
-                kpi_name = st.text_input("KPI Name:", value=default_name)
-                
-                # Formula validation
-                if st.button("🔍 Validate Formula", key="validate_formula"):
-                    if formula and column_mapping:
-                        try:
-                            # Test the formula without executing it fully
-                            test_result = kpi_calc.calculate_custom_kpi(formula, column_mapping)
-                            if test_result.get('type') == 'error':
-                                st.error(f"❌ Formula Error: {test_result['error']}")
-                            else:
-                                st.success("✅ Formula is valid!")
-                                st.info(f"Expected result type: {test_result.get('type', 'unknown')}")
-                        except Exception as e:
-                            st.error(f"❌ Validation Error: {str(e)}")
-                    else:
-                        st.warning("⚠️ Please enter a formula and map columns first.")
-            
-            with col2:
-                st.write("**Formula Examples:**")
-                for example in functions_info['Examples']:
-                    st.code(example, language='python')
-            
-            if st.button("🚀 Calculate Custom KPI", type="primary"):
-                if formula and column_mapping:
-                    result = kpi_calc.calculate_custom_kpi(formula, column_mapping)
-                    
-                    if result.get('type') == 'error':
-                        st.error(f"❌ Formula Error: {result['error']}")
-                    else:
-                        st.success("✅ Custom KPI calculated successfully!")
-                        
-                        # Display result
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.metric(
-                                kpi_name,
-                                f"{result['value']:,.2f}",
-                                help=f"Formula: {formula}"
-                            )
-                        
-                        if result.get('type') == 'series':
-                            with col2:
-                                st.metric("Total", f"{result['sum']:,.2f}")
-                            with col3:
-                                st.metric("Count", f"{result['count']:,}")
-                        
-                        # Show formula breakdown
-                        st.write("**Formula Details:**")
-                        st.code(f"Formula: {formula}")
-                        st.write("**Column Mapping:**")
-                        for alias, col in column_mapping.items():
-                            st.write(f"• {alias} → {col}")
-                else:
-                    st.warning("⚠️ Please enter a formula and map at least one column.")
+        if results is None:
+            st.info("💾 Exports and the dashboard report use exact KPIs; they appear when the exact results are ready.")
+            return
         
         # Export KPIs
         st.subheader("💾 Export KPIs")
@@ -468,58 +513,632 @@ def kpi_dashboard_page():
             }
         }
         
-        if grouping_column != "None":
-            export_data["grouped_kpis"] = grouped_kpis.to_dict()
+        # Exports are built only when a download is requested and cached per KPI result;
+        # the JSON builder adds grouped KPIs itself
+        grouped_for_export = grouped_kpis if grouping_column != "None" else None
+        export_args = (kpis, grouped_for_export, export_data)
+        run_in_background = grouped_for_export is not None and len(grouped_for_export) >= BACKGROUND_ROW_THRESHOLD
+        file_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        # Initialize export manager
-        export_manager = ExportManager()
+        kpi_exports = [
+            ("json", "📄 Download JSON", f"kpi_report_{file_stamp}.json", "application/json"),
+            ("excel", "📊 Download Excel", f"kpi_report_{file_stamp}.xlsx",
+             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            ("pdf", "📋 Download PDF", f"kpi_report_{file_stamp}.pdf", "application/pdf"),
+            ("parquet", "🧱 Download Parquet", f"kpi_report_{file_stamp}.parquet", "application/vnd.apache.parquet"),
+            ("arrow", "🏹 Download Arrow", f"kpi_report_{file_stamp}.arrow", "application/vnd.apache.arrow.file")
+        ]
+        # Columnar formats take the codec chosen in Settings
+        columnar_options = {"compression": st.session_state.get("columnar_compression", "zstd")}
         
         # Create download columns
-        col1, col2, col3 = st.columns(3)
+        for column, (export_format, label, file_name, mime) in zip(st.columns(len(kpi_exports)), kpi_exports):
+            options = columnar_options if export_format in ("parquet", "arrow") else {}
+            with column:
+                if run_in_background:
+                    kpi_background_export(export_format, label, file_name, mime, export_args, options)
+                else:
+                    st.download_button(
+                        label=label,
+                        data=export_service.deferred(export_format, *export_args, **options),
+                        file_name=file_name,
+                        mime=mime,
+                        on_click="ignore"
+                    )
+        
+        st.button(
+            "➕ Add KPIs to Dashboard Report",
+            key="report_add_kpis",
+            on_click=add_to_report,
+            args=({'kind': 'kpi', 'title': "KPIs" if grouping_column == "None" else f"KPIs by {grouping_column}",
+                   'args': export_args},)
+        )
+
+@st.fragment
+def custom_kpi_section(kpi_calc, processed_info):
+    """Formula builder; typing a formula or picking a template reruns only this section"""
+    # Custom KPI Formula Section
+    st.subheader("🧮 Custom KPI Formula")
+    
+    with st.expander("Create Custom KPI", expanded=False):
+        # Quick templates
+        st.write("**Quick KPI Templates:**")
+        templates = {
+            "Growth Rate %": "((sum(col2) - sum(col1)) / sum(col1)) * 100",
+            "Average Ratio": "mean(col1) / mean(col2)",
+            "Profit Margin %": "((sum(revenue) - sum(costs)) / sum(revenue)) * 100",
+            "Efficiency Ratio": "sum(output) / sum(input)",
+            "Conversion Rate %": "(sum(conversions) / sum(total)) * 100"
+        }
+        
+        template_cols = st.columns(len(templates))
+        for i, (name, formula) in enumerate(templates.items()):
+            with template_cols[i]:
+                if st.button(f"📋 {name}", key=f"template_{i}"):
+                    st.session_state.template_formula = formula
+                    st.session_state.template_name = name
+        
+        col1, col2 = st.columns([2, 1])
         
         with col1:
-            # JSON Export
-            kpi_json = json.dumps(export_data, indent=2, default=str)
-            st.download_button(
-                label="📄 Download JSON",
-                data=kpi_json,
-                file_name=f"kpi_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
+            st.write("**Build your custom KPI formula:**")
+            
+            # Show available functions
+            functions_info = kpi_calc.get_available_functions()
+            
+            st.write("**Available Functions:**")
+            st.write(f"• **Math:** {', '.join(functions_info['Mathematical'])}")
+            st.write(f"• **Operators:** {', '.join(functions_info['Operators'])}")
+            
+            # Column mapping
+            st.write("**Map your columns to simple names:**")
+            column_mapping = {}
+            available_cols = processed_info['numeric_columns'] + processed_info['text_columns']
+            
+            num_mappings = st.number_input("Number of columns to use:", min_value=1, max_value=5, value=2)
+            
+            for i in range(num_mappings):
+                col_map1, col_map2 = st.columns(2)
+                with col_map1:
+                    alias = st.text_input(f"Simple name {i+1}:", value=f"col{i+1}", key=f"alias_{i}")
+                with col_map2:
+                    column = st.selectbox(f"Maps to column:", available_cols, key=f"column_{i}")
+                
+                if alias and column:
+                    column_mapping[alias] = column
+            
+            # Formula input
+            default_formula = "sum(col1) / sum(col2) * 100"
+            default_name = "Custom Ratio"
+            
+            # Use template if selected
+            if hasattr(st.session_state, 'template_formula'):
+                default_formula = st.session_state.template_formula
+                default_name = st.session_state.template_name
+            
+            formula = st.text_area(
+                "Enter your formula:",
+                value=default_formula,
+                help="Use the simple names you defined above. Example: sum(sales) / count(sales)"
             )
+            
+            kpi_name = st.text_input("KPI Name:", value=default_name)
+            
+            # Formula validation
+            if st.button("🔍 Validate Formula", key="validate_formula"):
+                if formula and column_mapping:
+                    try:
+                        # Test the formula without executing it fully
+                        test_result = kpi_calc.calculate_custom_kpi(formula, column_mapping)
+                        if test_result.get('type') == 'error':
+                            st.error(f"❌ Formula Error: {test_result['error']}")
+                        else:
+                            st.success("✅ Formula is valid!")
+                            st.info(f"Expected result type: {test_result.get('type', 'unknown')}")
+                    except Exception as e:
+                        st.error(f"❌ Validation Error: {str(e)}")
+                else:
+                    st.warning("⚠️ Please enter a formula and map columns first.")
         
         with col2:
-            # Excel Export
-            try:
-                excel_data = export_manager.create_kpi_excel(
-                    kpis, 
-                    grouped_kpis if grouping_column != "None" else None, 
-                    export_data
-                )
-                st.download_button(
-                    label="📊 Download Excel",
-                    data=excel_data,
-                    file_name=f"kpi_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            except Exception as e:
-                st.error(f"Excel export error: {str(e)}")
+            st.write("**Formula Examples:**")
+            for example in functions_info['Examples']:
+                st.code(example, language='python')
+        
+        if st.button("🚀 Calculate Custom KPI", type="primary"):
+            if formula and column_mapping:
+                result = kpi_calc.calculate_custom_kpi(formula, column_mapping)
+                
+                if result.get('type') == 'error':
+                    st.error(f"❌ Formula Error: {result['error']}")
+                else:
+                    st.success("✅ Custom KPI calculated successfully!")
+                    
+                    # Display result
+                    col1, col2, col3 = st.columns(3)
+                    
+                    with col1:
+                        st.metric(
+                            kpi_name,
+                            f"{result['value']:,.2f}",
+                            help=f"Formula: {formula}"
+                        )
+                    
+                    if result.get('type') == 'series':
+                        with col2:
+                            st.metric("Total", f"{result['sum']:,.2f}")
+                        with col3:
+                            st.metric("Count", f"{result['count']:,}")
+                    
+                    # Show formula breakdown
+                    st.write("**Formula Details:**")
+                    st.code(f"Formula: {formula}")
+                    st.write("**Column Mapping:**")
+                    for alias, col in column_mapping.items():
+                        st.write(f"• {alias} → {col}")
+            else:
+                st.warning("⚠️ Please enter a formula and map at least one column.")
+
+def exact_kpi_results(kpi_calc, kpi_columns, grouping_column, date_column=None, grouped_kpis=None):
+    """Basic, advanced and grouped KPIs over every row (run in a worker thread in preview mode)"""
+    results = {
+        'kpis': kpi_calc.calculate_basic_kpis(kpi_columns),
+        'growth_rate': kpi_calc.calculate_growth_rate(kpi_columns[0], date_column) if date_column else None,
+        'grouped': pd.DataFrame()
+    }
+    # Streamed in chunks by the out-of-core engine, like the KPIs themselves
+    results.update(kpi_calc.calculate_data_quality())
+    if grouping_column != "None":
+        if grouped_kpis is None:
+            grouped_kpis = kpi_calc.calculate_grouped_kpis(kpi_columns, grouping_column)
+        results['grouped'] = grouped_kpis
+    return results
+
+# Text columns with at most this many distinct values are likely group-by and filter columns
+WARMUP_MAX_CATEGORIES = 1000
+
+def warmup_steps(data, processed_info, key):
+    """Work the first dashboard and chart views are likely to need, as [(name, label, fn)] in the order to run it"""
+    numeric_cols = processed_info['numeric_columns']
+    text_cols = processed_info['text_columns']
+    date_cols = processed_info['date_columns']
+    backend = get_backend(st.session_state.get("execution_backend"))
+    steps = [("profile", "Profiling columns", DataProcessor(data).profile)]
+    if numeric_cols:
+        # The KPI dashboard opens on the first three numeric columns, ungrouped
+        kpi_columns = numeric_cols[:3]
+        date_col = date_cols[0] if date_cols else None
+        steps.append(("kpis", "Default KPIs", partial(
+            preview_engine.compute, ("kpis", key, tuple(kpi_columns), "None", date_col),
+            partial(exact_kpi_results, KPICalculator(data, backend=backend), kpi_columns, "None", date_col)
+        )))
+    # Every cached index below is keyed by the content fingerprint
+    steps.append(("fingerprint", "Fingerprinting the dataset", partial(dataset_fingerprint, data)))
+    steps.append(("groups", "Indexing categories", partial(warm_group_indexes, data, key, text_cols)))
+    if numeric_cols:
+        # Default Top-N chart: first category column against the first numeric column
+        steps.append(("top_n", "Top-N aggregate", partial(
+            top_n_engine.aggregate, data, (text_cols + numeric_cols)[0], numeric_cols[0], backend=backend
+        )))
+    for col in date_cols:
+        steps.append((f"month_{col}", f"Monthly buckets of {col}", partial(bucket_codes, data, col, "month")))
+    return steps
+
+def warm_group_indexes(data, key, text_columns):
+    """Category codes of the low-cardinality text columns (row filters, groupings)"""
+    unique = (warmup_service.result(key, "profile") or {}).get("unique", {})
+    for col in text_columns:
+        if unique.get(col, WARMUP_MAX_CATEGORIES + 1) <= WARMUP_MAX_CATEGORIES:
+            filter_engine.category_index(data, col)
+
+@st.fragment(run_every=1)
+def show_warmup_progress(key):
+    if warmup_service.pending(key, "profile"):
+        status = warmup_service.status(key)
+        st.progress(status['progress'], text=f"🔥 {status['message']}...")
+    else:
+        # Profile ready (or the warm-up was cancelled): rerun the page to show it
+        st.rerun()
+
+def preview_key(data):
+    """Identity of the rows on screen: the dataset's content key plus the active row filters"""
+    key = st.session_state.dataset_handle.key
+    if data is st.session_state.data:
+        return key
+    return (key, frozenset(st.session_state.get("row_filters", [])))
+
+def preview_sample(data):
+    """Cached sample of data in fast-preview mode, or None (mode off, or data no larger than the sample)"""
+    rows = st.session_state.get("preview_rows", DEFAULT_SAMPLE_ROWS)
+    if not st.session_state.get("preview_mode") or len(data) <= rows:
+        return None
+    strata = st.session_state.get("preview_strata")
+    try:
+        return preview_engine.sample(data, preview_key(data), rows, strata if strata in data.columns else None)
+    except ValueError as e:
+        st.warning(f"⚠️ {e}; using a uniform sample instead.")
+        return preview_engine.sample(data, preview_key(data), rows)
+
+@st.fragment(run_every=1)
+def show_exact_progress(job_key):
+    status = preview_engine.status(job_key)
+    if status['state'] == 'running':
+        st.caption(f"⏳ {status['message']}")
+    else:
+        # Finished or failed: rerun the page so the exact values (or the error) replace the estimates
+        st.rerun()
+
+def active_cube(data=None):
+    """The session's aggregate cube, if one was built (for data, when given, which must be the full dataset)"""
+    spec = st.session_state.get("cube_spec")
+    full_data = st.session_state.get("data")
+    if not spec or full_data is None or (data is not None and data is not full_data):
+        return None
+    return cube_engine.get(full_data, **spec)
+
+def cube_grouped_kpis(kpi_columns, group_column):
+    """Grouped KPIs from the aggregate cube when it covers them (and the active row filters), else None"""
+    cube = active_cube()
+    if cube is None:
+        return None
+    selections = cube.selections_from_filters(st.session_state.get("row_filters", []))
+    if selections is None or not cube.can_answer([group_column], kpi_columns, selections):
+        return None
+    return cube.grouped_kpis(kpi_columns, group_column, selections)
+
+@st.fragment
+def aggregate_cube_section(data, processed_info):
+    """Define and build the optional aggregate cube; it is built once and shared by every session"""
+    with st.expander("🧊 Aggregate Cube (instant drill-down)", expanded=False):
+        st.caption("Pre-aggregates sum, count, min, max and variance for every combination of the chosen "
+                   "dimensions, so grouping, drill-down and cross-filtering no longer rescan the rows.")
+        spec = st.session_state.get("cube_spec") or {}
+        numeric_cols = processed_info['numeric_columns']
+        dimension_cols = processed_info['text_columns']
+        date_cols = processed_info.get('date_columns', [])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            dimensions = st.multiselect(
+                "Dimensions:", dimension_cols,
+                default=[col for col in spec.get('dimensions', []) if col in dimension_cols],
+                key="cube_dimensions"
+            )
+            measures = st.multiselect(
+                "Measures:", numeric_cols,
+                default=[col for col in spec.get('measures', []) if col in numeric_cols] or numeric_cols[:3],
+                key="cube_measures"
+            )
+        with col2:
+            time_column = st.selectbox("Time dimension:", ["None"] + date_cols, key="cube_time_column")
+            time_bucket = st.selectbox("Time bucket:", list(TIME_BUCKETS), index=list(TIME_BUCKETS).index("month"),
+                                       key="cube_time_bucket", disabled=time_column == "None")
+        
+        new_spec = {
+            'dimensions': dimensions,
+            'measures': measures,
+            'time_column': None if time_column == "None" else time_column,
+            'time_bucket': time_bucket
+        }
+        can_build = bool(measures) and (bool(dimensions) or new_spec['time_column'] is not None)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🧊 Build cube", key="cube_build", disabled=not can_build):
+                with st.spinner("Aggregating every dimension combination..."):
+                    cube_engine.build(data, **new_spec)
+                st.session_state.cube_spec = new_spec
+                # Grouped KPIs, the explorer and charts elsewhere on the page now answer from the cube
+                st.rerun()
+        
+        cube = active_cube()
+        if cube is not None:
+            with col2:
+                if st.button("🗑️ Drop cube", key="cube_drop"):
+                    st.session_state.cube_spec = None
+                    st.rerun()
+            st.success(f"✅ Cube ready: {cube.n_cells:,} cells from {len(data):,} rows "
+                       f"({cube.nbytes / 1024 ** 2:.1f} MB, built in {cube.build_seconds:.1f}s)")
+
+@st.fragment
+def cube_explorer_section(cube):
+    """Drill-down and cross-filtering answered from the cube's cells"""
+    st.subheader("🧊 Cube Explorer")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        measure = st.selectbox("Measure:", cube.measures, key="cube_measure")
+    with col2:
+        stat = st.selectbox("Statistic:", CUBE_STATS, key="cube_stat")
+    with col3:
+        drill_path = st.multiselect("Drill-down path:", cube.dimensions, default=cube.dimensions[:1],
+                                    key="cube_drill_path")
+    
+    # Selecting values in one dimension filters every other dimension's totals
+    selections = {}
+    select_cols = st.columns(len(cube.dimensions))
+    for i, dim in enumerate(cube.dimensions):
+        with select_cols[i]:
+            chosen = st.multiselect(f"{dim}:", list(cube.labels[dim][:1000]), key=f"cube_select_{dim}")
+            if chosen:
+                selections[dim] = chosen
+    
+    started = time.perf_counter()
+    table = cube.query(drill_path, [measure], selections, stats=(stat,))
+    totals = cube.cross_filter(measure, selections, stat)
+    elapsed = time.perf_counter() - started
+    st.caption(f"⚡ Answered from {cube.n_cells:,} cells in {elapsed * 1000:.1f} ms")
+    
+    st.dataframe(table, use_container_width=True)
+    chart_cols = st.columns(min(len(totals), 3))
+    for i, (dim, values) in enumerate(totals.items()):
+        with chart_cols[i % len(chart_cols)]:
+            # Largest 30 members keep the bars readable on high-cardinality dimensions
+            shown = values.nlargest(30) if len(values) > 30 else values
+            fig = px.bar(x=shown.index.astype(str), y=shown.to_numpy(), labels={'x': dim, 'y': f"{measure} ({stat})"},
+                         title=f"{measure} ({stat}) by {dim}")
+            st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def crosstab_section(data, processed_info):
+    """Two-dimension KPI cross-tab; only the visible page of the sparse table is densified"""
+    with st.expander("🔀 Cross-Tab KPIs", expanded=False):
+        # Dimensions are text, categorical and date columns; IDs and measures would make one cell per row
+        dimension_cols = list(dict.fromkeys(processed_info['text_columns'] + processed_info.get('date_columns', [])))
+        if len(dimension_cols) < 2:
+            st.info("Cross-tabs need at least two text, categorical or date columns.")
+            return
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            row_col = st.selectbox("Rows:", dimension_cols, key="crosstab_rows")
+        with col2:
+            column_col = st.selectbox("Columns:", [col for col in dimension_cols if col != row_col],
+                                      key="crosstab_columns")
+        with col3:
+            value_col = st.selectbox("Value:", ["(row count)"] + processed_info['numeric_columns'], key="crosstab_value")
+            value_col = None if value_col == "(row count)" else value_col
+        with col4:
+            stat = st.selectbox("Statistic:", CROSSTAB_STATS if value_col else ["count"], key="crosstab_stat")
         
+        # Built only on request, and kept for the rows and dimensions it was built for
+        spec = (preview_key(data), row_col, column_col, value_col)
+        if st.button("🔀 Build cross-tab", key="crosstab_build"):
+            with st.spinner("Aggregating populated cells..."):
+                st.session_state.crosstab_table = (spec, crosstab_engine.crosstab(data, row_col, column_col, value_col))
+        built = st.session_state.get("crosstab_table")
+        if built is None or built[0] != spec:
+            st.caption("Pick two dimensions and press Build to compute the cross-tab.")
+            return
+        table = built[1]
+        st.caption(f"{table.nnz:,} populated cells of {table.n_rows:,} × {table.n_columns:,} "
+                   f"({table.density:.2%} dense, {table.nbytes / 1024 ** 2:.1f} MB)")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            top_rows = st.number_input("Top rows:", min_value=1, max_value=max(table.n_rows, 1),
+                                       value=min(100, max(table.n_rows, 1)), key="crosstab_top_rows")
+        with col2:
+            top_columns = st.number_input("Top columns:", min_value=1, max_value=max(table.n_columns, 1),
+                                          value=min(20, max(table.n_columns, 1)), key="crosstab_top_columns")
+        rows = table.top_rows(int(top_rows), stat)
+        columns = table.top_columns(int(top_columns), stat)
+        page_size = 25
+        pages = max((len(rows) + page_size - 1) // page_size, 1)
         with col3:
-            # PDF Export
-            try:
-                pdf_data = export_manager.create_kpi_pdf(
-                    kpis, 
-                    grouped_kpis if grouping_column != "None" else None, 
-                    export_data
-                )
-                st.download_button(
-                    label="📋 Download PDF",
-                    data=pdf_data,
-                    file_name=f"kpi_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
-            except Exception as e:
-                st.error(f"PDF export error: {str(e)}")
+            page = st.number_input("Page:", min_value=1, max_value=pages, value=1, key="crosstab_page")
+        with col4:
+            fill_zero = st.checkbox("Show empty cells as 0", value=stat != "mean", key="crosstab_fill")
+        
+        visible_rows = rows[(page - 1) * page_size:page * page_size]
+        window = table.window(visible_rows, columns, stat, fill_value=0 if fill_zero else np.nan)
+        st.dataframe(window, use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="📥 Download visible window (CSV)",
+                data=window.to_csv().encode('utf-8'),
+                file_name=f"crosstab_{row_col}_by_{column_col}_page{page}.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+        with col2:
+            # Long form: one line per populated cell instead of the full rows × columns grid
+            st.download_button(
+                label="📥 Download all populated cells (CSV)",
+                data=lambda: table.to_long().to_csv(index=False).encode('utf-8'),
+                file_name=f"crosstab_{row_col}_by_{column_col}_cells.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+
+@st.fragment
+def anomaly_section(data, processed_info):
+    """Outlier KPIs for every numeric column at once, with the flagged rows highlighted"""
+    with st.expander("🚨 Anomaly KPIs", expanded=False):
+        numeric_cols = processed_info['numeric_columns']
+        col1, col2 = st.columns(2)
+        with col1:
+            anomaly_cols = st.multiselect("Columns to scan:", numeric_cols, default=numeric_cols, key="anomaly_columns")
+        with col2:
+            group_col = st.selectbox("Per group (optional):", ["None"] + processed_info['text_columns'],
+                                     key="anomaly_group")
+            group_col = None if group_col == "None" else group_col
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            z_threshold = st.number_input("Z-score threshold:", min_value=1.0, max_value=10.0, value=3.0, step=0.5,
+                                          key="anomaly_z")
+        with col2:
+            iqr_factor = st.number_input("IQR factor:", min_value=0.5, max_value=10.0, value=1.5, step=0.5,
+                                         key="anomaly_iqr")
+        with col3:
+            mad_threshold = st.number_input("Robust z (MAD) threshold:", min_value=1.0, max_value=10.0, value=3.5,
+                                            step=0.5, key="anomaly_mad")
+        if not anomaly_cols:
+            return
+        
+        # Scanned only on request, and kept for the rows and settings it was run with
+        spec = (preview_key(data), tuple(anomaly_cols), group_col, z_threshold, iqr_factor, mad_threshold)
+        if st.button("🔍 Scan for outliers", key="anomaly_scan"):
+            with st.spinner("Scanning every column..."):
+                st.session_state.anomaly_result = (spec, anomaly_detector.detect(
+                    data, anomaly_cols, group_col, z_threshold, iqr_factor, mad_threshold
+                ))
+        scanned = st.session_state.get("anomaly_result")
+        if scanned is None or scanned[0] != spec:
+            st.caption("Choose columns and thresholds, then press Scan to find outliers.")
+            return
+        result = scanned[1]
+        
+        summary = result.column_summary()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Flagged cells", f"{len(result.rows):,}")
+        with col2:
+            st.metric("Rows with an outlier", f"{len(result.flagged_positions()):,}")
+        with col3:
+            st.metric("Columns with outliers", f"{int((summary['Any method'] > 0).sum())} of {len(anomaly_cols)}")
+        
+        findings = result.findings()
+        if findings.empty:
+            st.success("✅ No outliers found with these thresholds.")
+            return
+        st.write("**Ranked findings:**")
+        st.dataframe(findings.head(100), use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            highlight_col = st.selectbox("Highlight column:", list(summary.index), key="anomaly_highlight")
+        with col2:
+            method = st.selectbox("Method:", OUTLIER_METHODS, format_func=lambda m: METHOD_LABELS[m],
+                                  key="anomaly_method")
+        positions = result.outlier_positions(highlight_col, method)
+        fig = get_chart_generator(data).create_outlier_chart(highlight_col, positions, data,
+                                                            method_label=METHOD_LABELS[method])
+        st.plotly_chart(fig, use_container_width=True)
+        st.download_button(
+            label="📥 Download outlier rows (CSV)",
+            data=lambda: data.take(np.sort(positions)).to_csv().encode('utf-8'),
+            file_name=f"outliers_{highlight_col}_{method}.csv",
+            mime="text/csv",
+            on_click="ignore"
+        )
+
+def remove_row_filter(row_filter):
+    st.session_state.row_filters = [f for f in st.session_state.row_filters if f != row_filter]
+
+def row_filter_section(data, processed_info, key_prefix):
+    """Row filter panel shared by the KPI dashboard and the chart generator; returns the filtered rows, or None if none match"""
+    filters = st.session_state.setdefault("row_filters", [])
+    row_filter_editor(data, processed_info, key_prefix)
+    
+    # Masks are cached per filter and the filtered rows per filter set, so reruns do not rescan
+    view = filter_engine.apply(data, filters)
+    if filters:
+        st.caption(f"🔎 Showing {len(view):,} of {len(data):,} rows ({len(filters)} filters)")
+    if len(view) == 0:
+        st.warning("⚠️ No rows match the active filters. Remove or relax a filter to see results.")
+        return None
+    return view
+
+@st.fragment
+def row_filter_editor(data, processed_info, key_prefix):
+    """Composing a filter reruns only this panel; adding or removing one reruns the page"""
+    filters = st.session_state.row_filters
+    title = f"🔎 Row Filters ({len(filters)} active)" if filters else "🔎 Row Filters"
+    with st.expander(title, expanded=False):
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            column = st.selectbox("Filter column:", list(data.columns), key=f"{key_prefix}_filter_column")
+        
+        new_filter = None
+        with col2:
+            if column in processed_info.get("date_columns", []):
+                bounds = filter_engine.bounds(data, column)
+                if bounds is not None:
+                    first, last = bounds[0].date(), bounds[1].date()
+                    window = st.date_input("Date window:", (first, last), min_value=first, max_value=last,
+                                           key=f"{key_prefix}_filter_dates")
+                    if isinstance(window, (list, tuple)) and len(window) == 2:
+                        # Whole days: the end date is included
+                        new_filter = date_window(column, window[0], window[1] + timedelta(days=1))
+            elif column in processed_info["numeric_columns"]:
+                bounds = filter_engine.bounds(data, column)
+                if bounds is not None and bounds[0] < bounds[1]:
+                    low, high = st.slider("Keep values between:", bounds[0], bounds[1], bounds,
+                                          key=f"{key_prefix}_filter_range_{column}")
+                    new_filter = range_filter(column, low, high)
+            else:
+                match = st.radio("Match:", ["Values", "Prefix"], horizontal=True, key=f"{key_prefix}_filter_match")
+                if match == "Values":
+                    # Most frequent values first; long tails are better served by a prefix
+                    chosen = st.multiselect("Keep rows where the value is one of:",
+                                            filter_engine.categories(data, column)[:1000],
+                                            key=f"{key_prefix}_filter_values_{column}")
+                    if chosen:
+                        new_filter = in_filter(column, chosen)
+                else:
+                    prefix = st.text_input("Keep rows starting with:", key=f"{key_prefix}_filter_prefix")
+                    if prefix:
+                        new_filter = prefix_filter(column, prefix)
+        
+        if st.button("➕ Add filter", key=f"{key_prefix}_filter_add", disabled=new_filter is None):
+            if new_filter not in filters:
+                st.session_state.row_filters = filters + [new_filter]
+            st.rerun()
+        
+        for i, row_filter in enumerate(filters):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.write(f"• {row_filter.describe()}")
+            with col2:
+                if st.button("✖️ Remove", key=f"{key_prefix}_filter_remove_{i}"):
+                    remove_row_filter(row_filter)
+                    st.rerun()
+
+def get_kpi_calculator(data):
+    """In-memory KPICalculator, or a chunked engine over the cached dataset file in out-of-core mode"""
+    handle = st.session_state.get("dataset_handle")
+    if st.session_state.get("kpi_engine_mode") == "Out-of-core (streamed)" and data is not st.session_state.data:
+        st.caption("ℹ️ Row filters are active; using in-memory KPIs over the filtered rows.")
+    elif st.session_state.get("kpi_engine_mode") == "Out-of-core (streamed)" and handle is not None:
+        path = dataset_store.path(handle.key)
+        if path is not None:
+            progress = st.empty()
+            
+            def show_progress(fraction, message):
+                progress.progress(fraction, text=message)
+            
+            st.caption("🧊 Out-of-core mode: KPIs are streamed from the cached dataset file in chunks "
+                       "(the dataset itself stays loaded for the other pages).")
+            return ChunkedKPIEngine(path, progress_callback=show_progress)
+        st.caption("ℹ️ Dataset is not cached on disk; using in-memory KPIs.")
+    return KPICalculator(data, backend=get_backend(st.session_state.get("execution_backend")))
+
+def kpi_background_export(export_format, label, file_name, mime, export_args, options=None):
+    """Prepare a large KPI export in a worker thread and offer it once it is ready"""
+    options = options or {}
+    job_key = export_service.make_key(export_format, *export_args, **options)
+    status = export_service.status(job_key)
+    
+    if status['state'] == 'done':
+        st.download_button(label=label, data=status['data'], file_name=file_name, mime=mime, on_click="ignore")
+    elif status['state'] == 'running':
+        show_export_progress(job_key)
+    else:
+        if status['state'] == 'error':
+            st.error(f"{export_format.upper()} export error: {status['message']}")
+        if st.button(f"⚙️ Prepare {export_format.upper()}", key=f"prepare_{export_format}"):
+            export_service.submit(export_format, *export_args, **options)
+            # Only the KPI section shows export progress
+            st.rerun(scope="fragment")
+
+@st.fragment(run_every=1)
+def show_export_progress(job_key):
+    status = export_service.status(job_key)
+    if status['state'] == 'running':
+        st.progress(status['progress'], text=status['message'])
+    else:
+        # Finished or failed: rerun the page so the download button (or error) replaces the progress bar
+        st.rerun()
 
 def chart_generator_page():
     log_to_google_sheets(
@@ -534,160 +1153,420 @@ def chart_generator_page():
 
     st.header("📊 Interactive Chart Generator")
 
-    data = st.session_state.data
     processed_info = st.session_state.processed_data
-    chart_gen = ChartGenerator(data)
+    data = row_filter_section(st.session_state.data, processed_info, "chart")
+    if data is None:
+        dashboard_report_section()
+        return
+    # Preview mode draws charts from a cached sample first; the exact chart is built in the background
+    sample = preview_sample(data)
+    chart_data = data if sample is None else sample.data
+    chart_gen = get_chart_generator(chart_data, None if sample is None else sample.scale)
+    if sample is not None:
+        st.caption(f"⚡ Preview: charts are drawn from a {sample.rows:,}-row sample, with sums and counts scaled "
+                   f"to all {len(data):,} rows. The exact chart replaces it when ready.")
 
     chart_mode = st.radio("Select Chart Mode:", ["📊 Standard Charts", "🏆 Top N Charts"], horizontal=True)
 
+    # Each mode is a fragment: its widgets rerun only the chart section, not the filters or the report
     if chart_mode == "📊 Standard Charts":
-        st.subheader("📊 Standard Chart Configuration")
-        col1, col2 = st.columns(2)
+        standard_chart_section(data, chart_data, chart_gen, sample, processed_info)
+    else:
+        top_n_chart_section(data, chart_data, chart_gen, sample, processed_info)
 
-        with col1:
-            x_col = st.selectbox("Select X-axis column", list(data.columns), key="std_x")
-        with col2:
-            y_col = st.selectbox("Select Y-axis column", processed_info["numeric_columns"], key="std_y")
+    dashboard_report_section()
 
-        col3, col4 = st.columns(2)
-        with col3:
-            std_chart_type = st.selectbox(
-                "Chart Type",
-                ["bar", "line", "scatter", "box"],
-                format_func=lambda x: {
-                    "bar": "Bar Chart",
-                    "line": "Line Chart",
-                    "scatter": "Scatter Plot",
-                    "box": "Box Plot"
-                }.get(x, x.title()),
-                key="std_type"
-            )
+@st.fragment
+def standard_chart_section(data, chart_data, chart_gen, sample, processed_info):
+    """Standard chart builder; data: filtered rows, chart_data: the rows (or sample) charts are drawn from"""
+    rerun_if_report_changed()
+    st.subheader("📊 Standard Chart Configuration")
+    col1, col2 = st.columns(2)
 
-        with col4:
-            color_col = st.selectbox("Color by (optional)", ["None"] + list(data.columns), key="std_color")
-            color_col = None if color_col == "None" else color_col
+    with col1:
+        x_col = st.selectbox("Select X-axis column", list(data.columns), key="std_x")
+    with col2:
+        y_col = st.selectbox("Select Y-axis column", processed_info["numeric_columns"], key="std_y")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        std_chart_type = st.selectbox(
+            "Chart Type",
+            ["bar", "line", "scatter", "box"],
+            format_func=lambda x: {
+                "bar": "Bar Chart",
+                "line": "Line Chart",
+                "scatter": "Scatter Plot",
+                "box": "Box Plot"
+            }.get(x, x.title()),
+            key="std_type"
+        )
 
-        if st.button("🚀 Generate Standard Chart", key="gen_std"):
-            st.subheader("📊 Generated Standard Chart")
-            try:
-                fig = None
+    with col4:
+        color_col = st.selectbox("Color by (optional)", ["None"] + list(data.columns), key="std_color")
+        color_col = None if color_col == "None" else color_col
+
+    time_bucket = None
+    if std_chart_type == "line" and x_col in processed_info.get("date_columns", []):
+        time_bucket = st.selectbox(
+            "Time bucket (optional)",
+            ["None"] + list(TIME_BUCKETS),
+            format_func=lambda x: "None (one point per row)" if x == "None" else f"Sum per {x}",
+            key="std_time_bucket"
+        )
+        time_bucket = None if time_bucket == "None" else time_bucket
+
+    if st.button("🚀 Generate Standard Chart", key="gen_std"):
+        st.subheader("📊 Generated Standard Chart")
+        try:
+            def build_standard_chart(gen, frame):
                 if std_chart_type == "bar":
-                    fig = chart_gen.create_bar_chart(x_col, y_col, color_col, data)
+                    return gen.create_bar_chart(x_col, y_col, color_col, frame)
                 elif std_chart_type == "line":
-                    fig = chart_gen.create_line_chart(x_col, y_col, color_col, data)
+                    return gen.create_line_chart(x_col, y_col, color_col, frame, time_bucket=time_bucket)
                 elif std_chart_type == "scatter":
-                    fig = chart_gen.create_scatter_plot(x_col, y_col, color_col, None, data)
+                    return gen.create_scatter_plot(x_col, y_col, color_col, None, frame)
                 elif std_chart_type == "box":
-                    fig = chart_gen.create_box_plot(x_col, y_col,color_col, data)
+                    return gen.create_box_plot(x_col, y_col,color_col, frame)
                 else:
                     raise ValueError("Unsupported chart type selected.")
 
-                st.plotly_chart(fig, use_container_width=True)
-                export_chart(fig, f"Standard_{std_chart_type}_{x_col}_vs_{y_col}")
-                log_to_google_sheets(
-                event="Chart Generated",
-                page="Chart Generator",
-                user_info=get_user_location(),
-                notes="Standard Chart")
+            # Reuse the figure if this chart was already built on the same data (any session)
+            chart_spec = (f"standard_{std_chart_type}", [x_col, y_col, color_col], {'time_bucket': time_bucket})
+            fig_json = figure_cache.get_or_build(
+                chart_data, *chart_spec, partial(build_standard_chart, chart_gen, chart_data)
+            )
 
-            except Exception as e:
-                st.error(f"Error generating standard chart: {str(e)}")
+            source_columns = list(dict.fromkeys(col for col in [x_col, y_col, color_col] if col))
+            # Bucketed charts export their aggregated points, not the raw rows
+            source_data = None if time_bucket else data[source_columns]
+            title_base = f"Standard_{std_chart_type}_{x_col}_vs_{y_col}"
+            if sample is None:
+                st.plotly_chart(json.loads(fig_json), use_container_width=True)
+                export_chart(fig_json, title_base, source_data)
+            else:
+                preview_chart("standard", fig_json, exact_chart_job(data, chart_spec, build_standard_chart),
+                              title_base, source_data)
+            log_to_google_sheets(
+            event="Chart Generated",
+            page="Chart Generator",
+            user_info=get_user_location(),
+            notes="Standard Chart")
 
+        except Exception as e:
+            st.error(f"Error generating standard chart: {str(e)}")
     else:
-        st.subheader("🏆 Top N Chart Configuration")
-        col1, col2 = st.columns(2)
+        pending_preview_chart("standard", data)
 
-        with col1:
-            cat_col = st.selectbox("Select Category Column", processed_info["text_columns"] + processed_info["numeric_columns"], key="top_cat")
-        with col2:
-            val_col = st.selectbox("Select Value Column", processed_info["numeric_columns"], key="top_val")
+@st.fragment
+def top_n_chart_section(data, chart_data, chart_gen, sample, processed_info):
+    """Top N chart builder over the same inputs as standard_chart_section"""
+    rerun_if_report_changed()
+    st.subheader("🏆 Top N Chart Configuration")
+    col1, col2 = st.columns(2)
 
-        col3, col4 = st.columns(2)
-        with col3:
-            top_n = st.number_input("Top N", min_value=3, max_value=20, value=5, step=1, key="top_n")
-        with col4:
-            top_chart_type = st.selectbox(
-                "Chart Type",
-                ["bar", "horizontal_bar", "pie", "line", "scatter", "box"],
-                format_func=lambda x: {
-                    "bar": "Vertical Bar",
-                    "horizontal_bar": "Horizontal Bar",
-                    "pie": "Pie Chart",
-                    "line": "Line Chart",
-                    "scatter": "Scatter Plot",
-                    "box": "Box Plot"
-                }.get(x, x.title()),
-                key="top_type"
-            )
-            # Optional Color Column for Top N
-        color_column = st.selectbox("Color by (optional):",["None"] + list(data.columns),index=0,key="top_color")
-        color_column = None if color_column == "None" else color_column
-        
-        if st.button("🚀 Generate Top N Chart", key="gen_top"):
-            st.subheader(f"🏆 Top {top_n} Chart")
-            try:
-                # Step 1: Get top N categories (based on sum of value column)
-                top_categories = data.groupby(cat_col)[val_col].sum().nlargest(top_n).index  # <-- NEW
-                filtered_data = data[data[cat_col].isin(top_categories)]  # <-- NEW
+    with col1:
+        cat_col = st.selectbox("Select Category Column", processed_info["text_columns"] + processed_info["numeric_columns"], key="top_cat")
+    with col2:
+        val_col = st.selectbox("Select Value Column", processed_info["numeric_columns"], key="top_val")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        top_n = st.number_input("Top N", min_value=3, max_value=20, value=5, step=1, key="top_n")
+    with col4:
+        top_chart_type = st.selectbox(
+            "Chart Type",
+            ["bar", "horizontal_bar", "pie", "line", "scatter", "box"],
+            format_func=lambda x: {
+                "bar": "Vertical Bar",
+                "horizontal_bar": "Horizontal Bar",
+                "pie": "Pie Chart",
+                "line": "Line Chart",
+                "scatter": "Scatter Plot",
+                "box": "Box Plot"
+            }.get(x, x.title()),
+            key="top_type"
+        )
 
-                # Step 2: Grouped version only for bar/pie charts
-                grouped = filtered_data.groupby(cat_col)[val_col].sum().reset_index()  # <-- MOVED HERE
+    col5, col6 = st.columns(2)
+    with col5:
+        rank_by = st.selectbox("Rank by", ["sum", "mean", "count"], format_func=str.title, key="top_rank_by")
+    with col6:
+        include_other = st.checkbox("Group the rest into \"Other\"", value=False, key="top_other",
+                                    help="Adds one bucket with the remaining categories (not used for box plots)")
+        # Optional Color Column for Top N
+    color_column = st.selectbox("Color by (optional):",["None"] + list(data.columns),index=0,key="top_color")
+    color_column = None if color_column == "None" else color_column
+
+    if st.button("🚀 Generate Top N Chart", key="gen_top"):
+        st.subheader(f"🏆 Top {top_n} Chart")
+        try:
+            raw_val_col = val_col
+            val_col = chart_gen.top_n_engine.value_label(val_col, rank_by)
+            line_has_axis = (pd.api.types.is_numeric_dtype(data[cat_col]) or pd.api.types.is_datetime64_any_dtype(data[cat_col])) and not include_other
+            if top_chart_type == "line" and not line_has_axis:
+                st.warning("⚠️ Line chart requires a numeric or time-based X-axis. Showing scatter plot instead.")
+
+            def build_top_n_chart(gen, frame):
+                # Aggregate once (cached per dataset) and select the top N without a full sort
+                grouped = gen.top_n(frame, cat_col, raw_val_col, top_n, by=rank_by, include_other=include_other)
 
                 # Generate based on selected chart type
                 if top_chart_type == "bar":
-                    fig = px.bar(grouped, x=cat_col, y=val_col, color=color_column or val_col)
+                    return px.bar(grouped, x=cat_col, y=val_col, color=color_column or val_col)
                 elif top_chart_type == "horizontal_bar":
-                    fig = px.bar(grouped, x=val_col, y=cat_col, orientation='h', color=color_column or val_col)
+                    return px.bar(grouped, x=val_col, y=cat_col, orientation='h', color=color_column or val_col)
                 elif top_chart_type == "pie":
-                    fig = px.pie(grouped, names=cat_col, values=val_col)
+                    return px.pie(grouped, names=cat_col, values=val_col)
                 elif top_chart_type == "line":
-                    if pd.api.types.is_numeric_dtype(grouped[cat_col]) or pd.api.types.is_datetime64_any_dtype(grouped[cat_col]):
-                       fig = px.line(grouped.sort_values(cat_col),x=cat_col,y=val_col,color=color_column or None,markers=True)
+                    if line_has_axis:
+                       return px.line(grouped.sort_values(cat_col),x=cat_col,y=val_col,color=color_column or None,markers=True)
                     else:
-                        st.warning("⚠️ Line chart requires a numeric or time-based X-axis. Showing scatter plot instead.")
-                        fig = px.scatter(grouped,x=cat_col,y=val_col,color=color_column or None,size=val_col,title="Fallback to Scatter Plot")
+                        return px.scatter(grouped,x=cat_col,y=val_col,color=color_column or None,size=val_col,title="Fallback to Scatter Plot")
                 elif top_chart_type == "scatter":
-                    fig = px.scatter(grouped, x=cat_col, y=val_col, size=val_col, color=color_column or cat_col)  # <-- RAW data
+                    return px.scatter(grouped, x=cat_col, y=val_col, size=val_col, color=color_column or cat_col)  # <-- RAW data
                 elif top_chart_type == "box":
-                    fig = px.box(filtered_data, x=cat_col, y=val_col, color=color_column or cat_col)  # <-- RAW data
+                    filtered_data = gen.top_n_engine.top_n_rows(frame, cat_col, raw_val_col, top_n, by=rank_by)
+                    return px.box(filtered_data, x=cat_col, y=raw_val_col, color=color_column or cat_col)  # <-- RAW data
                 else:
                     raise ValueError("Unsupported chart type selected.")
-                    
-                st.plotly_chart(fig, use_container_width=True)
-                export_chart(fig, f"Top_{top_n}_{cat_col}_by_{val_col}_{top_chart_type}")
-                log_to_google_sheets(
-                event="Chart Generated",
-                page="Chart Generator",
-                user_info=get_user_location(),
-                notes="Top N Chart")
 
-            except Exception as e:
-                st.error(f"Failed to generate Top N chart: {str(e)}")
+            chart_spec = (f"top_n_{top_chart_type}", [cat_col, raw_val_col, color_column],
+                          {"n": top_n, "by": rank_by, "other": include_other})
+            fig_json = figure_cache.get_or_build(
+                chart_data, *chart_spec, partial(build_top_n_chart, chart_gen, chart_data)
+            )
+
+            title_base = f"Top_{top_n}_{cat_col}_by_{val_col}_{top_chart_type}"
+            if sample is None:
+                st.plotly_chart(json.loads(fig_json), use_container_width=True)
+                export_chart(fig_json, title_base)
+            else:
+                preview_chart("top_n", fig_json, exact_chart_job(data, chart_spec, build_top_n_chart), title_base)
+            log_to_google_sheets(
+            event="Chart Generated",
+            page="Chart Generator",
+            user_info=get_user_location(),
+            notes="Top N Chart")
+
+        except Exception as e:
+            st.error(f"Failed to generate Top N chart: {str(e)}")
+    else:
+        pending_preview_chart("top_n", data)
+
+def get_chart_generator(data, sample_scale=None):
+    """Keep one ChartGenerator per session for as long as the dataset does not change"""
+    chart_gen = st.session_state.get("chart_generator")
+    backend = get_backend(st.session_state.get("execution_backend"))
+    cube = active_cube(data)
+    if (chart_gen is None or chart_gen.data is not data or chart_gen.backend is not backend
+            or chart_gen.cube is not cube or chart_gen.sample_scale != sample_scale):
+        chart_gen = ChartGenerator(data, backend=backend, cube=cube, sample_scale=sample_scale)
+        st.session_state.chart_generator = chart_gen
+    return chart_gen
+
+def exact_chart_job(data, chart_spec, build):
+    """Build a chart spec on every row in a worker thread (preview mode) and return the job key"""
+    chart_type, columns, options = chart_spec
+    exact_gen = ChartGenerator(data, backend=get_backend(st.session_state.get("execution_backend")),
+                               cube=active_cube(data))
+    job_key = ("chart", preview_key(data), chart_type, tuple(columns), json.dumps(options, sort_keys=True, default=str))
+    # Generating again is an explicit retry of a failed exact chart
+    preview_engine.retry(job_key)
+    # The figure lands in the shared figure cache too, so leaving preview mode reuses it
+    return preview_engine.submit(
+        job_key, lambda: figure_cache.get_or_build(data, chart_type, columns, options, partial(build, exact_gen, data))
+    )
+
+def preview_chart(section, preview_json, job_key, title_base, source_data=None):
+    """Show a sampled chart until its exact version is ready, then swap it in"""
+    status = preview_engine.status(job_key)
+    pending = st.session_state.setdefault("preview_charts", {})
+    fig_json = preview_json
+    if status['state'] == 'running':
+        # Remembered so the chart is shown again when the progress poller reruns the page
+        pending[section] = (preview_json, job_key, title_base, source_data)
+        st.caption("⏳ Approximate chart from the sample; building the exact chart...")
+        show_exact_progress(job_key)
+    else:
+        pending.pop(section, None)
+        if status['state'] == 'done':
+            fig_json = status['data']
+            st.caption("✅ Exact chart over all rows.")
+        elif status['state'] == 'error':
+            st.error(f"❌ Exact chart failed, showing the preview: {status['message']}")
+    st.plotly_chart(json.loads(fig_json), use_container_width=True)
+    export_chart(fig_json, title_base, source_data)
+
+def pending_preview_chart(section, data):
+    """Show the section's preview chart whose exact version was still building, if it is for these rows"""
+    pending = st.session_state.get("preview_charts", {}).get(section)
+    if pending is not None and pending[1][1] == preview_key(data):
+        preview_chart(section, *pending)
 
 # 📤 Export helper
-def export_chart(fig, title_base):
-    col1, col2 = st.columns(2)
+def export_chart(fig_json, title_base, source_data=None):
+    col1, col2, col3 = st.columns(3)
 
+    # Exports are generated only when a button is clicked and memoized per figure
     with col1:
-        html_buffer = io.StringIO()
-        fig.write_html(html_buffer, include_plotlyjs='cdn', full_html=True)
-        html_data = html_buffer.getvalue()
         st.download_button(
             label="🌐 Export as HTML",
-            data=html_data,
+            data=figure_exporter.deferred(fig_json, "html"),
             file_name=f"{title_base.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html",
-            mime="text/html"
+            mime="text/html",
+            on_click="ignore"
         )
 
     with col2:
-        json_data = fig.to_json()
         st.download_button(
             label="📄 Export as JSON",
-            data=json_data,
+            data=figure_exporter.deferred(fig_json, "json"),
             file_name=f"{title_base.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
+            mime="application/json",
+            on_click="ignore"
+        )
+
+    with col3:
+        st.button(
+            "➕ Add to Dashboard Report",
+            key=f"report_add_{title_base}",
+            on_click=add_chart_to_report,
+            args=({'kind': 'chart', 'title': title_base.replace('_', ' '), 'fig_json': fig_json},)
+        )
+
+    # Columnar chart data: the source columns when given, otherwise the plotted values
+    compression = st.session_state.get("columnar_compression", "zstd")
+    col4, col5 = st.columns(2)
+    with col4:
+        st.download_button(
+            label="🧱 Data as Parquet",
+            data=figure_exporter.deferred(fig_json, "parquet", data=source_data, compression=compression),
+            file_name=f"{title_base.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+            mime="application/vnd.apache.parquet",
+            on_click="ignore"
         )
 
+    with col5:
+        st.download_button(
+            label="🏹 Data as Arrow",
+            data=figure_exporter.deferred(fig_json, "arrow", data=source_data, compression=compression),
+            file_name=f"{title_base.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.arrow",
+            mime="application/vnd.apache.arrow.file",
+            on_click="ignore"
+        )
+
+def add_to_report(section):
+    """Queue a KPI section or chart for the dashboard report (runs as a button callback)"""
+    sections = st.session_state.setdefault("report_sections", [])
+    # Re-adding a section with the same title replaces it with the latest result
+    sections[:] = [queued for queued in sections if queued['title'] != section['title']]
+    sections.append(section)
+    st.session_state.pop("report_result", None)
+
+def add_chart_to_report(section):
+    """Button callback for charts: the report panel is a separate fragment, so flag it for a page rerun"""
+    add_to_report(section)
+    st.session_state.report_changed = True
+
+def rerun_if_report_changed():
+    """Rerun the whole page when a chart section's click queued a report section"""
+    if st.session_state.pop("report_changed", False):
+        st.rerun()
+
+@st.fragment
+def dashboard_report_section():
+    """Build one PDF and one Excel workbook from every queued KPI section and chart"""
+    sections = st.session_state.get("report_sections", [])
+    with st.expander(f"📑 Dashboard Report ({len(sections)} sections)", expanded=bool(sections)):
+        if not sections:
+            st.info("Use \"➕ Add to Dashboard Report\" on generated charts and on the KPI Dashboard to collect sections.")
+            return
+        
+        for section in sections:
+            st.write(f"• {section['title']} ({section['kind'].upper()})")
+        
+        # Offline HTML: every queued chart in one file with a single embedded plotly.js
+        bundle_charts = [(section['title'], section['fig_json']) for section in sections if section['kind'] == 'chart']
+        col1, col2 = st.columns(2)
+        if bundle_charts:
+            with col1:
+                st.download_button(
+                    label=f"🌐 Download Offline HTML Bundle ({len(bundle_charts)} charts)",
+                    data=figure_exporter.deferred(bundle_charts, "html_bundle", title="Dashboard Charts"),
+                    file_name=f"dashboard_charts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html",
+                    mime="text/html",
+                    on_click="ignore"
+                )
+        with col2:
+            # Every export of every queued section in one ZIP, produced concurrently on click
+            st.download_button(
+                label="📦 Download Everything (ZIP)",
+                data=artifact_bundler.deferred(report_artifacts(sections, st.session_state.get("report_result"))),
+                file_name=f"dashboard_exports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                mime="application/zip",
+                on_click="ignore"
+            )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🛠️ Build Report", key="report_build"):
+                builder = DashboardReportBuilder()
+                for section in sections:
+                    if section['kind'] == 'kpi':
+                        builder.add_kpi_section(section['title'], *section['args'])
+                    else:
+                        builder.add_chart(section['title'], section['fig_json'])
+                with st.spinner(f"Assembling {len(sections)} sections..."):
+                    st.session_state.report_result = builder.build()
+        with col2:
+            if st.button("🗑️ Clear Report", key="report_clear"):
+                st.session_state.pop("report_sections", None)
+                st.session_state.pop("report_result", None)
+                st.rerun()
+        
+        result = st.session_state.get("report_result")
+        if result is not None:
+            file_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("📋 Download Report PDF", data=result['pdf'],
+                                   file_name=f"dashboard_report_{file_stamp}.pdf",
+                                   mime="application/pdf", on_click="ignore")
+            with col2:
+                st.download_button("📊 Download Report Excel", data=result['excel'],
+                                   file_name=f"dashboard_report_{file_stamp}.xlsx",
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                   on_click="ignore")
+            st.write("**Section timings (seconds):**")
+            st.dataframe(result['timings'], use_container_width=True)
+
+
+def report_artifacts(sections, report_result=None):
+    """(file name, producer) pairs for every export of the queued report sections"""
+    artifacts = []
+    used = set()
+    for section in sections:
+        name = section['title'].replace(' ', '_').replace('/', '_')
+        while name in used:
+            name += "_"
+        used.add(name)
+        if section['kind'] == 'kpi':
+            for export_format, extension in [("json", "json"), ("excel", "xlsx"), ("pdf", "pdf")]:
+                artifacts.append((f"kpis/{name}.{extension}",
+                                  partial(export_service.generate, export_format, *section['args'])))
+        else:
+            artifacts.append((f"charts/{name}.html", partial(figure_exporter.to_html, section['fig_json'])))
+            artifacts.append((f"charts/{name}.json", partial(figure_exporter.to_json, section['fig_json'])))
+    
+    charts = [(section['title'], section['fig_json']) for section in sections if section['kind'] == 'chart']
+    if charts:
+        artifacts.append(("dashboard_charts.html",
+                          partial(figure_exporter.to_html_bundle, charts, title="Dashboard Charts")))
+    if report_result is not None:
+        artifacts.append(("dashboard_report.pdf", lambda: report_result['pdf']))
+        artifacts.append(("dashboard_report.xlsx", lambda: report_result['excel']))
+    return artifacts
                     
 def settings_page():
     log_to_google_sheets(
@@ -727,6 +1606,87 @@ def settings_page():
             help="Number of decimal places to show in calculations"
         )
     
+    kpi_engine_modes = ["In-memory", "Out-of-core (streamed)"]
+    st.session_state.kpi_engine_mode = st.selectbox(
+        "KPI engine:",
+        kpi_engine_modes,
+        index=kpi_engine_modes.index(st.session_state.get("kpi_engine_mode", "In-memory")),
+        help="Out-of-core mode computes KPIs by streaming the cached dataset file in chunks, so KPI calculations "
+             "use memory for one chunk instead of extra copies of the data. The uploaded dataset itself is still "
+             "loaded in memory for the other pages, so files must fit in RAM (median() is not available in "
+             "custom formulas)"
+    )
+    
+    backends = available_backends()
+    current_backend = st.session_state.get("execution_backend", "pandas")
+    st.session_state.execution_backend = st.selectbox(
+        "Execution backend:",
+        backends,
+        index=backends.index(current_backend) if current_backend in backends else 0,
+        format_func=lambda x: {"pandas": "pandas (default)", "duckdb": "DuckDB (multi-threaded SQL)",
+                               "polars": "Polars (multi-threaded)"}.get(x, x),
+        help="Engine used for grouped KPIs, Top-N, histograms and time buckets"
+    )
+    missing_backends = [name for name in BACKENDS if name not in backends]
+    if missing_backends:
+        st.caption(f"ℹ️ Install {' or '.join(missing_backends)} to enable the columnar backends.")
+    
+    if st.session_state.execution_backend != "pandas" and st.session_state.get("data") is not None:
+        if st.button("🔍 Check results against pandas", key="backend_parity"):
+            parity_data = st.session_state.data
+            parity_info = st.session_state.processed_data
+            numeric_columns = parity_info["numeric_columns"][:3]
+            text_columns = parity_info["text_columns"]
+            date_columns = parity_info.get("date_columns", [])
+            with st.spinner("Running every aggregation on both engines..."):
+                parity = check_parity(
+                    get_backend(st.session_state.execution_backend), parity_data, numeric_columns,
+                    category_column=text_columns[0] if text_columns else None,
+                    date_column=date_columns[0] if date_columns else None
+                )
+            if parity['match'].all():
+                st.success(f"✅ All {len(parity)} checks match pandas.")
+            else:
+                st.error(f"❌ {int((~parity['match']).sum())} of {len(parity)} checks differ from pandas.")
+            st.dataframe(parity, use_container_width=True)
+    
+    st.session_state.preview_mode = st.checkbox(
+        "⚡ Fast preview mode",
+        value=st.session_state.get("preview_mode", False),
+        help="KPIs and charts are first estimated from a cached random sample, with confidence intervals; "
+             "exact results are computed in the background and replace them when ready"
+    )
+    if st.session_state.preview_mode:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.session_state.preview_rows = st.number_input(
+                "Preview sample rows:",
+                min_value=10_000,
+                max_value=1_000_000,
+                value=st.session_state.get("preview_rows", DEFAULT_SAMPLE_ROWS),
+                step=10_000,
+                help="Datasets (or filtered rows) no larger than this are always computed exactly"
+            )
+        with col2:
+            processed_info = st.session_state.get("processed_data") or {}
+            strata_options = ["None"] + processed_info.get("text_columns", [])
+            current_strata = st.session_state.get("preview_strata") or "None"
+            preview_strata = st.selectbox(
+                "Stratify sample by:",
+                strata_options,
+                index=strata_options.index(current_strata) if current_strata in strata_options else 0,
+                help="Samples every category in proportion (at least two rows each), so small categories "
+                     "still get estimates"
+            )
+            st.session_state.preview_strata = None if preview_strata == "None" else preview_strata
+        with col3:
+            st.session_state.preview_confidence = st.selectbox(
+                "Confidence level:",
+                CONFIDENCE_LEVELS,
+                index=CONFIDENCE_LEVELS.index(st.session_state.get("preview_confidence", 0.95)),
+                format_func=lambda level: f"{level:.0%}"
+            )
+    
     # Export settings
     st.subheader("💾 Export Settings")
     
@@ -735,7 +1695,7 @@ def settings_page():
     with col1:
         kpi_export_format = st.selectbox(
             "Default KPI export format:",
-            ["Excel", "PDF", "JSON"],
+            ["Excel", "PDF", "JSON", "Parquet", "Arrow"],
             help="Preferred format for KPI reports"
         )
         
@@ -758,12 +1718,20 @@ def settings_page():
             value=True,
             help="Add generation date and settings info"
         )
+        
+        columnar_compression = st.selectbox(
+            "Parquet/Arrow compression:",
+            COLUMNAR_COMPRESSIONS,
+            index=COLUMNAR_COMPRESSIONS.index(st.session_state.get("columnar_compression", "zstd")),
+            help="zstd gives the smallest files, lz4 the fastest to read and write"
+        )
     
     # Store preferences in session state
     st.session_state.kpi_export_format = kpi_export_format
     st.session_state.chart_export_format = chart_export_format
     st.session_state.pdf_quality = pdf_quality
     st.session_state.include_metadata = include_metadata
+    st.session_state.columnar_compression = columnar_compression
     
     # About section
     st.subheader("ℹ️ About")
@@ -0,0 +1,273 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+from utils.execution_backend import TIME_BUCKETS, bucket_starts
+
+CUBE_STATS = ['sum', 'mean', 'count', 'min', 'max', 'std', 'var']
+# Keys above this are re-densified so combining many dimensions cannot overflow int64
+_MAX_RADIX = 2 ** 62
+
+
+def _combine_codes(codes, sizes):
+    """Dense ids for the distinct combinations of several code arrays, and the first position of each id"""
+    key = np.zeros(len(codes[0]) if codes else 0, dtype='int64')
+    radix = 1
+    for column_codes, size in zip(codes, sizes):
+        if radix * size >= _MAX_RADIX:
+            key, uniques = pd.factorize(key)
+            radix = len(uniques)
+        key = key * size + column_codes
+        radix *= size
+    ids, uniques = pd.factorize(key)
+    first = np.empty(len(uniques), dtype='int64')
+    # Reversed assignment leaves the earliest position of each id
+    first[ids[::-1]] = np.arange(len(ids) - 1, -1, -1)
+    return ids, first
+
+
+def time_dimension(column, bucket):
+    """Name of the cube dimension holding a date column truncated to a time bucket"""
+    return f"{column} ({bucket})"
+
+
+class AggregateCube:
+    """Materialized count/sum/min/max/M2 of measures for every populated combination of dimension values.
+
+    Group-bys, drill-downs, roll-ups and selections on dimension values are answered by merging cells,
+    so query cost depends on the number of populated cells rather than on the number of rows."""
+
+    def __init__(self, fingerprint, labels, cell_codes, rows, stats, measure_dtypes, build_seconds=0.0):
+        self.fingerprint = fingerprint
+        # dimension -> pd.Index of values; code len(labels) marks a missing value
+        self.labels = labels
+        # dimension -> code of each cell
+        self.cell_codes = cell_codes
+        self.rows = rows
+        # measure -> {'count', 'sum', 'min', 'max', 'm2'} arrays over cells
+        self.stats = stats
+        self.measure_dtypes = measure_dtypes
+        self.build_seconds = build_seconds
+
+    @property
+    def dimensions(self):
+        return list(self.labels)
+
+    @property
+    def measures(self):
+        return list(self.stats)
+
+    @property
+    def n_cells(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        arrays = [self.rows, *self.cell_codes.values()]
+        arrays += [array for stats in self.stats.values() for array in stats.values()]
+        return sum(array.nbytes for array in arrays) + sum(labels.memory_usage() for labels in self.labels.values())
+
+    def matches(self, data):
+        """True when the cube was built from this dataset"""
+        return data is not None and dataset_fingerprint(data) == self.fingerprint
+
+    def can_answer(self, group_by, measures, selections=None):
+        return (set(group_by) <= set(self.labels) and set(measures) <= set(self.stats)
+                and set(selections or {}) <= set(self.labels))
+
+    def _select(self, selections):
+        """Cells whose value of every selected dimension is one of the chosen values"""
+        keep = np.ones(self.n_cells, dtype=bool)
+        for dim, values in (selections or {}).items():
+            labels = self.labels[dim]
+            ids = labels.get_indexer(pd.Index(list(values)))
+            lookup = np.zeros(len(labels) + 1, dtype=bool)
+            lookup[ids[ids >= 0]] = True
+            keep &= lookup[self.cell_codes[dim]]
+        return keep
+
+    def query(self, group_by, measures=None, selections=None, stats=('sum', 'mean')):
+        """Aggregate measures per combination of group_by dimensions over the selected cells.
+
+        Returns a frame indexed by group_by (sorted) with <measure>_<stat> columns; rows with a
+        missing group value are left out, as in pandas groupby."""
+        measures = self.measures if measures is None else list(measures)
+        for stat in stats:
+            if stat not in CUBE_STATS:
+                raise ValueError(f"Unsupported cube statistic: {stat}")
+        keep = self._select(selections)
+        for dim in group_by:
+            keep &= self.cell_codes[dim] < len(self.labels[dim])
+        cells = np.flatnonzero(keep)
+
+        if group_by:
+            codes = [self.cell_codes[dim][cells] for dim in group_by]
+            group_ids, first = _combine_codes(codes, [len(self.labels[dim]) + 1 for dim in group_by])
+            n_groups = len(first)
+            index_arrays = [self.labels[dim].take(column_codes[first]) for dim, column_codes in zip(group_by, codes)]
+            if len(group_by) == 1:
+                index = pd.Index(index_arrays[0], name=group_by[0])
+            else:
+                index = pd.MultiIndex.from_arrays(index_arrays, names=list(group_by))
+        else:
+            group_ids = np.zeros(len(cells), dtype='int64')
+            n_groups = 1
+            index = pd.RangeIndex(1)
+
+        result = {}
+        for measure in measures:
+            cell_stats = self.stats[measure]
+            count = cell_stats['count'][cells]
+            total = cell_stats['sum'][cells]
+            n = np.bincount(group_ids, weights=count, minlength=n_groups)
+            sums = np.bincount(group_ids, weights=total, minlength=n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = sums / n
+                # Chan et al.: merged M2 = sum of cell M2 + n_cell * (cell mean - group mean)^2
+                cell_mean = total / count
+                spread = np.where(count > 0, count * (cell_mean - mean[group_ids]) ** 2, 0.0)
+                m2 = np.bincount(group_ids, weights=cell_stats['m2'][cells], minlength=n_groups)
+                m2 += np.bincount(group_ids, weights=spread, minlength=n_groups)
+                var = np.where(n > 1, m2 / (n - 1), np.nan)
+            for stat in stats:
+                if stat == 'sum':
+                    value = sums
+                    if pd.api.types.is_integer_dtype(self.measure_dtypes[measure]):
+                        value = np.round(sums).astype('int64')
+                elif stat == 'mean':
+                    value = mean
+                elif stat == 'count':
+                    value = n.astype('int64')
+                elif stat in ('min', 'max'):
+                    value = np.full(n_groups, np.nan)
+                    ufunc = np.fmin if stat == 'min' else np.fmax
+                    ufunc.at(value, group_ids, cell_stats[stat][cells])
+                elif stat == 'var':
+                    value = var
+                else:
+                    value = np.sqrt(var)
+                result[f"{measure}_{stat}"] = value
+
+        frame = pd.DataFrame(result, index=index)
+        if group_by:
+            try:
+                frame = frame.sort_index()
+            except TypeError:
+                # Mixed label types cannot be ordered
+                pass
+        return frame
+
+    def grouped_kpis(self, kpi_columns, group_column, selections=None):
+        """Same layout as KPICalculator.calculate_grouped_kpis, answered from the cells"""
+        return self.query([group_column], kpi_columns, selections, stats=('sum', 'mean'))
+
+    def group_sum(self, keys, value_column, selections=None):
+        """Same layout as an execution backend's group_sum"""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        frame = self.query(keys, [value_column], selections, stats=('sum',))
+        return frame.rename(columns={f"{value_column}_sum": value_column}).reset_index()
+
+    def cross_filter(self, measure, selections=None, stat='sum', dimensions=None):
+        """Per-dimension totals of a measure where each dimension ignores its own selection"""
+        selections = selections or {}
+        result = {}
+        for dim in dimensions or self.dimensions:
+            others = {other: values for other, values in selections.items() if other != dim}
+            result[dim] = self.query([dim], [measure], others, stats=(stat,))[f"{measure}_{stat}"]
+        return result
+
+    def selections_from_filters(self, filters):
+        """Translate row filters into dimension selections, or None if one of them needs the raw rows"""
+        selections = {}
+        for row_filter in filters:
+            if row_filter.column not in self.labels:
+                return None
+            labels = self.labels[row_filter.column]
+            if row_filter.kind == 'in':
+                chosen = set(row_filter.value)
+            elif row_filter.kind == 'prefix':
+                prefix, case = row_filter.value
+                text = labels.astype(str)
+                if not case:
+                    text, prefix = text.str.lower(), prefix.lower()
+                chosen = set(labels[np.asarray(text.str.startswith(prefix), dtype=bool)])
+            else:
+                return None
+            previous = selections.get(row_filter.column)
+            selections[row_filter.column] = chosen if previous is None else previous & chosen
+        return selections
+
+
+class CubeEngine:
+    """Builds aggregate cubes and keeps them, keyed by dataset and cube definition"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self._cubes = LRUCache(max_bytes=max_bytes, sizeof=lambda cube: cube.nbytes)
+
+    def _key(self, data, dimensions, measures, time_column, time_bucket):
+        return (dataset_fingerprint(data), tuple(dimensions), tuple(measures), time_column,
+                time_bucket if time_column else None)
+
+    def get(self, data, dimensions, measures, time_column=None, time_bucket='month'):
+        """A previously built cube, or None"""
+        return self._cubes.get(self._key(data, dimensions, measures, time_column, time_bucket))
+
+    def build(self, data, dimensions, measures, time_column=None, time_bucket='month'):
+        """Build (or reuse) the cube of measures over dimensions and, optionally, a bucketed date column"""
+        key = self._key(data, dimensions, measures, time_column, time_bucket)
+        return self._cubes.get_or_compute(
+            key, lambda: self._build(data, dimensions, measures, time_column, time_bucket)
+        )
+
+    def _build(self, data, dimensions, measures, time_column, time_bucket):
+        started = time.perf_counter()
+        columns = {dim: data[dim] for dim in dimensions}
+        if time_column:
+            if time_bucket not in TIME_BUCKETS:
+                raise ValueError(f"Unsupported time bucket: {time_bucket}")
+            dates = pd.to_datetime(data[time_column], errors='coerce')
+            columns[time_dimension(time_column, time_bucket)] = bucket_starts(dates, time_bucket)
+        if not columns:
+            raise ValueError("A cube needs at least one dimension")
+
+        labels, row_codes = {}, {}
+        for name, series in columns.items():
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series)
+            uniques = pd.Index(uniques)
+            # Missing values get their own code so roll-ups over other dimensions still count them
+            row_codes[name] = np.where(codes < 0, len(uniques), codes).astype('int64')
+            labels[name] = uniques
+
+        cell_ids, first = _combine_codes(list(row_codes.values()), [len(uniques) + 1 for uniques in labels.values()])
+        cell_codes = {name: codes[first] for name, codes in row_codes.items()}
+        del row_codes
+
+        values = pd.DataFrame({measure: pd.to_numeric(data[measure], errors='coerce') for measure in measures})
+        grouped = values.groupby(cell_ids, sort=True)
+        counts, sums = grouped.count(), grouped.sum()
+        mins, maxs = grouped.min(), grouped.max()
+        variances = grouped.var(ddof=0)
+        stats = {}
+        for measure in measures:
+            count = counts[measure].to_numpy(dtype='float64')
+            stats[measure] = {
+                'count': count,
+                'sum': sums[measure].to_numpy(dtype='float64'),
+                'min': mins[measure].to_numpy(dtype='float64', na_value=np.nan),
+                'max': maxs[measure].to_numpy(dtype='float64', na_value=np.nan),
+                'm2': np.nan_to_num(variances[measure].to_numpy(dtype='float64', na_value=np.nan) * count)
+            }
+
+        return AggregateCube(
+            dataset_fingerprint(data), labels, cell_codes, np.bincount(cell_ids, minlength=len(first)),
+            stats, {measure: data[measure].dtype for measure in measures}, time.perf_counter() - started
+        )
+
+
+# Shared engine: a cube built in one session serves every session on the same dataset
+cube_engine = CubeEngine()
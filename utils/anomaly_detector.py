@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+OUTLIER_METHODS = ['zscore', 'iqr', 'mad']
+METHOD_LABELS = {'zscore': "Z-score", 'iqr': "IQR fences", 'mad': "MAD (robust z)"}
+# Scales the MAD to the standard deviation of a normal distribution
+MAD_SCALE = 0.6745
+
+
+class AnomalyResult:
+    """Outlier fences and flagged cells for a set of numeric columns (optionally per group)"""
+
+    def __init__(self, columns, group_column, group_labels, index, fences, counts, valid_counts,
+                 rows, cell_columns, flags):
+        self.columns = columns
+        self.group_column = group_column
+        self.group_labels = group_labels
+        self.index = index
+        # method -> (lower, upper), each groups x columns
+        self.fences = fences
+        # method -> groups x columns outlier counts; valid_counts: non-missing values per group and column
+        self.counts = counts
+        self.valid_counts = valid_counts
+        # Flagged cells only (COO): row position, column number, one bit per method in OUTLIER_METHODS order
+        self.rows = rows
+        self.cell_columns = cell_columns
+        self.flags = flags
+
+    @property
+    def nbytes(self):
+        arrays = [self.rows, self.cell_columns, self.flags, self.valid_counts, *self.counts.values()]
+        arrays += [fence for pair in self.fences.values() for fence in pair]
+        return sum(array.nbytes for array in arrays)
+
+    def findings(self, min_outliers=1):
+        """One row per (group,) column and method with its outlier count, share and fences, worst first"""
+        records = []
+        for method in OUTLIER_METHODS:
+            lower, upper = self.fences[method]
+            for g in range(len(self.group_labels)):
+                for j, column in enumerate(self.columns):
+                    outliers = int(self.counts[method][g, j])
+                    if outliers < min_outliers:
+                        continue
+                    record = {} if self.group_column is None else {self.group_column: self.group_labels[g]}
+                    record.update({
+                        'Column': column,
+                        'Method': METHOD_LABELS[method],
+                        'Outliers': outliers,
+                        'Outlier %': 100.0 * outliers / max(self.valid_counts[g, j], 1),
+                        'Lower fence': lower[g, j],
+                        'Upper fence': upper[g, j]
+                    })
+                    records.append(record)
+        frame = pd.DataFrame(records)
+        if frame.empty:
+            return frame
+        return frame.sort_values(['Outlier %', 'Outliers'], ascending=False, ignore_index=True)
+
+    def column_summary(self):
+        """Outlier counts per column and method across all groups"""
+        summary = pd.DataFrame(
+            {METHOD_LABELS[method]: self.counts[method].sum(axis=0).astype('int64') for method in OUTLIER_METHODS},
+            index=pd.Index(self.columns, name='Column')
+        )
+        summary['Any method'] = [int((self.cell_columns == j).sum()) for j in range(len(self.columns))]
+        return summary.sort_values('Any method', ascending=False)
+
+    def outlier_positions(self, column, method=None):
+        """Row positions flagged in a column by one method, or by any method when None"""
+        selected = self.cell_columns == self.columns.index(column)
+        if method is not None:
+            selected &= (self.flags & (1 << OUTLIER_METHODS.index(method))) > 0
+        return self.rows[selected]
+
+    def outlier_index(self, column, method=None):
+        """Index labels of the flagged rows, for highlighting or selecting them in the source frame"""
+        return self.index.take(self.outlier_positions(column, method))
+
+    def flagged_positions(self):
+        """Row positions with at least one flagged cell"""
+        return np.unique(self.rows)
+
+
+class AnomalyDetector:
+    """Finds outliers in every numeric column at once using z-score, IQR and MAD fences.
+
+    One pass computes every column's (and group's) statistics into fence matrices; a second, blocked
+    pass compares the value matrix against all fences at once, so flag memory scales with the outliers."""
+
+    def __init__(self, z_threshold=3.0, iqr_factor=1.5, mad_threshold=3.5, block_rows=1_000_000,
+                 max_bytes=256 * 1024 * 1024):
+        self.z_threshold = z_threshold
+        self.iqr_factor = iqr_factor
+        self.mad_threshold = mad_threshold
+        self.block_rows = block_rows
+        self._results = LRUCache(max_bytes=max_bytes, sizeof=lambda result: result.nbytes)
+
+    def detect(self, data, columns, group_column=None, z_threshold=None, iqr_factor=None, mad_threshold=None):
+        """Return an AnomalyResult for columns, cached per dataset and thresholds (None: the defaults)"""
+        columns = list(columns)
+        thresholds = (
+            self.z_threshold if z_threshold is None else z_threshold,
+            self.iqr_factor if iqr_factor is None else iqr_factor,
+            self.mad_threshold if mad_threshold is None else mad_threshold
+        )
+        key = (dataset_fingerprint(data), tuple(columns), group_column, thresholds)
+        return self._results.get_or_compute(key, lambda: self._detect(data, columns, group_column, thresholds))
+
+    def _detect(self, data, columns, group_column, thresholds):
+        if not columns:
+            raise ValueError("Select at least one numeric column")
+        frame = data[columns]
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+            frame = frame.apply(pd.to_numeric, errors='coerce')
+        # One rows x columns float matrix shared by both passes
+        matrix = frame.to_numpy(dtype='float64', na_value=np.nan)
+        if group_column is not None:
+            codes, group_labels = pd.factorize(data[group_column])
+            group_labels = pd.Index(group_labels)
+        else:
+            codes, group_labels = np.zeros(len(data), dtype='int64'), pd.Index(["All rows"])
+        n_groups, n_columns = len(group_labels), len(columns)
+        fences, valid_counts = self._fences(matrix, codes, n_groups, thresholds)
+
+        counts = {method: np.zeros((n_groups, n_columns), dtype='int64') for method in OUTLIER_METHODS}
+        rows, cell_columns, flags = [], [], []
+        for start in range(0, len(matrix), self.block_rows):
+            block = matrix[start:start + self.block_rows]
+            block_codes = codes[start:start + self.block_rows]
+            positions = None
+            if n_groups > 1 or (block_codes < 0).any():
+                in_group = block_codes >= 0
+                block, block_codes = block[in_group], block_codes[in_group]
+                positions = np.flatnonzero(in_group) + start
+
+            bits = np.zeros(block.shape, dtype='uint8')
+            for bit, method in enumerate(OUTLIER_METHODS):
+                lower, upper = fences[method]
+                # Fences broadcast to rows (through the group codes when grouped): one comparison per cell
+                if n_groups > 1:
+                    lower, upper = lower[block_codes], upper[block_codes]
+                outside = (block < lower) | (block > upper)
+                counts[method] += self._group_counts(outside, block_codes, n_groups)
+                bits |= outside.view('uint8') << bit
+            flagged_rows, flagged_columns = np.nonzero(bits)
+            rows.append(flagged_rows + start if positions is None else positions[flagged_rows])
+            cell_columns.append(flagged_columns.astype('int32'))
+            flags.append(bits[flagged_rows, flagged_columns])
+
+        return AnomalyResult(
+            columns, group_column, group_labels, data.index, fences, counts, valid_counts,
+            np.concatenate(rows) if rows else np.zeros(0, dtype='int64'),
+            np.concatenate(cell_columns) if cell_columns else np.zeros(0, dtype='int32'),
+            np.concatenate(flags) if flags else np.zeros(0, dtype='uint8')
+        )
+
+    @staticmethod
+    def _group_counts(mask, codes, n_groups):
+        """groups x columns count of True cells"""
+        if n_groups == 1:
+            return mask.sum(axis=0, dtype='int64')[np.newaxis, :]
+        return np.stack([np.bincount(codes, weights=mask[:, j], minlength=n_groups)
+                         for j in range(mask.shape[1])], axis=1).astype('int64')
+
+    @staticmethod
+    def _group_stats(matrix, codes, n_groups):
+        """Non-missing count, mean, std, quartiles and MAD per group and column, as groups x columns arrays.
+
+        One grouped aggregation per statistic over the whole matrix (no loop over groups or columns);
+        rows with a missing group value (code -1) form a group of their own that is dropped."""
+        groups = pd.RangeIndex(n_groups)
+        grouped = pd.DataFrame(matrix, copy=False).groupby(codes, sort=False)
+
+        def per_group(frame):
+            return frame.reindex(groups).to_numpy(dtype='float64', na_value=np.nan)
+
+        quartiles = grouped.quantile([0.25, 0.5, 0.75])
+        q1, median, q3 = (per_group(quartiles.xs(q, level=-1)) for q in (0.25, 0.5, 0.75))
+        # MAD: median of each value's distance to its group median (NaN stays NaN and is skipped)
+        deviations = np.abs(matrix - median[np.maximum(codes, 0)])
+        mad = per_group(pd.DataFrame(deviations, copy=False).groupby(codes, sort=False).median())
+        counts = grouped.count().reindex(groups, fill_value=0).to_numpy(dtype='int64')
+        return counts, per_group(grouped.mean()), per_group(grouped.std(ddof=1)), q1, median, q3, mad
+
+    def _fences(self, matrix, codes, n_groups, thresholds):
+        """(lower, upper) groups x columns matrices for every method, and non-missing counts"""
+        shape = (n_groups, matrix.shape[1])
+        mean, std, q1, median, q3, mad = (np.full(shape, np.nan) for _ in range(6))
+        valid_counts = np.zeros(shape, dtype='int64')
+        if n_groups == 1 and (codes >= 0).all():
+            # Column-contiguous copy so each column's statistics stream through memory
+            for j, column in enumerate(np.ascontiguousarray(matrix.T)):
+                column = column[~np.isnan(column)]
+                valid_counts[0, j] = column.size
+                if column.size == 0:
+                    continue
+                mean[0, j] = column.mean()
+                std[0, j] = column.std(ddof=1) if column.size > 1 else np.nan
+                # Quantiles partition instead of sorting: linear time per column
+                q1[0, j], median[0, j], q3[0, j] = np.quantile(column, [0.25, 0.5, 0.75])
+                mad[0, j] = np.median(np.abs(column - median[0, j]))
+        else:
+            valid_counts, mean, std, q1, median, q3, mad = self._group_stats(matrix, codes, n_groups)
+        # A zero MAD (mostly constant column) would flag every other value; such columns get no MAD fence
+        mad = np.where(mad > 0, mad, np.inf)
+
+        z_threshold, iqr_factor, mad_threshold = thresholds
+        iqr = q3 - q1
+        mad_reach = mad_threshold * mad / MAD_SCALE
+        with np.errstate(invalid='ignore'):
+            fences = {
+                'zscore': (mean - z_threshold * std, mean + z_threshold * std),
+                'iqr': (q1 - iqr_factor * iqr, q3 + iqr_factor * iqr),
+                'mad': (median - mad_reach, median + mad_reach)
+            }
+        return fences, valid_counts
+
+
+# Shared detector (conventional default thresholds) so results are cached across reruns and sessions
+anomaly_detector = AnomalyDetector()
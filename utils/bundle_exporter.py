@@ -0,0 +1,96 @@
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+# Zips held in memory up to this size before spilling to a temp file
+ZIP_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+ZIP_CHUNK_SIZE = 1024 * 1024
+# Formats that are already compressed are stored as-is instead of deflated again
+STORED_EXTENSIONS = {'.xlsx', '.pdf', '.parquet', '.arrow', '.png', '.jpg', '.jpeg', '.webp', '.zip', '.gz'}
+
+
+def _chunks(data):
+    """Yield byte chunks from bytes, str or an iterable of either"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), ZIP_CHUNK_SIZE):
+            yield view[start:start + ZIP_CHUNK_SIZE]
+        return
+    for chunk in data:
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+class ArtifactBundler:
+    """Produces export artifacts concurrently and streams them into one ZIP archive"""
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+
+    def iter_artifacts(self, artifacts):
+        """Run (name, producer) pairs concurrently and yield (name, data, error) as each finishes.
+
+        At most max_workers artifacts are in flight, so only that many results are held at once."""
+        artifacts = iter(artifacts)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="artifact") as executor:
+            pending = {}
+
+            def submit_next():
+                for name, producer in artifacts:
+                    pending[executor.submit(producer)] = name
+                    return True
+                return False
+
+            for _ in range(self.max_workers):
+                if not submit_next():
+                    break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        yield name, future.result(), None
+                    except Exception as e:
+                        yield name, None, e
+                    submit_next()
+
+    def write_zip(self, output, artifacts, progress_callback=None):
+        """Write every artifact into a ZIP on a file object; failures are listed in ERRORS.txt"""
+        artifacts = list(artifacts)
+        errors = []
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            for done, (name, data, error) in enumerate(self.iter_artifacts(artifacts), start=1):
+                if error is not None:
+                    errors.append(f"{name}: {error}")
+                else:
+                    info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+                    stored = os.path.splitext(name)[1].lower() in STORED_EXTENSIONS
+                    info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                    with archive.open(info, 'w', force_zip64=True) as entry:
+                        for chunk in _chunks(data):
+                            entry.write(chunk)
+                del data
+                if progress_callback is not None:
+                    status = "Failed" if error is not None else "Added"
+                    progress_callback(done / len(artifacts), f"{status} {name} ({done} of {len(artifacts)})")
+            if errors:
+                archive.writestr("ERRORS.txt", "\n".join(errors))
+        return errors
+
+    def build_zip(self, artifacts, progress_callback=None):
+        """ZIP bytes for a list of (name, producer) pairs, assembled in spooled temp storage"""
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_SIZE) as output:
+            self.write_zip(output, artifacts, progress_callback)
+            output.seek(0)
+            return output.read()
+
+    def deferred(self, artifacts):
+        """Zero-argument callable for st.download_button; nothing is generated until it is clicked"""
+        return lambda: self.build_zip(artifacts)
+
+
+# Shared bundler; artifacts themselves come from the cached export services
+artifact_bundler = ArtifactBundler()
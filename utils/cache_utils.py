@@ -0,0 +1,144 @@
+import hashlib
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# id(frame) -> (weakref to frame, shape/dtype signature, fingerprint)
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+
+def _frame_signature(data):
+    """Cheap signature used to detect in-place changes to a fingerprinted frame"""
+    return (data.shape, tuple(map(str, data.columns)), tuple(map(str, data.dtypes)))
+
+
+def dataset_fingerprint(data):
+    """Return a content hash for a DataFrame, memoized per frame object"""
+    key = id(data)
+    signature = _frame_signature(data)
+
+    with _fingerprint_lock:
+        entry = _fingerprints.get(key)
+        if entry is not None and entry[0]() is data and entry[1] == signature:
+            return entry[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(signature).encode())
+    try:
+        row_hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+        digest.update(row_hashes.tobytes())
+    except TypeError:
+        # Unhashable cell values (lists, dicts); fall back to the text form
+        digest.update(data.to_csv(index=True).encode())
+    fingerprint = digest.hexdigest()
+
+    with _fingerprint_lock:
+        try:
+            ref = weakref.ref(data, lambda _, k=key: _fingerprints.pop(k, None))
+        except TypeError:
+            return fingerprint
+        _fingerprints[key] = (ref, signature, fingerprint)
+    return fingerprint
+
+
+def estimate_size(value):
+    """Rough size of a cached value in bytes"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=False))
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items()) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by item count and/or total bytes"""
+
+    def __init__(self, max_items=None, max_bytes=None, sizeof=estimate_size):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            # Values larger than the whole budget are never cached
+            if self.max_bytes is not None and size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            self._evict()
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        return self.put(key, compute())
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                value, size = self._entries.pop(key)
+                self._total_bytes -= size
+                return value
+            return default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_items is not None and len(self._entries) > self.max_items)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
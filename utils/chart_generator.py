@@ -3,13 +3,49 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from plotly.subplots import make_subplots
+from utils.histogram_engine import histogram_engine as shared_histogram_engine
+from utils.top_n_engine import top_n_engine as shared_top_n_engine
+from utils.correlation_engine import correlation_engine as shared_correlation_engine
+from utils.execution_backend import get_backend
 
 class ChartGenerator:
     """Generates various types of interactive charts using Plotly"""
-    
-    def __init__(self, data):
+
+    def __init__(self, data, histogram_engine=None, top_n_engine=None, correlation_engine=None, backend=None,
+                 cube=None, sample_scale=None):
         self.data = data
+        # Execution backend for grouping, Top-N, histogram and time-bucket aggregations
+        self.backend = backend or get_backend()
+        # Optional aggregate cube built from self.data; answers group sums without touching the rows
+        self.cube = cube
+        # Set when data is a preview sample: sums and counts are scaled up to estimate the whole dataset
+        self.sample_scale = sample_scale
+        self.histogram_engine = histogram_engine or shared_histogram_engine
+        self.top_n_engine = top_n_engine or shared_top_n_engine
+        self.correlation_engine = correlation_engine or shared_correlation_engine
     
+    def _scaled(self, frame, columns):
+        """Copy of frame with sum/count columns scaled to the whole dataset (unchanged when not sampled)"""
+        columns = [col for col in columns if col in frame.columns]
+        if self.sample_scale is None or not columns:
+            return frame
+        return frame.assign(**{col: frame[col] * self.sample_scale for col in columns})
+
+    def _group_sum(self, data, keys, value_column):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        if self.cube is not None and data is self.data and self.cube.can_answer(keys, [value_column]):
+            return self.cube.group_sum(keys, value_column)
+        return self._scaled(self.backend.group_sum(data, keys if len(keys) > 1 else keys[0], value_column),
+                            [value_column])
+
+    def top_n(self, data, category_column, value_column, n=10, by="sum", group_column=None, include_other=False):
+        """Top-N table from the shared engine on this generator's backend (scaled when sampled)"""
+        top_data = self.top_n_engine.top_n(data, category_column, value_column, n, by=by, group_column=group_column,
+                                           include_other=include_other, backend=self.backend)
+        if by == "mean":
+            return top_data
+        return self._scaled(top_data, [self.top_n_engine.value_label(value_column, by)])
+
     def create_bar_chart(self, x_column, y_column, color_column=None, data=None):
         """Create an interactive bar chart"""
         if data is None:
@@ -19,9 +55,9 @@ class ChartGenerator:
         if data[x_column].dtype == 'object':
             # Group by x_column and aggregate y_column
             if color_column:
-                grouped_data = data.groupby([x_column, color_column])[y_column].sum().reset_index()
+                grouped_data = self._group_sum(data, [x_column, color_column], y_column)
             else:
-                grouped_data = data.groupby(x_column)[y_column].sum().reset_index()
+                grouped_data = self._group_sum(data, x_column, y_column)
             
             fig = px.bar(
                 grouped_data,
@@ -52,10 +88,16 @@ class ChartGenerator:
         
         return fig
     
-    def create_line_chart(self, x_column, y_column, color_column=None, data=None):
-        """Create an interactive line chart"""
+    def create_line_chart(self, x_column, y_column, color_column=None, data=None, time_bucket=None, agg="sum"):
+        """Create an interactive line chart, optionally aggregated per time bucket of a date x-axis"""
         if data is None:
             data = self.data
+
+        if time_bucket:
+            # One point per bucket (and color) instead of one per row
+            data = self.backend.time_buckets(data, x_column, y_column, time_bucket, agg, color_column)
+            if agg in ("sum", "count"):
+                data = self._scaled(data, [y_column])
         
         fig = px.line(
             data,
@@ -121,10 +163,11 @@ class ChartGenerator:
         if value_column is None:
             pie_data = data[category_column].value_counts().reset_index()
             pie_data.columns = [category_column, 'count']
+            pie_data = self._scaled(pie_data, ['count'])
             value_col = 'count'
         else:
             # Aggregate by category column
-            pie_data = data.groupby(category_column)[value_column].sum().reset_index()
+            pie_data = self._group_sum(data, category_column, value_column)
             value_col = value_column
         
         fig = px.pie(
@@ -140,24 +183,28 @@ class ChartGenerator:
         
         return fig
     
-    def create_histogram(self, column, bins=30, data=None):
-        """Create a histogram"""
+    def create_histogram(self, column, bins=30, data=None, value_range=None, log_bins=False):
+        """Create a histogram from server-side bins (count, rule name or date frequency)"""
         if data is None:
             data = self.data
-        
-        fig = px.histogram(
-            data,
-            x=column,
-            nbins=bins,
-            title=f"Distribution of {column}",
-            labels={column: column.replace('_', ' ').title()}
-        )
-        
+
+        # Bin here rather than in the browser so only one bar per bin is sent
+        trace = self.histogram_engine.create_histogram_trace(data, column, bins, value_range, log_bins,
+                                                             backend=self.backend)
+        if self.sample_scale is not None:
+            trace.y = np.round(np.asarray(trace.y) * self.sample_scale)
+
+        fig = go.Figure(trace)
         fig.update_layout(
+            title=f"Distribution of {column}",
+            xaxis_title=column.replace('_', ' ').title(),
+            yaxis_title="Count",
             height=500,
             bargap=0.1
         )
-        
+        if log_bins:
+            fig.update_xaxes(type="log")
+
         return fig
     
     def create_box_plot(self, x_column, y_column, color_column, data=None):
@@ -182,18 +229,18 @@ class ChartGenerator:
         
         return fig
     
-    def create_heatmap(self, data=None, columns=None):
+    def create_heatmap(self, data=None, columns=None, method="pearson", cluster=False, max_columns=None):
         """Create a correlation heatmap for numeric columns"""
         if data is None:
             data = self.data
         
         # Select only numeric columns
-        numeric_data = data.select_dtypes(include=[np.number])
+        numeric_columns = list(data.select_dtypes(include=[np.number]).columns)
         
         if columns:
-            numeric_data = numeric_data[columns]
+            numeric_columns = [col for col in numeric_columns if col in columns]
         
-        if numeric_data.empty:
+        if not numeric_columns:
             # Create empty figure with message
             fig = go.Figure()
             fig.add_annotation(
@@ -204,21 +251,34 @@ class ChartGenerator:
             )
             return fig
         
-        # Calculate correlation matrix
-        corr_matrix = numeric_data.corr()
+        # Calculate correlation matrix (streamed in chunks and cached per dataset)
+        corr_matrix = self.correlation_engine.correlation(data, numeric_columns, method)
+        
+        # Wide datasets: keep only the most strongly related columns so the heatmap stays readable
+        corr_matrix = self.correlation_engine.reduce_columns(corr_matrix, max_columns)
+        
+        if cluster:
+            order = self.correlation_engine.cluster_order(corr_matrix)
+            corr_matrix = corr_matrix.loc[order, order]
         
         fig = px.imshow(
             corr_matrix,
-            title="Correlation Heatmap",
+            title=f"Correlation Heatmap ({method.title()})",
             aspect="auto",
             color_continuous_scale="RdBu",
             zmin=-1, zmax=1
         )
         
-        fig.update_layout(height=500)
+        fig.update_layout(height=max(500, min(len(corr_matrix) * 12, 1600)))
         
         return fig
     
+    def get_strongest_correlations(self, k=10, data=None, columns=None, method="pearson"):
+        """Return the k most strongly correlated column pairs"""
+        if data is None:
+            data = self.data
+        return self.correlation_engine.strongest_pairs(data, k, columns, method)
+    
     def create_multi_line_chart(self, x_column, y_columns, data=None):
         """Create a multi-line chart for comparing multiple variables"""
         if data is None:
@@ -311,18 +371,20 @@ class ChartGenerator:
         
         return fig
     
-    def create_top_n_chart(self, category_column, value_column, n=10, chart_type="bar", data=None, color_column=None):
-        """Create a chart showing top N items by value"""
+    def create_top_n_chart(self, category_column, value_column, n=10, chart_type="bar", data=None, color_column=None,
+                           by="sum", include_other=False, group_column=None):
+        """Create a chart showing top N items by value (ranked by sum, mean or count, optionally per group)"""
         if data is None:
             data = self.data
         
         # Aggregate data by category and get top N
         if category_column in data.columns and value_column in data.columns:
-            # Group by category and sum values
-            grouped_data = data.groupby(category_column)[value_column].sum().reset_index()
-            
-            # Sort by value and get top N
-            top_data = grouped_data.nlargest(n, value_column)
+            # Aggregated vector is cached, so changing n or chart type does not regroup
+            top_data = self.top_n(data, category_column, value_column, n, by=by, group_column=group_column,
+                                  include_other=include_other)
+            value_column = self.top_n_engine.value_label(value_column, by)
+            if group_column and not color_column:
+                color_column = group_column
 
             # Only use color_column if it's in the top_data columns
             if color_column and color_column in top_data.columns:
@@ -392,3 +454,40 @@ class ChartGenerator:
                 font=dict(size=16)
             )
             return fig
+
+    def create_outlier_chart(self, column, outlier_positions, data=None, max_points=20000, method_label="Outliers"):
+        """Scatter a column by row position with flagged outliers highlighted (WebGL, sampled inliers)"""
+        if data is None:
+            data = self.data
+
+        values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        outlier_positions = np.asarray(outlier_positions, dtype='int64')
+        flagged = np.zeros(len(values), dtype=bool)
+        flagged[outlier_positions] = True
+        inliers = np.flatnonzero(~flagged & ~np.isnan(values))
+        if len(inliers) > max_points:
+            # Inliers only give context; a fixed sample keeps the figure (and its cache key) stable
+            inliers = np.sort(np.random.default_rng(0).choice(inliers, max_points, replace=False))
+        # Counted before trimming, so the title reports every flagged row
+        total_outliers = len(outlier_positions)
+        outlier_positions = outlier_positions[:max_points]
+        shown = "" if total_outliers <= max_points else f" (first {max_points:,} plotted)"
+
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(
+            x=inliers, y=values[inliers], mode='markers', name="Normal",
+            marker=dict(size=4, color='lightgray')
+        ))
+        fig.add_trace(go.Scattergl(
+            x=outlier_positions, y=values[outlier_positions], mode='markers', name=method_label,
+            marker=dict(size=7, color='crimson'),
+            text=[str(label) for label in data.index.take(outlier_positions)],
+            hovertemplate="Row %{text}<br>" + column + ": %{y}<extra></extra>"
+        ))
+        fig.update_layout(
+            title=f"{column.replace('_', ' ').title()}: {total_outliers:,} {method_label.lower()}{shown}",
+            xaxis_title="Row",
+            yaxis_title=column.replace('_', ' ').title(),
+            height=500
+        )
+        return fig
@@ -0,0 +1,408 @@
+import math
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.data_loader import data_loader
+
+DEFAULT_CHUNK_ROWS = 250_000
+# Grouped partials are folded together once this many chunks are pending
+GROUP_MERGE_EVERY = 8
+
+
+class _Partial:
+    """Mergeable NaN-skipping aggregate state: sum, non-null count, rows, min, max and M2 (for std)"""
+
+    def __init__(self):
+        self.sums = []
+        self.count = 0
+        self.rows = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64').ravel()
+        self.rows += len(values)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+        chunk_sum = float(values.sum())
+        chunk_mean = chunk_sum / n
+        with np.errstate(invalid='ignore'):
+            # inf values make the variance NaN, as they do in pandas
+            chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        # Chan et al. parallel variance merge
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        self.sums.append(chunk_sum)
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+
+    def result(self, kind):
+        total = math.fsum(self.sums)
+        if kind == 'sum':
+            return total
+        if kind == 'count':
+            return self.rows
+        if kind == 'mean':
+            return total / self.count if self.count else np.nan
+        if kind == 'std':
+            return math.sqrt(self.m2 / self.count) if self.count else np.nan
+        if kind == 'min':
+            return self.min
+        if kind == 'max':
+            return self.max
+        raise ValueError(f"Unsupported aggregate: {kind}")
+
+
+def _value(item, env):
+    return item.evaluate(env) if isinstance(item, _Expr) else item
+
+
+class _Expr:
+    """Element-wise expression over the mapped columns, evaluated one chunk at a time"""
+
+    def __init__(self, evaluate, aggregates=(), uses_columns=True):
+        self.evaluate = evaluate
+        self.aggregates = set(aggregates)
+        self.uses_columns = uses_columns
+
+    @staticmethod
+    def combine(function, *items):
+        aggregates = set()
+        uses_columns = False
+        for item in items:
+            if isinstance(item, _Expr):
+                aggregates |= item.aggregates
+                uses_columns = uses_columns or item.uses_columns
+        return _Expr(lambda env: function(*[_value(item, env) for item in items]), aggregates, uses_columns)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__':
+            return NotImplemented
+        return _Expr.combine(lambda *values: ufunc(*values, **kwargs), *inputs)
+
+    def __abs__(self):
+        return _Expr.combine(abs, self)
+
+    def __neg__(self):
+        return _Expr.combine(operator.neg, self)
+
+    def __round__(self, ndigits=None):
+        return _Expr.combine(lambda value: np.round(value, ndigits or 0), self)
+
+    __hash__ = object.__hash__
+
+
+def _binary(op, reflected=False):
+    if reflected:
+        return lambda self, other: _Expr.combine(op, other, self)
+    return lambda self, other: _Expr.combine(op, self, other)
+
+
+for _name, _op in [('add', operator.add), ('sub', operator.sub), ('mul', operator.mul),
+                   ('truediv', operator.truediv), ('floordiv', operator.floordiv),
+                   ('mod', operator.mod), ('pow', operator.pow)]:
+    setattr(_Expr, f'__{_name}__', _binary(_op))
+    setattr(_Expr, f'__r{_name}__', _binary(_op, reflected=True))
+for _name, _op in [('lt', operator.lt), ('le', operator.le), ('gt', operator.gt),
+                   ('ge', operator.ge), ('eq', operator.eq), ('ne', operator.ne)]:
+    setattr(_Expr, f'__{_name}__', _binary(_op))
+
+
+class _Aggregate(_Expr):
+    """sum()/mean()/... of an expression: resolved by a streaming pass, then used as a scalar"""
+
+    def __init__(self, kind, argument):
+        self.kind = kind
+        self.argument = argument
+        self.resolved = None
+        super().__init__(self._resolved_value, argument.aggregates | {self}, uses_columns=False)
+
+    def _resolved_value(self, env):
+        if self.resolved is None:
+            raise RuntimeError("Aggregate used before it was computed")
+        return self.resolved
+
+
+class ChunkedKPIEngine:
+    """Computes KPIs by streaming a dataset in fixed-size chunks (Parquet, Arrow/Feather, CSV or a frame).
+
+    Only one chunk is in memory at a time; every KPI is built from mergeable partial aggregates, so
+    results equal KPICalculator's up to floating-point summation order."""
+
+    def __init__(self, source, name=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress_callback=None):
+        self.source = source
+        self.name = name or (os.fspath(source) if isinstance(source, (str, os.PathLike)) else None)
+        self.chunk_rows = chunk_rows
+        # Used by every calculation that is not given its own callback(fraction, message)
+        self.progress_callback = progress_callback
+
+    @property
+    def num_rows(self):
+        """Row count from file metadata (None for CSV, which is only known after a full pass)"""
+        if isinstance(self.source, (pd.DataFrame, pa.Table)):
+            return len(self.source)
+        file_format, _ = data_loader.detect_format(self.name)
+        if file_format == 'parquet':
+            return pq.ParquetFile(self.source).metadata.num_rows
+        if file_format == 'arrow':
+            return sum(batch.num_rows for batch in self._arrow_batches(None))
+        return None
+
+    def _arrow_batches(self, columns):
+        source = pa.memory_map(os.fspath(self.source), 'r')
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            batches = iter(pa.ipc.open_stream(source))
+        for batch in batches:
+            yield batch.select(columns) if columns else batch
+
+    def iter_chunks(self, columns=None):
+        """Yield DataFrames of at most chunk_rows rows holding only the requested columns"""
+        columns = list(dict.fromkeys(columns)) if columns else None
+        if isinstance(self.source, pd.DataFrame):
+            frame = self.source[columns] if columns else self.source
+            for start in range(0, len(frame), self.chunk_rows):
+                yield frame.iloc[start:start + self.chunk_rows]
+            return
+        if isinstance(self.source, pa.Table):
+            table = self.source.select(columns) if columns else self.source
+            for start in range(0, table.num_rows, self.chunk_rows):
+                yield table.slice(start, self.chunk_rows).to_pandas()
+            return
+
+        file_format, compression = data_loader.detect_format(self.name)
+        if file_format == 'parquet':
+            parquet_file = pq.ParquetFile(self.source, memory_map=True)
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_rows, columns=columns):
+                yield batch.to_pandas()
+        elif file_format == 'arrow':
+            # Memory-mapped: slicing a record batch is zero-copy, only the converted chunk is resident
+            for batch in self._arrow_batches(columns):
+                for start in range(0, batch.num_rows, self.chunk_rows):
+                    yield batch.slice(start, self.chunk_rows).to_pandas()
+        else:
+            with data_loader.open_csv(self.source, compression) as stream:
+                yield from pd.read_csv(stream, usecols=columns, chunksize=self.chunk_rows)
+
+    def _stream(self, columns, progress_callback=None, message="Processing"):
+        progress_callback = progress_callback or self.progress_callback
+        total = self.num_rows if progress_callback is not None else None
+        done = 0
+        for chunk in self.iter_chunks(columns):
+            yield chunk
+            done += len(chunk)
+            if progress_callback is not None:
+                fraction = min(done / total, 1.0) if total else 0.0
+                progress_callback(fraction, f"{message}: {done:,} rows")
+
+    def calculate_basic_kpis(self, columns, progress_callback=None):
+        """Sum and mean per numeric column (same structure as KPICalculator.calculate_basic_kpis)"""
+        sums = {}
+        counts = {}
+        numeric = None
+        for chunk in self._stream(columns, progress_callback, "Basic KPIs"):
+            if numeric is None:
+                numeric = [col for col in columns if pd.api.types.is_numeric_dtype(chunk[col])]
+                sums = {col: [] for col in numeric}
+                counts = {col: 0 for col in numeric}
+            for col in numeric:
+                sums[col].append(chunk[col].sum())
+                counts[col] += int(chunk[col].count())
+
+        results = {}
+        for col in numeric or []:
+            parts = sums[col]
+            if parts and all(isinstance(part, (int, np.integer)) for part in parts):
+                total = np.int64(sum(int(part) for part in parts))
+            else:
+                total = np.float64(math.fsum(parts))
+            results[col] = {
+                'sum': total,
+                'mean': np.float64(total / counts[col]) if counts[col] else np.nan
+            }
+        return results
+
+    def calculate_grouped_kpis(self, kpi_columns, group_by_col, progress_callback=None):
+        """Per-group sum and mean, merged from per-chunk partial sums and counts"""
+        pending = []
+        merged = None
+
+        def fold(parts):
+            return pd.concat(parts).groupby(level=0, sort=False).sum()
+
+        for chunk in self._stream([group_by_col] + list(kpi_columns), progress_callback, "Grouped KPIs"):
+            grouped = chunk.groupby(group_by_col, sort=False)[list(kpi_columns)]
+            partial = grouped.sum().join(grouped.count(), rsuffix='__count')
+            pending.append(partial)
+            if len(pending) >= GROUP_MERGE_EVERY:
+                merged = fold(([merged] if merged is not None else []) + pending)
+                pending = []
+        if pending or merged is None:
+            parts = ([merged] if merged is not None else []) + pending
+            if not parts:
+                return pd.DataFrame(columns=[f"{col}_{agg}" for col in kpi_columns for agg in ('sum', 'mean')])
+            merged = fold(parts)
+
+        result = {}
+        for col in kpi_columns:
+            result[f"{col}_sum"] = merged[col]
+            result[f"{col}_mean"] = merged[col] / merged[f"{col}__count"].where(merged[f"{col}__count"] > 0)
+        result = pd.DataFrame(result).sort_index()
+        result.index.name = group_by_col
+        return result
+
+    def calculate_data_quality(self, progress_callback=None):
+        """Completeness and unique-row ratio (percent) from per-chunk null counts and 64-bit row hashes.
+
+        Only the distinct row hashes are kept (8 bytes per distinct row), folded every few chunks."""
+        nulls = cells = rows = 0
+        hashes = []
+        for chunk in self._stream(None, progress_callback, "Data quality"):
+            nulls += int(chunk.isnull().to_numpy().sum())
+            cells += chunk.size
+            rows += len(chunk)
+            hashes.append(np.unique(pd.util.hash_pandas_object(chunk, index=False).to_numpy()))
+            if len(hashes) >= GROUP_MERGE_EVERY:
+                hashes = [np.unique(np.concatenate(hashes))]
+        distinct = len(np.unique(np.concatenate(hashes))) if hashes else 0
+        return {
+            'completeness': (1 - nulls / cells) * 100 if cells else 100.0,
+            'unique_ratio': distinct / rows * 100 if cells else 100.0
+        }
+
+    def calculate_growth_rate(self, column, date_column, progress_callback=None):
+        """Growth from the earliest to the latest dated value, tracked across chunks"""
+        try:
+            first = last = None
+            for chunk in self._stream([date_column, column], progress_callback, "Growth rate"):
+                df = chunk[[date_column, column]].copy()
+                df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
+                df = df.dropna()
+                if df.empty:
+                    continue
+                lo = df[date_column].idxmin()
+                hi = df.loc[::-1, date_column].idxmax()
+                if first is None or df.at[lo, date_column] < first[0]:
+                    first = (df.at[lo, date_column], df.at[lo, column])
+                if last is None or df.at[hi, date_column] >= last[0]:
+                    last = (df.at[hi, date_column], df.at[hi, column])
+            if first is None or first[1] == 0:
+                return 0
+            return ((last[1] - first[1]) / abs(first[1])) * 100
+        except Exception:
+            return 0
+
+    def calculate_custom_kpi(self, formula, column_mapping, progress_callback=None):
+        """Evaluate a KPI formula out of core; returns the same dict shape as KPICalculator"""
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self._custom_kpi(formula, column_mapping, progress_callback)
+        except Exception as e:
+            return {
+                'error': str(e),
+                'value': 0,
+                'type': 'error'
+            }
+
+    def _custom_kpi(self, formula, column_mapping, progress_callback):
+        columns = list(dict.fromkeys(column_mapping.values()))
+        context = {
+            'sqrt': lambda value: np.sqrt(value) if isinstance(value, _Expr) else math.sqrt(value),
+            'abs': abs,
+            'round': round,
+            'np': np,
+            'math': math
+        }
+        originals = {'sum': np.sum, 'mean': np.mean, 'std': np.std, 'min': np.min, 'max': np.max, 'count': len}
+        for kind, original in originals.items():
+            context[kind] = self._aggregate_function(kind, original)
+        context['median'] = self._unsupported('median')
+        for alias, column_name in column_mapping.items():
+            context[alias] = _Expr(lambda env, alias=alias: env[alias])
+
+        result = eval(formula, {"__builtins__": {}}, context)
+        if not isinstance(result, _Expr):
+            return {'value': float(result), 'type': 'scalar'}
+
+        self._resolve(result.aggregates, column_mapping, columns, progress_callback)
+        if not result.uses_columns:
+            return {'value': float(result.evaluate({})), 'type': 'scalar'}
+
+        # Element-wise result: summarise it the way KPICalculator does for series
+        summary = _Partial()
+        for env in self._environments(column_mapping, columns, progress_callback, "Custom KPI"):
+            summary.update(np.broadcast_to(result.evaluate(env), (len(next(iter(env.values()))),)))
+        return {
+            'value': float(summary.result('mean')),
+            'sum': float(summary.result('sum')),
+            'count': summary.result('count'),
+            'min': float(summary.result('min')),
+            'max': float(summary.result('max')),
+            'type': 'series'
+        }
+
+    def get_available_functions(self):
+        """Functions usable in out-of-core formulas (median needs the whole column)"""
+        return {
+            'Mathematical': ['sum()', 'mean()', 'std()', 'min()', 'max()', 'count()', 'sqrt()', 'abs()', 'round()'],
+            'Operators': ['+', '-', '*', '/', '**', '%'],
+            'Comparisons': ['>', '<', '>=', '<=', '==', '!='],
+            'Examples': [
+                'sum(sales) / count(sales)',
+                '(revenue - costs) / revenue * 100',
+                'sqrt(sum(quantity ** 2))',
+                'mean(price) * 1.2'
+            ]
+        }
+
+    def _aggregate_function(self, kind, original):
+        def aggregate(value, *args, **kwargs):
+            if isinstance(value, _Expr):
+                if args or kwargs:
+                    raise ValueError(f"{kind}() takes only a column expression in out-of-core mode")
+                if not value.uses_columns:
+                    # Aggregate of scalars only: compute once its inputs are known
+                    return _Expr.combine(original, value)
+                return _Aggregate(kind, value)
+            return original(value, *args, **kwargs)
+        return aggregate
+
+    def _unsupported(self, kind):
+        def aggregate(*args, **kwargs):
+            raise ValueError(f"{kind}() needs the whole column in memory; switch off out-of-core mode")
+        return aggregate
+
+    def _environments(self, column_mapping, columns, progress_callback, message):
+        for chunk in self._stream(columns, progress_callback, message):
+            yield {alias: pd.to_numeric(chunk[column], errors='coerce').fillna(0).to_numpy()
+                   for alias, column in column_mapping.items()}
+
+    def _resolve(self, aggregates, column_mapping, columns, progress_callback):
+        """One streaming pass per nesting level resolves every aggregate whose inputs are known"""
+        unresolved = set(aggregates)
+        passes = 0
+        while unresolved:
+            ready = [agg for agg in unresolved if not (agg.argument.aggregates & unresolved)]
+            partials = {agg: _Partial() for agg in ready}
+            passes += 1
+            for env in self._environments(column_mapping, columns, progress_callback, f"Custom KPI pass {passes}"):
+                rows = len(next(iter(env.values())))
+                for agg, partial in partials.items():
+                    partial.update(np.broadcast_to(agg.argument.evaluate(env), (rows,)))
+            for agg, partial in partials.items():
+                agg.resolved = partial.result(agg.kind)
+            unresolved -= set(ready)
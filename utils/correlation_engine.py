@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+CORRELATION_METHODS = ['pearson', 'spearman']
+
+
+class CorrelationEngine:
+    """Computes correlation matrices chunk by chunk from pairwise sufficient statistics"""
+
+    def __init__(self, chunk_size=100_000, max_bytes=128 * 1024 * 1024):
+        self.chunk_size = chunk_size
+        # (fingerprint, columns, method) -> (correlation matrix, pairwise observation counts)
+        self._matrices = LRUCache(max_bytes=max_bytes)
+
+    def correlation(self, data, columns=None, method='pearson'):
+        """Return the correlation matrix as a DataFrame, cached per dataset fingerprint"""
+        return self._compute(data, columns, method)[0]
+
+    def observations(self, data, columns=None, method='pearson'):
+        """Return the number of rows where both columns of each pair are present"""
+        return self._compute(data, columns, method)[1]
+
+    def _compute(self, data, columns, method):
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Unsupported correlation method: {method}")
+        if columns is None:
+            columns = list(data.select_dtypes(include=[np.number]).columns)
+        key = (dataset_fingerprint(data), tuple(columns), method)
+        return self._matrices.get_or_compute(key, lambda: self._stream(data, list(columns), method))
+
+    def _stream(self, data, columns, method):
+        p = len(columns)
+        n_pairs = np.zeros((p, p))
+        sum_x = np.zeros((p, p))    # sum_x[i, j]: sum of column i over rows where j is also present
+        sum_xx = np.zeros((p, p))
+        sum_xy = np.zeros((p, p))
+        shift = None
+
+        source = data[columns]
+        if method == 'spearman':
+            # Ranks are taken per column, so results match pandas exactly when nothing is missing
+            source = source.rank(method='average')
+
+        for start in range(0, len(source), self.chunk_size):
+            chunk = source.iloc[start:start + self.chunk_size].to_numpy(dtype='float64', na_value=np.nan)
+            present = ~np.isnan(chunk)
+            if shift is None:
+                # Shifting by a rough mean keeps the raw-moment sums numerically stable
+                shift = np.where(present, chunk, 0.0).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+            values = np.where(present, chunk - shift, 0.0)
+            mask = present.astype('float64')
+
+            n_pairs += mask.T @ mask
+            sum_x += values.T @ mask
+            sum_xx += (values * values).T @ mask
+            sum_xy += values.T @ values
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = sum_xy - sum_x * sum_x.T / n_pairs
+            var_x = sum_xx - sum_x * sum_x / n_pairs
+            var_y = var_x.T
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[n_pairs < 2] = np.nan
+
+        return (pd.DataFrame(corr, index=columns, columns=columns),
+                pd.DataFrame(n_pairs.astype('int64'), index=columns, columns=columns))
+
+    def strongest_pairs(self, data, k=10, columns=None, method='pearson'):
+        """Return the k column pairs with the largest absolute correlation"""
+        corr = self.correlation(data, columns, method)
+        counts = self.observations(data, columns, method)
+        rows, cols = np.triu_indices(len(corr), k=1)
+        values = corr.to_numpy()[rows, cols]
+        strength = np.nan_to_num(np.abs(values), nan=-1.0)
+
+        if 0 < k < len(strength):
+            top = np.argpartition(-strength, k - 1)[:k]
+        else:
+            top = np.arange(len(strength))
+        top = top[np.argsort(-strength[top], kind='stable')]
+        top = top[strength[top] >= 0]
+
+        return pd.DataFrame({
+            'column_1': corr.index[rows[top]],
+            'column_2': corr.columns[cols[top]],
+            'correlation': values[top],
+            'observations': counts.to_numpy()[rows[top], cols[top]]
+        })
+
+    def cluster_order(self, corr):
+        """Order columns by average-linkage clustering on 1 - |r| so related columns sit together"""
+        distance = 1.0 - np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+        p = len(distance)
+        if p < 3:
+            return list(corr.columns)
+
+        np.fill_diagonal(distance, np.inf)
+        sizes = np.ones(p)
+        members = [[i] for i in range(p)]
+        active = np.ones(p, dtype=bool)
+
+        for _ in range(p - 1):
+            a, b = np.unravel_index(np.argmin(distance), distance.shape)
+            if a > b:
+                a, b = b, a
+            merged = (sizes[a] * distance[a] + sizes[b] * distance[b]) / (sizes[a] + sizes[b])
+            distance[a, :] = merged
+            distance[:, a] = merged
+            distance[a, a] = np.inf
+            distance[b, :] = np.inf
+            distance[:, b] = np.inf
+            sizes[a] += sizes[b]
+            members[a] = members[a] + members[b]
+            active[b] = False
+
+        root = int(np.flatnonzero(active)[0])
+        return [corr.columns[i] for i in members[root]]
+
+    def reduce_columns(self, corr, max_columns):
+        """Keep the max_columns columns with the strongest correlation to any other column"""
+        if max_columns is None or len(corr) <= max_columns:
+            return corr
+        strength = np.nan_to_num(np.abs(corr.to_numpy(copy=True)), nan=-1.0)
+        np.fill_diagonal(strength, -1.0)
+        best = strength.max(axis=1)
+        keep = np.sort(np.argpartition(-best, max_columns - 1)[:max_columns])
+        return corr.iloc[keep, keep]
+
+
+# Shared engine so cached matrices survive Streamlit reruns
+correlation_engine = CorrelationEngine()
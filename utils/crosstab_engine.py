@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+from utils.top_n_engine import _top_indices
+
+CROSSTAB_STATS = ['sum', 'count', 'mean']
+
+
+def _factorize(series):
+    """(codes, labels) for a dimension; categoricals reuse their own codes"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype('int64'), pd.Index(series.cat.categories)
+    codes, labels = pd.factorize(series)
+    return codes.astype('int64'), pd.Index(labels)
+
+
+def _stat(sums, counts, stat):
+    if stat == 'sum':
+        return sums
+    if stat == 'count':
+        return counts
+    if stat == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+    raise ValueError(f"Unsupported cross-tab statistic: {stat}")
+
+
+class SparseCrossTab:
+    """Two-dimension KPI table stored as CSR over the populated (row, column) cells only.
+
+    Memory is proportional to the number of populated cells; dense frames are produced only for a
+    requested window of rows and columns."""
+
+    def __init__(self, row_column, column_column, value_column, row_labels, column_labels,
+                 indptr, cell_columns, sums, counts):
+        self.row_column = row_column
+        self.column_column = column_column
+        self.value_column = value_column
+        self.row_labels = row_labels
+        self.column_labels = column_labels
+        # Cells of row r are indptr[r]:indptr[r + 1], sorted by column code
+        self.indptr = indptr
+        self.cell_columns = cell_columns
+        self.sums = sums
+        self.counts = counts
+
+    @property
+    def n_rows(self):
+        return len(self.row_labels)
+
+    @property
+    def n_columns(self):
+        return len(self.column_labels)
+
+    @property
+    def nnz(self):
+        return len(self.cell_columns)
+
+    @property
+    def density(self):
+        cells = self.n_rows * self.n_columns
+        return self.nnz / cells if cells else 0.0
+
+    @property
+    def nbytes(self):
+        arrays = [self.indptr, self.cell_columns, self.sums, self.counts]
+        return (sum(array.nbytes for array in arrays)
+                + self.row_labels.memory_usage() + self.column_labels.memory_usage())
+
+    def cell_rows(self):
+        """Row code of every populated cell (COO form)"""
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+    def row_totals(self, stat='sum'):
+        rows = self.cell_rows()
+        sums = np.bincount(rows, weights=self.sums, minlength=self.n_rows)
+        counts = np.bincount(rows, weights=self.counts, minlength=self.n_rows)
+        return _stat(sums, counts, stat)
+
+    def column_totals(self, stat='sum'):
+        sums = np.bincount(self.cell_columns, weights=self.sums, minlength=self.n_columns)
+        counts = np.bincount(self.cell_columns, weights=self.counts, minlength=self.n_columns)
+        return _stat(sums, counts, stat)
+
+    def top_rows(self, k=None, stat='sum'):
+        """Row codes ordered by their total, largest first; k trims to the top k"""
+        return _top_indices(self.row_totals(stat), self.n_rows if k is None else k)
+
+    def top_columns(self, k=None, stat='sum'):
+        return _top_indices(self.column_totals(stat), self.n_columns if k is None else k)
+
+    def _row_cells(self, rows):
+        """Indices of the populated cells of the given rows, gathered straight from the CSR offsets"""
+        starts = self.indptr[rows]
+        lengths = self.indptr[np.asarray(rows) + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return np.arange(lengths.sum()) + offsets, np.repeat(np.arange(len(rows)), lengths)
+
+    def window(self, rows, columns, stat='sum', fill_value=np.nan):
+        """Dense frame for the given row and column codes (in that order); empty cells get fill_value"""
+        rows = np.asarray(rows, dtype='int64')
+        columns = np.asarray(columns, dtype='int64')
+        cells, row_positions = self._row_cells(rows)
+        column_positions = np.full(self.n_columns, -1, dtype='int64')
+        column_positions[columns] = np.arange(len(columns))
+        positions = column_positions[self.cell_columns[cells]]
+        visible = positions >= 0
+        cells = cells[visible]
+
+        dense = np.full((len(rows), len(columns)), fill_value, dtype='float64')
+        dense[row_positions[visible], positions[visible]] = _stat(self.sums[cells], self.counts[cells], stat)
+        return pd.DataFrame(
+            dense,
+            index=pd.Index(self.row_labels.take(rows), name=self.row_column),
+            columns=pd.Index(self.column_labels.take(columns), name=self.column_column)
+        )
+
+    def to_long(self):
+        """Every populated cell as one row: both labels, sum, count and mean"""
+        frame = pd.DataFrame({
+            self.row_column: self.row_labels.take(self.cell_rows()),
+            self.column_column: self.column_labels.take(self.cell_columns),
+            'sum': self.sums,
+            'count': self.counts.astype('int64'),
+        })
+        frame['mean'] = _stat(self.sums, self.counts, 'mean')
+        return frame
+
+
+class CrossTabEngine:
+    """Builds sparse cross-tabs from factorized codes, caching them per dataset"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self._tables = LRUCache(max_bytes=max_bytes, sizeof=lambda table: table.nbytes)
+
+    def crosstab(self, data, row_column, column_column, value_column=None):
+        """Sparse cross-tab of value_column (or of row counts when None) over two dimensions"""
+        key = (dataset_fingerprint(data), row_column, column_column, value_column)
+        return self._tables.get_or_compute(
+            key, lambda: self._build(data, row_column, column_column, value_column)
+        )
+
+    def _build(self, data, row_column, column_column, value_column):
+        row_codes, row_labels = _factorize(data[row_column])
+        column_codes, column_labels = _factorize(data[column_column])
+        valid = (row_codes >= 0) & (column_codes >= 0)
+        if value_column is None:
+            values = np.ones(int(valid.sum()), dtype='float64')
+        else:
+            values = pd.to_numeric(data[value_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            values = values[valid]
+
+        # One int64 key per row; sorted unique keys are the CSR cells in (row, column) order
+        keys = row_codes[valid] * max(len(column_labels), 1) + column_codes[valid]
+        cell_ids, cell_keys = pd.factorize(keys, sort=True)
+        cell_keys = np.asarray(cell_keys, dtype='int64')
+        n_cells = len(cell_keys)
+        present = ~np.isnan(values)
+        sums = np.bincount(cell_ids[present], weights=values[present], minlength=n_cells)
+        counts = np.bincount(cell_ids[present], minlength=n_cells).astype('float64')
+
+        cell_rows = cell_keys // max(len(column_labels), 1)
+        indptr = np.zeros(len(row_labels) + 1, dtype='int64')
+        np.cumsum(np.bincount(cell_rows, minlength=len(row_labels)), out=indptr[1:])
+        return SparseCrossTab(
+            row_column, column_column, value_column, row_labels, column_labels,
+            indptr, cell_keys % max(len(column_labels), 1), sums, counts
+        )
+
+
+# Shared engine so cross-tabs survive Streamlit reruns
+crosstab_engine = CrossTabEngine()
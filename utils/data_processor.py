@@ -16,7 +16,18 @@ class DataProcessor:
                 analysis["numeric_columns"].append(col)
             elif pd.api.types.is_datetime64_any_dtype(self.data[col]):
                 analysis["date_columns"].append(col)
-            elif pd.api.types.is_string_dtype(self.data[col]):
+            elif pd.api.types.is_string_dtype(self.data[col]) or isinstance(self.data[col].dtype, pd.CategoricalDtype):
                 analysis["text_columns"].append(col)
 
         return analysis
+
+    def profile(self):
+        """Per-column summary shown after upload: counts and means, date ranges, distinct values, missing values"""
+        analysis = self.analyze_data()
+        return {
+            "numeric": {col: (int(self.data[col].count()), self.data[col].mean())
+                        for col in analysis["numeric_columns"]},
+            "dates": {col: (self.data[col].min(), self.data[col].max()) for col in analysis["date_columns"]},
+            "unique": {col: int(self.data[col].nunique()) for col in analysis["text_columns"]},
+            "missing": self.data.isnull().sum()
+        }
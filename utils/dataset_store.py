@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import pyarrow as pa
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kpi_chart_datasets")
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(source, *parts):
+    """Content hash of an uploaded file (or bytes, or a list of either) plus anything that changes how it is loaded"""
+    digest = hashlib.blake2b(digest_size=20)
+    for item in (source if isinstance(source, (list, tuple)) else [source]):
+        digest.update(item.getbuffer() if hasattr(item, 'getbuffer') else bytes(item))
+        digest.update(b"\0")
+    for part in parts:
+        digest.update(b"\0" + repr(part).encode())
+    return digest.hexdigest()
+
+
+class DatasetHandle:
+    """A session's reference to a stored dataset; the reference is released when the handle is dropped"""
+
+    def __init__(self, store, key, data):
+        self.key = key
+        self.data = data
+        self._release = weakref.finalize(self, store.release, key)
+
+    def release(self):
+        self._release()
+
+
+class DatasetStore:
+    """Process-wide, content-addressed store of immutable datasets shared by every session.
+
+    Frames are persisted once as uncompressed Arrow IPC files and served memory-mapped, so each
+    distinct dataset is parsed once and its numeric columns live in the page cache, not per session.
+    Unreferenced datasets are evicted (memory first, then disk) once the byte budgets are exceeded."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3, max_disk_bytes=8 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        # key -> {'data', 'size', 'refs'}, least recently used first
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+
+    def acquire(self, key, build):
+        """Return a DatasetHandle for key, calling build() -> DataFrame only if no session has loaded it"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry['refs'] += 1
+                    self._entries.move_to_end(key)
+                    return DatasetHandle(self, key, entry['data'])
+                event = self._building.get(key)
+                if event is None:
+                    event = self._building[key] = threading.Event()
+                    break
+            # Another session is loading the same file: wait and share its result
+            event.wait()
+
+        try:
+            data, size = self._load(key, build)
+            with self._lock:
+                self._entries[key] = {'data': data, 'size': size, 'refs': 1}
+                self._evict()
+            return DatasetHandle(self, key, data)
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+            event.set()
+
+    def _load(self, key, build):
+        """Map the dataset from the cache directory, writing it there first if needed"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            data = build()
+            try:
+                self._write(path, data)
+            except (OSError, pa.ArrowException) as e:
+                # No usable cache directory, or columns Arrow cannot type (e.g. mixed ints and strings):
+                # keep the in-memory frame
+                logger.warning("Dataset cache write failed, keeping the dataset in memory: %s", e)
+                return data, int(data.memory_usage(deep=True).sum())
+        source = pa.memory_map(path, 'r')
+        table = pa.ipc.open_file(source).read_all()
+        # Numeric columns stay views over the mapped file; strings are materialized once
+        data = table.to_pandas(split_blocks=True)
+        return data, os.path.getsize(path)
+
+    def _write(self, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        table = pa.Table.from_pandas(data)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._trim_disk(keep=path)
+
+    def path(self, key):
+        """Cached Arrow file for a dataset, or None when it only lives in memory"""
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['refs'] = max(entry['refs'] - 1, 0)
+                self._evict()
+
+    def _evict(self):
+        """Drop unreferenced datasets, least recently used first, until memory is within budget"""
+        total = sum(entry['size'] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry['refs'] == 0:
+                total -= entry['size']
+                del self._entries[key]
+
+    def _trim_disk(self, keep=None):
+        """Delete the oldest cached files no session is using once the directory exceeds its budget"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".arrow"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, name[:-len(".arrow")], path))
+        total = sum(size for _, size, _, _ in files)
+        with self._lock:
+            in_use = set(self._entries)
+        for _, size, key, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            if key not in in_use and path != keep:
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'datasets': len(self._entries),
+                'bytes': sum(entry['size'] for entry in self._entries.values()),
+                'references': sum(entry['refs'] for entry in self._entries.values())
+            }
+
+
+# One store per server process, shared by all sessions
+dataset_store = DatasetStore()
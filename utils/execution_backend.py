@@ -0,0 +1,400 @@
+import importlib.util
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+DEFAULT_BACKEND = "pandas"
+
+# Time bucket -> pandas period alias; buckets start at the beginning of the period (ISO weeks start on Monday)
+TIME_BUCKETS = {'hour': 'h', 'day': 'D', 'week': 'W', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+_POLARS_BUCKETS = {'hour': '1h', 'day': '1d', 'week': '1w', 'month': '1mo', 'quarter': '1q', 'year': '1y'}
+BUCKET_AGGREGATIONS = ['sum', 'mean', 'count', 'min', 'max']
+
+# Arrow copies of uploaded frames, shared by the columnar backends: fingerprint -> pa.Table
+_arrow_tables = LRUCache(max_bytes=1024 * 1024 * 1024, sizeof=lambda table: table.nbytes)
+# Time buckets of date columns: (fingerprint, column, bucket) -> (per-row codes, sorted bucket starts)
+_bucket_codes = LRUCache(max_bytes=512 * 1024 * 1024)
+
+
+def _arrow_table(data):
+    """Arrow form of a frame, converted once per dataset (NaN becomes null, as pandas treats it)"""
+    return _arrow_tables.get_or_compute(
+        dataset_fingerprint(data), lambda: pa.Table.from_pandas(data, preserve_index=False)
+    )
+
+
+def bucket_starts(dates, bucket):
+    """Start of the time bucket of each timestamp (NaT stays NaT), as datetime64[ns]"""
+    if getattr(dates.dtype, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    values = dates.to_numpy(dtype='datetime64[ns]')
+    if bucket == 'week':
+        days = values.astype('datetime64[D]')
+        # 1970-01-01 was a Thursday; ISO weeks start on Monday
+        starts = days - (days.view('int64') + 3) % 7
+    elif bucket == 'quarter':
+        months = values.astype('datetime64[M]')
+        starts = months - months.view('int64') % 3
+    else:
+        starts = values.astype({'hour': 'datetime64[h]', 'day': 'datetime64[D]',
+                                'month': 'datetime64[M]', 'year': 'datetime64[Y]'}[bucket])
+    starts = starts.astype('datetime64[ns]')
+    starts[np.isnat(values)] = np.datetime64('NaT')
+    return pd.Series(starts, index=dates.index, name=dates.name)
+
+
+def bucket_codes(data, date_column, bucket):
+    """Each row's time bucket as a code into the sorted bucket starts (-1 for missing dates), cached per dataset.
+
+    Every value column, aggregation and group of a date column reuses the one truncation."""
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Unsupported time bucket: {bucket}")
+    key = (dataset_fingerprint(data), date_column, bucket)
+    return _bucket_codes.get_or_compute(key, lambda: _factorize_buckets(data[date_column], bucket))
+
+
+def _factorize_buckets(series, bucket):
+    codes, starts = pd.factorize(bucket_starts(pd.to_datetime(series, errors='coerce'), bucket), sort=True)
+    return codes.astype('int32'), pd.DatetimeIndex(starts)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _check_bucket(bucket, agg):
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Unsupported time bucket: {bucket}")
+    if agg not in BUCKET_AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {agg}")
+
+
+class PandasBackend:
+    """Reference backend: single-threaded pandas/numpy, always available"""
+
+    name = "pandas"
+    module = None
+    # The engines keep their own cached numpy paths instead of calling the backend
+    pushdown = False
+
+    def grouped_kpis(self, data, kpi_columns, group_column):
+        """Sum and mean of each KPI column per group, indexed by group with <col>_sum/<col>_mean columns"""
+        grouped = data.groupby(group_column)[kpi_columns].agg(['sum', 'mean'])
+        # Flatten MultiIndex
+        grouped.columns = ['_'.join(col).strip() for col in grouped.columns.values]
+        return grouped
+
+    def group_sum(self, data, keys, value_column):
+        """Sum of value_column per combination of keys, as a flat frame sorted by keys"""
+        return data.groupby(keys)[value_column].sum().reset_index()
+
+    def category_aggregate(self, data, category_column, value_column, group_column=None):
+        """Per-category (or per group/category pair) sum and count of the numeric values"""
+        keys = [group_column, category_column] if group_column is not None else [category_column]
+        frame = data[keys].copy()
+        frame['value'] = pd.to_numeric(data[value_column], errors='coerce')
+        return frame.groupby(keys, sort=False)['value'].agg(['sum', 'count']).reset_index()
+
+    def value_range(self, data, column):
+        """(min, max) of the finite values of a numeric column, or None when there are none"""
+        values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return None
+        return float(values.min()), float(values.max())
+
+    def histogram_counts(self, data, column, edges):
+        """Counts per bin for the given edges (np.histogram semantics)"""
+        values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        return np.histogram(values[np.isfinite(values)], bins=edges)[0]
+
+    def time_buckets(self, data, date_column, value_column, bucket='month', agg='sum', group_column=None):
+        """Aggregate value_column per time bucket (and group), labelled by bucket start and sorted"""
+        _check_bucket(bucket, agg)
+        codes, starts = bucket_codes(data, date_column, bucket)
+        # Group on the integer bucket codes (sorted like the starts) and label the result afterwards
+        frame = pd.DataFrame({
+            date_column: codes,
+            value_column: pd.to_numeric(data[value_column], errors='coerce').to_numpy()
+        })
+        keys = [date_column]
+        if group_column is not None:
+            frame[group_column] = data[group_column].to_numpy()
+            keys.append(group_column)
+        grouped = frame.groupby(keys)[value_column].agg(agg).reset_index()
+        grouped = grouped[grouped[date_column] >= 0].reset_index(drop=True)
+        grouped[date_column] = starts.take(grouped[date_column].to_numpy())
+        return grouped
+
+
+class DuckDBBackend(PandasBackend):
+    """Embedded DuckDB: vectorized, multi-threaded SQL over an Arrow copy of the dataset"""
+
+    name = "duckdb"
+    module = "duckdb"
+    pushdown = True
+
+    def __init__(self, threads=None):
+        import duckdb
+        self._connection = duckdb.connect(database=":memory:")
+        if threads:
+            self._connection.execute(f"SET threads TO {int(threads)}")
+
+    def _query(self, data, sql, **tables):
+        """Run sql with the dataset registered as t (plus any extra Arrow tables) and return a DataFrame"""
+        # A cursor per call: DuckDB connections are not shared across threads
+        cursor = self._connection.cursor()
+        try:
+            cursor.register("t", _arrow_table(data))
+            for name, table in tables.items():
+                cursor.register(name, table)
+            return cursor.execute(sql).df()
+        finally:
+            cursor.close()
+
+    def grouped_kpis(self, data, kpi_columns, group_column):
+        group = _quote(group_column)
+        selects = []
+        for col in kpi_columns:
+            selects.append(f"COALESCE(SUM({_quote(col)}), 0) AS {_quote(f'{col}_sum')}")
+            selects.append(f"AVG({_quote(col)}) AS {_quote(f'{col}_mean')}")
+        sql = (f"SELECT {group}, {', '.join(selects)} FROM t WHERE {group} IS NOT NULL "
+               f"GROUP BY {group} ORDER BY {group}")
+        return self._query(data, sql).set_index(group_column)
+
+    def group_sum(self, data, keys, value_column):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        key_list = ', '.join(_quote(key) for key in keys)
+        not_null = ' AND '.join(f"{_quote(key)} IS NOT NULL" for key in keys)
+        sql = (f"SELECT {key_list}, COALESCE(SUM({_quote(value_column)}), 0) AS {_quote(value_column)} "
+               f"FROM t WHERE {not_null} GROUP BY {key_list} ORDER BY {key_list}")
+        return self._query(data, sql)
+
+    def category_aggregate(self, data, category_column, value_column, group_column=None):
+        keys = [group_column, category_column] if group_column is not None else [category_column]
+        key_list = ', '.join(_quote(key) for key in keys)
+        not_null = ' AND '.join(f"{_quote(key)} IS NOT NULL" for key in keys)
+        value = f"TRY_CAST({_quote(value_column)} AS DOUBLE)"
+        sql = (f'SELECT {key_list}, COALESCE(SUM({value}), 0) AS "sum", COUNT({value}) AS "count" '
+               f"FROM t WHERE {not_null} GROUP BY {key_list}")
+        return self._query(data, sql)
+
+    def value_range(self, data, column):
+        value = f"TRY_CAST({_quote(column)} AS DOUBLE)"
+        sql = f"SELECT MIN({value}) AS lo, MAX({value}) AS hi FROM t WHERE isfinite({value})"
+        lo, hi = self._query(data, sql).iloc[0]
+        if pd.isna(lo):
+            return None
+        return float(lo), float(hi)
+
+    def histogram_counts(self, data, column, edges):
+        edges = np.asarray(edges, dtype='float64')
+        upper = edges[1:].copy()
+        # The last bin is closed on the right, like np.histogram
+        upper[-1] = np.nextafter(upper[-1], np.inf)
+        bins = pa.table({'i': np.arange(len(upper)), 'lo': edges[:-1], 'hi': upper})
+        value = f"TRY_CAST({_quote(column)} AS DOUBLE)"
+        # Inequality join: DuckDB evaluates it with a sorted range join rather than row by row
+        sql = (f"SELECT b.i, COUNT(*) AS n FROM t JOIN bins b ON {value} >= b.lo AND {value} < b.hi "
+               f"GROUP BY b.i")
+        result = self._query(data, sql, bins=bins)
+        counts = np.zeros(len(upper), dtype='int64')
+        counts[result['i'].to_numpy(dtype='int64')] = result['n'].to_numpy(dtype='int64')
+        return counts
+
+    def time_buckets(self, data, date_column, value_column, bucket='month', agg='sum', group_column=None):
+        _check_bucket(bucket, agg)
+        date = _quote(date_column)
+        value = f"TRY_CAST({_quote(value_column)} AS DOUBLE)"
+        aggregate = {'mean': f"AVG({value})", 'sum': f"COALESCE(SUM({value}), 0)"}.get(agg, f"{agg.upper()}({value})")
+        keys = [date]
+        if group_column is not None:
+            keys.append(_quote(group_column))
+        key_list = ', '.join(keys)
+        not_null = ' AND '.join(f"{key} IS NOT NULL" for key in keys)
+        sql = (f"SELECT {key_list}, {aggregate} AS {_quote(value_column)} FROM ("
+               f"SELECT date_trunc('{bucket}', TRY_CAST({date} AS TIMESTAMP)) AS {date}, * EXCLUDE ({date}) FROM t"
+               f") WHERE {not_null} GROUP BY {key_list} ORDER BY {key_list}")
+        result = self._query(data, sql)
+        result[date_column] = result[date_column].astype('datetime64[ns]')
+        return result
+
+
+class PolarsBackend(PandasBackend):
+    """Polars lazy queries: multi-threaded columnar execution over an Arrow copy of the dataset"""
+
+    name = "polars"
+    module = "polars"
+    pushdown = True
+
+    def __init__(self):
+        # Polars sizes its own thread pool (POLARS_MAX_THREADS) at import time
+        import polars
+        self.pl = polars
+
+    def _frame(self, data):
+        return self.pl.from_arrow(_arrow_table(data)).lazy()
+
+    def _numeric(self, column):
+        return self.pl.col(column).cast(self.pl.Float64, strict=False)
+
+    def grouped_kpis(self, data, kpi_columns, group_column):
+        pl = self.pl
+        aggregations = []
+        for col in kpi_columns:
+            aggregations.append(pl.col(col).sum().alias(f"{col}_sum"))
+            aggregations.append(pl.col(col).mean().alias(f"{col}_mean"))
+        result = (self._frame(data).filter(pl.col(group_column).is_not_null())
+                  .group_by(group_column).agg(aggregations).sort(group_column).collect())
+        return result.to_pandas().set_index(group_column)
+
+    def group_sum(self, data, keys, value_column):
+        pl = self.pl
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        result = (self._frame(data).drop_nulls(keys)
+                  .group_by(keys).agg(pl.col(value_column).sum()).sort(keys).collect())
+        return result.to_pandas()
+
+    def category_aggregate(self, data, category_column, value_column, group_column=None):
+        keys = [group_column, category_column] if group_column is not None else [category_column]
+        value = self._numeric(value_column)
+        result = (self._frame(data).drop_nulls(keys)
+                  .group_by(keys).agg(value.sum().alias("sum"), value.count().alias("count")).collect())
+        return result.to_pandas()
+
+    def value_range(self, data, column):
+        value = self._numeric(column)
+        result = (self._frame(data).select(value.alias("v")).filter(self.pl.col("v").is_finite())
+                  .select(self.pl.col("v").min().alias("lo"), self.pl.col("v").max().alias("hi")).collect())
+        lo, hi = result.row(0)
+        if lo is None:
+            return None
+        return float(lo), float(hi)
+
+    def histogram_counts(self, data, column, edges):
+        pl = self.pl
+        edges = np.asarray(edges, dtype='float64')
+        last = len(edges) - 2
+        values = self._frame(data).select(self._numeric(column).alias("v")).collect()["v"]
+        values = values.filter(values.is_finite())
+        # Bin index by binary search over the edges; values on the last edge fall into the last bin
+        index = pl.Series(edges).search_sorted(values, side='right') - 1
+        index = index.set(values == edges[-1], last) if len(values) else index
+        index = index.filter((index >= 0) & (index <= last))
+        counts = np.zeros(last + 1, dtype='int64')
+        if len(index):
+            found = index.value_counts()
+            counts[found[found.columns[0]].to_numpy()] = found["count"].to_numpy()
+        return counts
+
+    def time_buckets(self, data, date_column, value_column, bucket='month', agg='sum', group_column=None):
+        _check_bucket(bucket, agg)
+        pl = self.pl
+        frame = self._frame(data)
+        date = pl.col(date_column)
+        if frame.collect_schema()[date_column] == pl.String:
+            date = date.str.to_datetime(strict=False)
+        else:
+            date = date.cast(pl.Datetime, strict=False)
+        keys = [date_column] if group_column is None else [date_column, group_column]
+        value = self._numeric(value_column)
+        aggregate = {'sum': value.sum(), 'mean': value.mean(), 'count': value.count(),
+                     'min': value.min(), 'max': value.max()}[agg]
+        result = (frame.with_columns(date.dt.truncate(_POLARS_BUCKETS[bucket]).alias(date_column))
+                  .drop_nulls(keys).group_by(keys).agg(aggregate.alias(value_column)).sort(keys).collect())
+        result = result.to_pandas()
+        result[date_column] = result[date_column].astype('datetime64[ns]')
+        return result
+
+
+BACKENDS = {backend.name: backend for backend in (PandasBackend, DuckDBBackend, PolarsBackend)}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def available_backends():
+    """Names of the backends whose engine is installed, pandas first"""
+    return [name for name, backend in BACKENDS.items()
+            if backend.module is None or importlib.util.find_spec(backend.module) is not None]
+
+
+def get_backend(name=None):
+    """Shared instance of a backend; unknown or uninstalled backends fall back to pandas"""
+    name = name if name in available_backends() else DEFAULT_BACKEND
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = _instances[name] = BACKENDS[name]()
+        return backend
+
+
+def _normalize(result):
+    """Comparable form of a backend result: flat frame, key columns as text, rows in key order"""
+    if result is None:
+        return np.array([], dtype='float64')
+    if isinstance(result, (np.ndarray, tuple)):
+        return np.asarray(result, dtype='float64')
+    frame = result.reset_index() if result.index.name is not None else result.reset_index(drop=True)
+    keys = []
+    for col in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[col]):
+            frame[col] = frame[col].astype('datetime64[ns]')
+            keys.append(col)
+        elif not pd.api.types.is_numeric_dtype(frame[col]) or pd.api.types.is_bool_dtype(frame[col]):
+            frame[col] = frame[col].astype(str)
+            keys.append(col)
+    return frame.sort_values(keys, ignore_index=True) if keys else frame
+
+
+def compare(backend, operation, *args, reference=None):
+    """Run one operation on a backend and on pandas and report whether the results agree"""
+    reference = reference or get_backend(DEFAULT_BACKEND)
+    row = {'operation': operation, 'backend': backend.name}
+    started = time.perf_counter()
+    expected = getattr(reference, operation)(*args)
+    row['pandas_seconds'] = time.perf_counter() - started
+    started = time.perf_counter()
+    try:
+        actual = getattr(backend, operation)(*args)
+    except Exception as e:
+        row.update(backend_seconds=time.perf_counter() - started, match=False, detail=str(e))
+        return row
+    row['backend_seconds'] = time.perf_counter() - started
+    expected, actual = _normalize(expected), _normalize(actual)
+    try:
+        if isinstance(expected, np.ndarray):
+            np.testing.assert_allclose(actual, expected, rtol=1e-9)
+        else:
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=False,
+                                          rtol=1e-9, check_column_type=False)
+        row.update(match=True, detail="")
+    except AssertionError as e:
+        row.update(match=False, detail=str(e).strip().splitlines()[0])
+    return row
+
+
+def check_parity(backend, data, numeric_columns, category_column=None, date_column=None, bins=30):
+    """Compare a backend with pandas on every pushed-down operation; one row per check"""
+    checks = []
+    if category_column is not None and numeric_columns:
+        checks.append(('grouped_kpis', data, list(numeric_columns), category_column))
+        checks.append(('group_sum', data, category_column, numeric_columns[0]))
+        checks.append(('category_aggregate', data, category_column, numeric_columns[0]))
+    reference = get_backend(DEFAULT_BACKEND)
+    for col in numeric_columns:
+        value_range = reference.value_range(data, col)
+        checks.append(('value_range', data, col))
+        if value_range is not None:
+            lo, hi = value_range
+            edges = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+            checks.append(('histogram_counts', data, col, edges))
+    if date_column is not None and numeric_columns:
+        checks.append(('time_buckets', data, date_column, numeric_columns[0], 'month', 'sum'))
+
+    return pd.DataFrame([compare(backend, operation, *args) for operation, *args in checks])
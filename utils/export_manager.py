@@ -1,99 +1,281 @@
 import pandas as pd
 import json
 import io
+import re
 from datetime import datetime
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 import plotly.io as pio
 import base64
+import tempfile
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from utils.image_renderer import image_renderer as shared_image_renderer
+
+# Excel's hard limit is 1,048,576 rows per sheet (header included)
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_CHUNK_ROWS = 10_000
+# Workbooks smaller than this stay in memory; larger ones spill to a temp file
+EXCEL_SPOOL_MAX_SIZE = 32 * 1024 * 1024
+# Grouped KPI rows per PDF table chunk (about one A4 page)
+PDF_ROWS_PER_TABLE = 35
+# Codecs both Parquet and Arrow IPC accept; zstd is the smaller, lz4 the faster
+COLUMNAR_COMPRESSIONS = ['zstd', 'lz4', 'none']
+EXCEL_SHEET_NAME_LENGTH = 31
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+def _sheet_name(title, used):
+    """Excel-safe sheet name, unique within the workbook (used: lower-cased names taken so far)"""
+    base = _INVALID_SHEET_CHARS.sub('_', str(title)).strip("' ") or "Chart"
+    name = base[:EXCEL_SHEET_NAME_LENGTH]
+    counter = 2
+    while name.lower() in used:
+        suffix = f" ({counter})"
+        name = base[:EXCEL_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        counter += 1
+    used.add(name.lower())
+    return name
+
+def _excel_ready(series):
+    """Column as an array xlsxwriter can write directly: NaN/NaT -> None, tz-naive datetimes"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        values = np.array(series.dt.to_pydatetime(), dtype=object)
+        values[series.isna().to_numpy()] = None
+        return values
+    if not series.hasnans and (pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series)):
+        return series.to_numpy()
+    values = series.to_numpy(dtype=object, copy=True)
+    values[series.isna().to_numpy()] = None
+    return values
+
+def _format_pdf_column(series):
+    """Format a whole column for the PDF table: numbers as 1,234.56, everything else as text"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return [f"{value:,.2f}" for value in series.to_numpy(dtype='float64', na_value=np.nan).tolist()]
+    return series.astype(str).tolist()
+
+def _basic_kpi_frame(kpis_data):
+    """Basic KPIs as a long table: one row per (column, metric)"""
+    rows = [{'Column': column, 'Metric': metric_name.title(), 'Value': value}
+            for column, metrics in kpis_data.items() for metric_name, value in metrics.items()]
+    return pd.DataFrame(rows, columns=['Column', 'Metric', 'Value'])
+
+def _arrow_table(frame, metadata=None, preserve_index=False):
+    """Arrow table over the DataFrame's column buffers (numeric columns without nulls are not copied)"""
+    table = pa.Table.from_pandas(frame, preserve_index=preserve_index)
+    if metadata:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            **{key.encode(): json.dumps(value, default=str).encode() for key, value in metadata.items()}
+        })
+    return table
+
+def frame_to_parquet(frame, compression='zstd', metadata=None, preserve_index=False):
+    """Parquet bytes for a DataFrame; metadata values are stored as JSON in the schema"""
+    sink = pa.BufferOutputStream()
+    pq.write_table(_arrow_table(frame, metadata, preserve_index), sink,
+                   compression=None if compression == 'none' else compression)
+    return sink.getvalue().to_pybytes()
+
+def frame_to_arrow(frame, compression='lz4', metadata=None, preserve_index=False):
+    """Arrow IPC file bytes for a DataFrame (readable with pyarrow.ipc / pandas.read_feather)"""
+    table = _arrow_table(frame, metadata, preserve_index)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _report_progress(progress_callback, fraction, message):
+    """Forward progress to an optional callback(fraction, message)"""
+    if progress_callback is not None:
+        progress_callback(fraction, message)
 
 class ExportManager:
     """Handles exporting KPIs and charts to various formats"""
     
-    def __init__(self):
+    def __init__(self, image_renderer=None):
         self.styles = getSampleStyleSheet()
+        self.image_renderer = image_renderer or shared_image_renderer
         
-    def create_kpi_excel(self, kpis_data, grouped_kpis=None, export_data=None):
+    def create_kpi_json(self, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None):
+        """Create JSON report with KPI data"""
+        report = dict(export_data or {"basic_kpis": kpis_data})
+        if grouped_kpis is not None and not grouped_kpis.empty:
+            _report_progress(progress_callback, 0.2, "Serializing grouped KPIs")
+            report["grouped_kpis"] = grouped_kpis.to_dict()
+        
+        kpi_json = json.dumps(report, indent=2, default=str)
+        _report_progress(progress_callback, 1.0, "Done")
+        return kpi_json.encode('utf-8')
+    
+    def create_kpi_parquet(self, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None,
+                           compression='zstd'):
+        """Create Parquet file with KPI data"""
+        return self._write_kpi_columnar(frame_to_parquet, kpis_data, grouped_kpis, export_data,
+                                        progress_callback, compression)
+    
+    def create_kpi_arrow(self, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None,
+                         compression='lz4'):
+        """Create Arrow IPC file with KPI data"""
+        return self._write_kpi_columnar(frame_to_arrow, kpis_data, grouped_kpis, export_data,
+                                        progress_callback, compression)
+    
+    def _write_kpi_columnar(self, writer, kpis_data, grouped_kpis, export_data, progress_callback, compression):
+        """The table is the grouped KPIs (group key as a column) when present, otherwise the basic KPIs;
+        basic KPIs and summary stats always travel in the schema metadata"""
+        metadata = {
+            'kpi_basic': kpis_data,
+            'kpi_summary': (export_data or {}).get('summary_stats', {}),
+            'generated': datetime.now().isoformat(timespec='seconds')
+        }
+        if grouped_kpis is not None and not grouped_kpis.empty:
+            _report_progress(progress_callback, 0.2, "Encoding grouped KPIs")
+            grouped = grouped_kpis.rename_axis(grouped_kpis.index.name or 'Group')
+            data = writer(grouped, compression, metadata, preserve_index=True)
+        else:
+            data = writer(_basic_kpi_frame(kpis_data), compression, metadata)
+        _report_progress(progress_callback, 1.0, "Done")
+        return data
+    
+    def create_chart_parquet(self, chart_data, compression='zstd'):
+        """Create Parquet file with chart data"""
+        return frame_to_parquet(chart_data, compression)
+    
+    def create_chart_arrow(self, chart_data, compression='lz4'):
+        """Create Arrow IPC file with chart data"""
+        return frame_to_arrow(chart_data, compression)
+    
+    def create_kpi_excel(self, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None):
         """Create Excel file with KPI data"""
-        # Create a BytesIO buffer
-        buffer = io.BytesIO()
+        with tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE) as output:
+            self.write_kpi_excel(output, kpis_data, grouped_kpis, export_data, progress_callback)
+            output.seek(0)
+            return output.read()
+    
+    def write_kpi_excel(self, output, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None):
+        """Stream the KPI workbook into a file object with flat memory use"""
+        workbook = self._create_streaming_workbook(output)
+        self.write_kpi_sheets(workbook, self._add_excel_formats(workbook), kpis_data, grouped_kpis, export_data,
+                              progress_callback=progress_callback)
+        workbook.close()
+        _report_progress(progress_callback, 1.0, "Done")
+    
+    def write_kpi_sheets(self, workbook, formats, kpis_data, grouped_kpis=None, export_data=None,
+                         progress_callback=None, sheet_prefix="", used=None):
+        """Add the Basic KPIs, Grouped KPIs and Summary sheets to an open streaming workbook.
+
+        With used (names already in the workbook), sheet names are made unique; returns the worksheets."""
+        header_format, number_format = formats
+        worksheets = []
         
-        # Create Excel writer
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Add formats
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            number_format = workbook.add_format({'num_format': '#,##0.00'})
-            
-            # Basic KPIs Sheet
-            if kpis_data:
-                basic_kpis_list = []
-                for column, metrics in kpis_data.items():
-                    for metric_name, value in metrics.items():
-                        basic_kpis_list.append({
-                            'Column': column,
-                            'Metric': metric_name.title(),
-                            'Value': value
-                        })
-                
-                df_basic = pd.DataFrame(basic_kpis_list)
-                df_basic.to_excel(writer, sheet_name='Basic KPIs', index=False)
-                
-                # Format the Basic KPIs sheet
-                worksheet = writer.sheets['Basic KPIs']
-                worksheet.set_column('A:A', 20)
-                worksheet.set_column('B:B', 15)
-                worksheet.set_column('C:C', 15, number_format)
-                
-                # Add header formatting
-                for col_num, value in enumerate(df_basic.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
+        # Basic KPIs Sheet
+        if kpis_data:
+            df_basic = _basic_kpi_frame(kpis_data)
+            worksheet = self._write_excel_table(workbook, f'{sheet_prefix}Basic KPIs', df_basic, header_format,
+                                                used=used)[0]
+            worksheets.append(worksheet)
             
-            # Grouped KPIs Sheet
-            if grouped_kpis is not None and not grouped_kpis.empty:
-                grouped_kpis.to_excel(writer, sheet_name='Grouped KPIs', index=True)
-                
-                worksheet = writer.sheets['Grouped KPIs']
-                worksheet.set_column('A:Z', 15, number_format)
-                
-                # Add header formatting
-                for col_num, value in enumerate(['Group'] + list(grouped_kpis.columns)):
-                    worksheet.write(0, col_num, value, header_format)
+            # Format the Basic KPIs sheet
+            worksheet.set_column('A:A', 20)
+            worksheet.set_column('B:B', 15)
+            worksheet.set_column('C:C', 15, number_format)
+        
+        # Grouped KPIs Sheet (split across sheets past Excel's row limit)
+        if grouped_kpis is not None and not grouped_kpis.empty:
+            _report_progress(progress_callback, 0.1, "Writing grouped KPIs")
+            worksheets.extend(self._write_excel_table(
+                workbook, f'{sheet_prefix}Grouped KPIs', grouped_kpis, header_format,
+                index_label='Group', column_format=number_format,
+                progress_callback=progress_callback, progress_span=(0.1, 0.8), used=used
+            ))
+        
+        # Summary Sheet
+        if export_data:
+            _report_progress(progress_callback, 0.8, "Writing summary")
+            summary_data = []
+            summary_data.append(['Report Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+            summary_data.append(['Total Records', export_data.get('summary_stats', {}).get('total_records', 'N/A')])
+            summary_data.append(['Data Completeness', export_data.get('summary_stats', {}).get('data_completeness', 'N/A')])
+            summary_data.append(['Unique Records Ratio', export_data.get('summary_stats', {}).get('unique_records_ratio', 'N/A')])
             
-            # Summary Sheet
-            if export_data:
-                summary_data = []
-                summary_data.append(['Report Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-                summary_data.append(['Total Records', export_data.get('summary_stats', {}).get('total_records', 'N/A')])
-                summary_data.append(['Data Completeness', export_data.get('summary_stats', {}).get('data_completeness', 'N/A')])
-                summary_data.append(['Unique Records Ratio', export_data.get('summary_stats', {}).get('unique_records_ratio', 'N/A')])
-                
-                df_summary = pd.DataFrame(summary_data, columns=['Metric', 'Value'])
-                df_summary.to_excel(writer, sheet_name='Summary', index=False)
-                
-                worksheet = writer.sheets['Summary']
-                worksheet.set_column('A:A', 25)
-                worksheet.set_column('B:B', 20)
-                
-                # Add header formatting
-                for col_num, value in enumerate(df_summary.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
+            df_summary = pd.DataFrame(summary_data, columns=['Metric', 'Value'])
+            worksheet = self._write_excel_table(workbook, f'{sheet_prefix}Summary', df_summary, header_format,
+                                                used=used)[0]
+            worksheet.set_column('A:A', 25)
+            worksheet.set_column('B:B', 20)
+            worksheets.append(worksheet)
+        return worksheets
+    
+    def _create_streaming_workbook(self, output):
+        """xlsxwriter workbook that flushes each row to disk as soon as the next one starts"""
+        return xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'tmpdir': tempfile.gettempdir(),
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+            'nan_inf_to_errors': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+        })
+    
+    def _add_excel_formats(self, workbook):
+        header_format = workbook.add_format({
+            'bold': True,
+            'text_wrap': True,
+            'valign': 'top',
+            'fg_color': '#D7E4BC',
+            'border': 1
+        })
+        number_format = workbook.add_format({'num_format': '#,##0.00'})
+        return header_format, number_format
+    
+    def _write_excel_table(self, workbook, sheet_name, frame, header_format, index_label=None,
+                           column_width=None, column_format=None, progress_callback=None, progress_span=(0.0, 1.0),
+                           used=None):
+        """Write a DataFrame row by row from its column arrays, starting a new sheet every EXCEL_MAX_ROWS rows.
+
+        With used, every sheet name (continuation sheets included) is made unique against it."""
+        headers = ([index_label] if index_label else []) + [str(col) for col in frame.columns]
+        columns = ([_excel_ready(pd.Series(frame.index))] if index_label else []) + \
+            [_excel_ready(frame.iloc[:, i]) for i in range(frame.shape[1])]
         
-        buffer.seek(0)
-        return buffer.getvalue()
+        total_rows = len(frame)
+        rows_per_sheet = EXCEL_MAX_ROWS - 1
+        worksheets = []
+        for part, sheet_start in enumerate(range(0, max(total_rows, 1), rows_per_sheet)):
+            name = sheet_name if part == 0 else f"{sheet_name[:25]} ({part + 1})"
+            if used is not None:
+                name = _sheet_name(name, used)
+            worksheet = workbook.add_worksheet(name)
+            worksheets.append(worksheet)
+            if column_width or column_format:
+                worksheet.set_column(0, len(headers) - 1, column_width or 15, column_format)
+            worksheet.write_row(0, 0, headers, header_format)
+            
+            sheet_stop = min(sheet_start + rows_per_sheet, total_rows)
+            excel_row = 1
+            for chunk_start in range(sheet_start, sheet_stop, EXCEL_CHUNK_ROWS):
+                chunk_stop = min(chunk_start + EXCEL_CHUNK_ROWS, sheet_stop)
+                # tolist() per chunk turns numpy scalars into plain Python values in one go
+                chunk = [column[chunk_start:chunk_stop].tolist() for column in columns]
+                for row_values in zip(*chunk):
+                    worksheet.write_row(excel_row, 0, row_values)
+                    excel_row += 1
+                if progress_callback is not None and total_rows:
+                    start, end = progress_span
+                    _report_progress(progress_callback, start + (end - start) * chunk_stop / total_rows,
+                                     f"Writing {sheet_name}: {chunk_stop:,} of {total_rows:,} rows")
+        return worksheets
     
-    def create_kpi_pdf(self, kpis_data, grouped_kpis=None, export_data=None):
+    def create_kpi_pdf(self, kpis_data, grouped_kpis=None, export_data=None, progress_callback=None,
+                       max_grouped_pages=None):
         """Create PDF report with KPI data"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
@@ -118,6 +300,20 @@ class ExportManager:
         story.append(Paragraph(report_info, self.styles['Normal']))
         story.append(Spacer(1, 20))
         
+        story.extend(self.kpi_story(kpis_data, grouped_kpis, export_data, doc.width,
+                                    progress_callback=progress_callback, max_grouped_pages=max_grouped_pages))
+        
+        _report_progress(progress_callback, 0.6, "Laying out PDF")
+        doc.build(story)
+        _report_progress(progress_callback, 1.0, "Done")
+        buffer.seek(0)
+        return buffer.getvalue()
+    
+    def kpi_story(self, kpis_data, grouped_kpis=None, export_data=None, available_width=A4[0] - 2 * inch,
+                  progress_callback=None, max_grouped_pages=None):
+        """PDF flowables for the Basic KPIs, Grouped KPIs and Summary sections"""
+        story = []
+        
         # Basic KPIs Section
         if kpis_data:
             story.append(Paragraph("Basic KPIs", self.styles['Heading2']))
@@ -147,25 +343,24 @@ class ExportManager:
         
         # Grouped KPIs Section
         if grouped_kpis is not None and not grouped_kpis.empty:
+            _report_progress(progress_callback, 0.1, "Formatting grouped KPIs")
             story.append(Paragraph("Grouped KPIs", self.styles['Heading2']))
             story.append(Spacer(1, 12))
             
-            # Convert grouped KPIs to table format
-            table_data = [['Group'] + list(grouped_kpis.columns)]
-            for index, row in grouped_kpis.iterrows():
-                row_data = [str(index)]
-                for value in row:
-                    formatted_value = f"{value:,.2f}" if isinstance(value, (int, float)) else str(value)
-                    row_data.append(formatted_value)
-                table_data.append(row_data)
+            # Optionally cap the number of pages the grouped table may take
+            total_rows = len(grouped_kpis)
+            rows_shown = total_rows
+            if max_grouped_pages is not None:
+                rows_shown = min(total_rows, max_grouped_pages * PDF_ROWS_PER_TABLE)
+            shown = grouped_kpis.iloc[:rows_shown]
             
-            # Create table (limit to first 10 rows to fit on page)
-            if len(table_data) > 11:  # 1 header + 10 rows
-                table_data = table_data[:11]
-                table_data.append(['...'] * len(table_data[0]))
+            # Format whole columns at once instead of cell by cell
+            header = ['Group'] + [str(col) for col in grouped_kpis.columns]
+            columns = [pd.Series(shown.index).astype(str).tolist()] + \
+                [_format_pdf_column(shown.iloc[:, i]) for i in range(shown.shape[1])]
             
-            table = Table(table_data)
-            table.setStyle(TableStyle([
+            # One LongTable per page-sized chunk, header repeated on every page
+            table_style = TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -174,8 +369,23 @@ class ExportManager:
                 ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
                 ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(table)
+            ])
+            col_widths = [available_width / len(header)] * len(header)
+            for start in range(0, rows_shown, PDF_ROWS_PER_TABLE):
+                stop = min(start + PDF_ROWS_PER_TABLE, rows_shown)
+                table_data = [header] + [list(row) for row in zip(*(col[start:stop] for col in columns))]
+                if stop == rows_shown and rows_shown < total_rows:
+                    table_data.append(['...'] * len(header))
+                table = LongTable(table_data, colWidths=col_widths, repeatRows=1)
+                table.setStyle(table_style)
+                story.append(table)
+                _report_progress(progress_callback, 0.1 + 0.4 * stop / max(rows_shown, 1),
+                                 f"Formatting grouped KPIs: {stop:,} of {rows_shown:,} rows")
+            
+            if rows_shown < total_rows:
+                story.append(Spacer(1, 6))
+                story.append(Paragraph(f"Showing the first {rows_shown:,} of {total_rows:,} groups.",
+                                       self.styles['Italic']))
             story.append(Spacer(1, 20))
         
         # Summary Statistics
@@ -191,9 +401,7 @@ class ExportManager:
             """
             story.append(Paragraph(summary_text, self.styles['Normal']))
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
+        return story
     
     def create_chart_pdf(self, fig, chart_title="Chart Report"):
         """Create PDF with chart image"""
@@ -221,8 +429,8 @@ class ExportManager:
         story.append(Spacer(1, 20))
         
         try:
-            # Convert chart to image
-            img_bytes = pio.to_image(fig, format="png", width=600, height=400)
+            # Convert chart to image (warm renderer, cached per figure)
+            img_bytes = self.image_renderer.render(fig, "png", width=600, height=400)
             img_buffer = io.BytesIO(img_bytes)
             
             # Add image to PDF
@@ -240,45 +448,31 @@ class ExportManager:
     
     def create_chart_excel(self, fig, chart_data, chart_title="Chart Data"):
         """Create Excel file with chart data and image"""
-        buffer = io.BytesIO()
+        with tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE) as output:
+            self.write_chart_excel(output, chart_data, chart_title)
+            output.seek(0)
+            return output.read()
+    
+    def write_chart_excel(self, output, chart_data, chart_title="Chart Data", progress_callback=None):
+        """Stream chart data into a workbook with flat memory use"""
+        workbook = self._create_streaming_workbook(output)
+        header_format = self._add_excel_formats(workbook)[0]
         
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Add formats
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            # Chart Data Sheet
-            if hasattr(chart_data, 'to_excel'):
-                chart_data.to_excel(writer, sheet_name='Chart Data', index=False)
-                worksheet = writer.sheets['Chart Data']
-                
-                # Format columns
-                for col_num, column in enumerate(chart_data.columns):
-                    worksheet.set_column(col_num, col_num, 15)
-                    worksheet.write(0, col_num, column, header_format)
-            
-            # Chart Info Sheet
-            info_data = pd.DataFrame([
-                ['Chart Title', chart_title],
-                ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-                ['Data Points', len(chart_data) if hasattr(chart_data, '__len__') else 'N/A']
-            ], columns=['Property', 'Value'])
-            
-            info_data.to_excel(writer, sheet_name='Chart Info', index=False)
-            worksheet = writer.sheets['Chart Info']
-            worksheet.set_column('A:A', 20)
-            worksheet.set_column('B:B', 30)
-            
-            # Add header formatting
-            for col_num, value in enumerate(info_data.columns.values):
-                worksheet.write(0, col_num, value, header_format)
+        # Chart Data Sheet
+        if hasattr(chart_data, 'columns'):
+            self._write_excel_table(workbook, 'Chart Data', chart_data, header_format, column_width=15,
+                                    progress_callback=progress_callback, progress_span=(0.0, 0.95))
         
-        buffer.seek(0)
-        return buffer.getvalue()
+        # Chart Info Sheet
+        info_data = pd.DataFrame([
+            ['Chart Title', chart_title],
+            ['Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+            ['Data Points', len(chart_data) if hasattr(chart_data, '__len__') else 'N/A']
+        ], columns=['Property', 'Value'])
+        
+        worksheet = self._write_excel_table(workbook, 'Chart Info', info_data, header_format)[0]
+        worksheet.set_column('A:A', 20)
+        worksheet.set_column('B:B', 30)
+        
+        workbook.close()
+        _report_progress(progress_callback, 1.0, "Done")
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+from utils.export_manager import ExportManager
+
+KPI_EXPORT_FORMATS = ['json', 'excel', 'pdf', 'parquet', 'arrow']
+
+# Grouped tables at least this long are worth preparing in the background
+BACKGROUND_ROW_THRESHOLD = 20_000
+
+
+def kpi_fingerprint(kpis_data, grouped_kpis=None, export_data=None):
+    """Hash of the KPI results an export is built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(kpis_data, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(export_data or {}, sort_keys=True, default=str).encode())
+    if grouped_kpis is not None:
+        digest.update(dataset_fingerprint(grouped_kpis).encode())
+    return digest.hexdigest()
+
+
+class ExportService:
+    """Generates KPI exports only when requested and caches them by result, format and options"""
+
+    def __init__(self, export_manager=None, max_bytes=256 * 1024 * 1024, max_workers=2):
+        self.export_manager = export_manager or ExportManager()
+        self._results = LRUCache(max_bytes=max_bytes)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kpi-export")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, export_format, kpis_data, grouped_kpis=None, export_data=None, **options):
+        if export_format not in KPI_EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        options_key = json.dumps(options, sort_keys=True, default=str)
+        return (kpi_fingerprint(kpis_data, grouped_kpis, export_data), export_format, options_key)
+
+    def _build(self, export_format, kpis_data, grouped_kpis, export_data, progress_callback=None, **options):
+        builders = {
+            'json': self.export_manager.create_kpi_json,
+            'excel': self.export_manager.create_kpi_excel,
+            'pdf': self.export_manager.create_kpi_pdf,
+            'parquet': self.export_manager.create_kpi_parquet,
+            'arrow': self.export_manager.create_kpi_arrow,
+        }
+        return builders[export_format](kpis_data, grouped_kpis, export_data,
+                                       progress_callback=progress_callback, **options)
+
+    def generate(self, export_format, kpis_data, grouped_kpis=None, export_data=None, **options):
+        """Return export bytes, building them only on the first request"""
+        key = self.make_key(export_format, kpis_data, grouped_kpis, export_data, **options)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        # Reuse a background job for the same export instead of building twice
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None:
+            return job['future'].result()
+        return self._results.put(key, self._build(export_format, kpis_data, grouped_kpis, export_data, **options))
+
+    def deferred(self, export_format, kpis_data, grouped_kpis=None, export_data=None, **options):
+        """Zero-argument callable for st.download_button; runs only when the button is clicked"""
+        return lambda: self.generate(export_format, kpis_data, grouped_kpis, export_data, **options)
+
+    def submit(self, export_format, kpis_data, grouped_kpis=None, export_data=None, **options):
+        """Start building an export in the background and return its key for status polling"""
+        key = self.make_key(export_format, kpis_data, grouped_kpis, export_data, **options)
+        if key in self._results:
+            return key
+        with self._lock:
+            if key in self._jobs and not self._jobs[key]['future'].done():
+                return key
+            job = {'progress': 0.0, 'message': "Queued", 'future': None}
+
+            def update(fraction, message):
+                job['progress'], job['message'] = fraction, message
+
+            def run():
+                try:
+                    data = self._build(export_format, kpis_data, grouped_kpis, export_data,
+                                       progress_callback=update, **options)
+                except Exception as e:
+                    # Keep the failed job around so status() can report the error
+                    job['error'] = str(e)
+                    raise
+                self._results.put(key, data)
+                with self._lock:
+                    self._jobs.pop(key, None)
+                return data
+
+            self._jobs[key] = job
+            job['future'] = self._executor.submit(run)
+        return key
+
+    def status(self, key):
+        """Return {'state': 'done'|'running'|'error'|'missing', 'progress', 'message'[, 'data']}"""
+        cached = self._results.get(key)
+        if cached is not None:
+            return {'state': 'done', 'progress': 1.0, 'message': "Ready", 'data': cached}
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return {'state': 'missing', 'progress': 0.0, 'message': "Not started"}
+        if 'error' in job:
+            return {'state': 'error', 'progress': job['progress'], 'message': job['error']}
+        return {'state': 'running', 'progress': job['progress'], 'message': job['message']}
+
+
+# Shared service so identical KPI results reuse one export across reruns and sessions
+export_service = ExportService()
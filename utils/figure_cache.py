@@ -0,0 +1,39 @@
+import json
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+from utils.figure_serializer import figure_to_json
+
+
+class FigureCache:
+    """Process-wide cache of built figures, stored as compact JSON and keyed by chart spec and dataset"""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self._figures = LRUCache(max_bytes=max_bytes)
+
+    def make_key(self, data, chart_type, columns, options=None):
+        """Key for a chart: dataset fingerprint, chart type, columns and normalized options"""
+        options_key = json.dumps(options or {}, sort_keys=True, default=str)
+        return (dataset_fingerprint(data), chart_type, tuple(columns), options_key)
+
+    def get_json(self, key):
+        """Return the cached figure JSON for a key, or None"""
+        return self._figures.get(key)
+
+    def get_or_build(self, data, chart_type, columns, options, build):
+        """Return the figure JSON for a chart spec, calling build() only on a cache miss"""
+        key = self.make_key(data, chart_type, columns, options)
+        fig_json = self._figures.get(key)
+        if fig_json is None:
+            fig_json = self._figures.put(key, figure_to_json(build()))
+        return fig_json
+
+    @property
+    def total_bytes(self):
+        return self._figures.total_bytes
+
+    def clear(self):
+        self._figures.clear()
+
+
+# Shared by every session in the process, so identical data and specs reuse one build
+figure_cache = FigureCache()
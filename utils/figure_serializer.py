@@ -0,0 +1,298 @@
+import base64
+import functools
+import gzip
+import hashlib
+import html
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+from utils.export_manager import COLUMNAR_COMPRESSIONS, frame_to_arrow, frame_to_parquet
+
+try:
+    import orjson  # noqa: F401
+    JSON_ENGINE = "orjson"
+except ImportError:
+    JSON_ENGINE = "json"
+
+# Short arrays are cheaper as plain JSON than as base64
+TYPED_ARRAY_MIN_LENGTH = 16
+
+# Integer typed arrays plotly.js can decode, smallest first (no 64-bit integers)
+_INT_TYPES = [('i1', np.int8), ('u1', np.uint8), ('i2', np.int16), ('u2', np.uint16),
+              ('i4', np.int32), ('u4', np.uint32)]
+
+# Trace attributes that look like arrays but are not data arrays
+_SKIP_KEYS = {'selectedpoints', 'colorscale', 'dimensions', 'transforms'}
+
+# Trace arrays copied into a chart's data sheet, in column order
+CHART_DATA_KEYS = ['x', 'y', 'z', 'labels', 'values', 'text']
+
+# Page shell for multi-chart bundles: one plotly.js copy, figure specs as inert JSON, and charts
+# drawn only when they scroll near the viewport
+_BUNDLE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; }}
+.chart {{ margin-bottom: 32px; }}
+.plot {{ height: {height}px; background: #fafafa; }}
+</style>
+{loader}
+</head>
+<body>
+<h1>{title}</h1>
+<p>Generated {generated} &middot; {count} charts</p>
+{charts}
+<script>
+(function () {{
+  function draw(div) {{
+    var spec = JSON.parse(document.getElementById(div.dataset.spec).textContent);
+    div.style.background = 'none';
+    Plotly.newPlot(div, spec.data || [], spec.layout || {{}}, {{responsive: true}});
+  }}
+  function hydrate() {{
+    var plots = document.querySelectorAll('.plot');
+    if (!('IntersectionObserver' in window)) {{ plots.forEach(draw); return; }}
+    var observer = new IntersectionObserver(function (entries) {{
+      entries.forEach(function (entry) {{
+        if (entry.isIntersecting) {{ observer.unobserve(entry.target); draw(entry.target); }}
+      }});
+    }}, {{rootMargin: '400px 0px'}});
+    plots.forEach(function (div) {{ observer.observe(div); }});
+  }}
+  window.plotlyReady.then(hydrate);
+}})();
+</script>
+</body>
+</html>
+"""
+
+# plotly.js shipped gzip-compressed and unpacked in the browser (DecompressionStream)
+_COMPRESSED_LOADER = """<script>
+window.plotlyReady = (function () {{
+  if (!('DecompressionStream' in window)) {{
+    return Promise.reject(new Error('This browser cannot unpack the embedded plotly.js'));
+  }}
+  var bytes = Uint8Array.from(atob('{payload}'), function (c) {{ return c.charCodeAt(0); }});
+  var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return new Response(stream).text().then(function (source) {{
+    var script = document.createElement('script');
+    script.textContent = source;
+    document.head.appendChild(script);
+  }});
+}})();
+</script>"""
+
+_INLINE_LOADER = """<script>{payload}</script>
+<script>window.plotlyReady = Promise.resolve();</script>"""
+
+
+@functools.lru_cache(maxsize=2)
+def _plotlyjs_payload(compress):
+    """plotly.js source for bundles (read once per process), optionally gzip + base64"""
+    from plotly.offline import get_plotlyjs
+    source = get_plotlyjs()
+    if compress:
+        return base64.b64encode(gzip.compress(source.encode(), compresslevel=9)).decode('ascii')
+    return source.replace('</script', '<\\/script')
+
+
+def to_typed_array(values):
+    """Return a plotly typed-array spec ({'dtype', 'bdata'[, 'shape']}) or None if not numeric"""
+    try:
+        array = np.asarray(values)
+    except (ValueError, TypeError):
+        return None
+    if array.ndim not in (1, 2) or array.size < TYPED_ARRAY_MIN_LENGTH:
+        return None
+
+    if array.dtype.kind == 'f':
+        dtype = 'f4' if array.dtype == np.float32 else 'f8'
+        array = array.astype(dtype, copy=False)
+    elif array.dtype.kind in 'iu':
+        lo, hi = array.min(), array.max()
+        for code, int_type in _INT_TYPES:
+            info = np.iinfo(int_type)
+            if info.min <= lo and hi <= info.max:
+                dtype = code
+                array = array.astype(int_type, copy=False)
+                break
+        else:
+            return None
+    else:
+        return None
+
+    spec = {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')}
+    if array.ndim == 2:
+        spec['shape'] = f"{array.shape[0]}, {array.shape[1]}"
+    return spec
+
+
+def decode_typed_array(value):
+    """Inverse of to_typed_array: a numpy array for a typed-array spec, plain values unchanged"""
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+        if 'shape' in value:
+            array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+        return array
+    return value
+
+
+def chart_data_frame(fig_json):
+    """Long-form table of a figure's trace data (one row per point, one column per trace array)"""
+    fig_dict = json.loads(fig_json)
+    layout = fig_dict.get('layout', {})
+    axis_titles = {}
+    for axis in ('x', 'y'):
+        title = layout.get(f'{axis}axis', {}).get('title')
+        title = title.get('text') if isinstance(title, dict) else title
+        if title:
+            axis_titles[axis] = str(title)
+
+    frames = []
+    for i, trace in enumerate(fig_dict.get('data', [])):
+        columns = {}
+        for key in CHART_DATA_KEYS:
+            if key not in trace:
+                continue
+            values = decode_typed_array(trace[key])
+            if isinstance(values, (list, tuple)):
+                # Let pandas infer the column type (numbers, strings, timestamps as text)
+                values = pd.Series(values).to_numpy()
+            if not isinstance(values, np.ndarray) or values.ndim != 1:
+                continue
+            if values.dtype.kind in 'iu':
+                # Typed arrays are downcast for transport; tables get ordinary 64-bit integers back
+                values = values.astype(np.int64)
+            columns[axis_titles.get(key, key)] = values
+        if not columns:
+            continue
+        length = max(len(values) for values in columns.values())
+        columns = {name: values for name, values in columns.items() if len(values) == length}
+        frame = pd.DataFrame(columns)
+        frame.insert(0, 'Trace', trace.get('name') or f"{trace.get('type', 'trace')} {i + 1}")
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['Trace'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _encode(value):
+    if isinstance(value, dict):
+        if 'bdata' in value:
+            return value
+        return {key: (item if key in _SKIP_KEYS else _encode(item)) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        spec = to_typed_array(value)
+        if spec is not None:
+            return spec
+        if isinstance(value, np.ndarray):
+            return value
+        return [_encode(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def encode_figure_arrays(fig_dict):
+    """Return a copy of a figure dict with numeric trace arrays base64-encoded (layout is untouched)"""
+    encoded = dict(fig_dict)
+    encoded['data'] = [_encode(trace) for trace in fig_dict.get('data', [])]
+    return encoded
+
+
+def figure_to_json(fig):
+    """Serialize a figure (or figure dict) to compact JSON with typed arrays"""
+    fig_dict = fig if isinstance(fig, dict) else fig.to_dict()
+    return pio.to_json(encode_figure_arrays(fig_dict), validate=False, engine=JSON_ENGINE)
+
+
+class FigureExporter:
+    """Produces chart exports lazily from figure JSON and memoizes them per figure"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self._exports = LRUCache(max_bytes=max_bytes)
+
+    def _key(self, fig_json, export_format, options=()):
+        digest = hashlib.blake2b(fig_json.encode(), digest_size=16).hexdigest()
+        return (digest, export_format, options)
+
+    def to_json(self, fig_json):
+        """Compact JSON export (typed arrays re-applied in case the spec came from elsewhere)"""
+        return self._exports.get_or_compute(
+            self._key(fig_json, 'json'), lambda: figure_to_json(json.loads(fig_json))
+        )
+
+    def to_html(self, fig_json, include_plotlyjs='cdn'):
+        """Standalone HTML export rendered straight from the spec, without building a Figure"""
+        return self._exports.get_or_compute(
+            self._key(fig_json, 'html', (include_plotlyjs,)),
+            lambda: pio.to_html(json.loads(fig_json), include_plotlyjs=include_plotlyjs,
+                                full_html=True, validate=False)
+        )
+
+    def to_html_bundle(self, charts, title="Chart Bundle", compress=True, height=450):
+        """One offline HTML file for many (title, fig_json) charts with a single embedded plotly.js"""
+        charts = list(charts)
+        digest = hashlib.blake2b(digest_size=16)
+        for chart_title, fig_json in charts:
+            digest.update(chart_title.encode())
+            digest.update(fig_json.encode())
+        key = (digest.hexdigest(), 'html_bundle', (title, compress, height))
+        return self._exports.get_or_compute(key, lambda: self._build_bundle(charts, title, compress, height))
+
+    def _build_bundle(self, charts, title, compress, height):
+        blocks = []
+        for i, (chart_title, fig_json) in enumerate(charts):
+            # Re-encode so every spec carries typed arrays; '</' is escaped to keep the JSON inert
+            spec = figure_to_json(json.loads(fig_json)).replace('</', '<\\/')
+            blocks.append(
+                f'<div class="chart"><h2>{html.escape(chart_title)}</h2>'
+                f'<div class="plot" data-spec="spec-{i}"></div>'
+                f'<script type="application/json" id="spec-{i}">{spec}</script></div>'
+            )
+        loader = (_COMPRESSED_LOADER if compress else _INLINE_LOADER).format(payload=_plotlyjs_payload(compress))
+        return _BUNDLE_TEMPLATE.format(
+            title=html.escape(title),
+            height=int(height),
+            loader=loader,
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            count=len(charts),
+            charts="\n".join(blocks)
+        )
+
+    def to_table(self, fig_json, export_format, data=None, compression=None):
+        """Parquet or Arrow IPC export of a chart's source data (or of its plotted traces when data is None)"""
+        if export_format not in ('parquet', 'arrow'):
+            raise ValueError(f"Unsupported export format: {export_format}")
+        compression = compression or ('zstd' if export_format == 'parquet' else 'lz4')
+        if compression not in COLUMNAR_COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        source = dataset_fingerprint(data) if data is not None else None
+        writer = frame_to_parquet if export_format == 'parquet' else frame_to_arrow
+        return self._exports.get_or_compute(
+            self._key(fig_json, export_format, (source, compression)),
+            lambda: writer(data if data is not None else chart_data_frame(fig_json), compression)
+        )
+
+    def deferred(self, fig_json, export_format, **options):
+        """Zero-argument callable for st.download_button so the export runs only when clicked"""
+        if export_format == 'html':
+            return lambda: self.to_html(fig_json, **options)
+        if export_format == 'json':
+            return lambda: self.to_json(fig_json)
+        if export_format in ('parquet', 'arrow'):
+            return lambda: self.to_table(fig_json, export_format, **options)
+        if export_format == 'html_bundle':
+            # fig_json is a list of (title, fig_json) pairs here
+            return lambda: self.to_html_bundle(fig_json, **options)
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+
+# Shared exporter so repeated downloads of the same figure are served from memory
+figure_exporter = FigureExporter()
@@ -0,0 +1,212 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+FILTER_KINDS = ['range', 'in', 'date', 'prefix']
+
+
+class RowFilter(namedtuple('RowFilter', ['kind', 'column', 'value'])):
+    """One row predicate; hashable, so its mask can be cached per dataset"""
+
+    __slots__ = ()
+
+    def describe(self):
+        if self.kind == 'range':
+            low, high = self.value
+            return f"{low if low is not None else '-∞'} ≤ {self.column} ≤ {high if high is not None else '∞'}"
+        if self.kind == 'date':
+            start, end = self.value
+            start = start.strftime('%Y-%m-%d') if start is not None else "…"
+            end = end.strftime('%Y-%m-%d') if end is not None else "…"
+            return f"{self.column} in [{start}, {end})"
+        if self.kind == 'in':
+            shown = ", ".join(map(str, self.value[:5]))
+            more = f" (+{len(self.value) - 5} more)" if len(self.value) > 5 else ""
+            return f"{self.column} is one of {shown}{more}"
+        prefix, case = self.value
+        return f"{self.column} starts with '{prefix}'" + ("" if case else " (any case)")
+
+
+def range_filter(column, low=None, high=None):
+    """Rows with low <= column <= high (either bound may be None)"""
+    return RowFilter('range', column, (low, high))
+
+
+def in_filter(column, values):
+    """Rows whose value is one of values"""
+    return RowFilter('in', column, tuple(sorted(set(values), key=str)))
+
+
+def date_window(column, start=None, end=None):
+    """Rows with start <= column < end (either bound may be None)"""
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    return RowFilter('date', column, (start, end))
+
+
+def prefix_filter(column, prefix, case=False):
+    """Rows whose text starts with prefix"""
+    return RowFilter('prefix', column, (prefix, case))
+
+
+def _as_datetime(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce')
+
+
+class FilterEngine:
+    """Builds row masks from cached per-column indexes and returns filtered views of a dataset.
+
+    Range and date predicates binary-search a sorted copy of the column; set and prefix predicates
+    are evaluated once per distinct value and broadcast through the column's category codes."""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_view_bytes=512 * 1024 * 1024):
+        # (fingerprint, column, index kind) -> sorted or categorical index
+        self._indexes = LRUCache(max_bytes=max_bytes)
+        # (fingerprint, RowFilter) -> boolean mask
+        self._masks = LRUCache(max_bytes=max_bytes)
+        # (fingerprint, filters) -> filtered frame; reusing the object keeps downstream caches warm.
+        # Views taken from scattered rows are copies, so they are bounded by size rather than by count
+        self._views = LRUCache(max_bytes=max_view_bytes,
+                               sizeof=lambda view: int(view.memory_usage(deep=False).sum()))
+
+    def sorted_index(self, data, column, kind='numeric'):
+        """(sorted values, row positions) of the non-missing values; dates as int64 ns"""
+        key = (dataset_fingerprint(data), column, kind)
+        return self._indexes.get_or_compute(key, lambda: self._build_sorted(data[column], kind))
+
+    def _build_sorted(self, series, kind):
+        if kind == 'datetime':
+            series = _as_datetime(series)
+            valid = series.notna().to_numpy()
+            values = series.to_numpy(dtype='datetime64[ns]').view('int64')
+        else:
+            values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~np.isnan(values)
+        positions = np.flatnonzero(valid)
+        order = np.argsort(values[positions], kind='stable')
+        return values[positions][order], positions[order]
+
+    def category_index(self, data, column):
+        """(codes, labels) for a column; categoricals reuse their own codes"""
+        key = (dataset_fingerprint(data), column, 'codes')
+        return self._indexes.get_or_compute(key, lambda: self._build_codes(data[column]))
+
+    def _build_codes(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), series.cat.categories
+        codes, labels = pd.factorize(series)
+        return codes, pd.Index(labels)
+
+    def bounds(self, data, column):
+        """(min, max) of a numeric or date column from its sorted index, or None when it is empty"""
+        kind = 'datetime' if self._is_date(data[column]) else 'numeric'
+        values, _ = self.sorted_index(data, column, kind)
+        if values.size == 0:
+            return None
+        if kind == 'datetime':
+            return pd.Timestamp(values[0]), pd.Timestamp(values[-1])
+        return float(values[0]), float(values[-1])
+
+    def categories(self, data, column):
+        """Distinct values of a column, most frequent first"""
+        codes, labels = self.category_index(data, column)
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        return list(labels.take(np.argsort(-counts, kind='stable')))
+
+    def _is_date(self, series):
+        return pd.api.types.is_datetime64_any_dtype(series)
+
+    def mask(self, data, row_filter):
+        """Boolean mask for one predicate, cached per dataset"""
+        key = (dataset_fingerprint(data), row_filter)
+        return self._masks.get_or_compute(key, lambda: self._build_mask(data, row_filter))
+
+    def _build_mask(self, data, row_filter):
+        kind, column, value = row_filter
+        mask = np.zeros(len(data), dtype=bool)
+        if kind in ('range', 'date'):
+            if kind == 'date':
+                values, positions = self.sorted_index(data, column, 'datetime')
+                tz = getattr(data[column].dtype, 'tz', None)
+                low, high = (self._timestamp_ns(bound, tz) for bound in value)
+                # Half-open window: start <= value < end
+                start = 0 if low is None else np.searchsorted(values, low, side='left')
+                stop = len(values) if high is None else np.searchsorted(values, high, side='left')
+            else:
+                values, positions = self.sorted_index(data, column, 'numeric')
+                low, high = value
+                start = 0 if low is None else np.searchsorted(values, low, side='left')
+                stop = len(values) if high is None else np.searchsorted(values, high, side='right')
+            mask[positions[start:max(start, stop)]] = True
+        elif kind in ('in', 'prefix'):
+            codes, labels = self.category_index(data, column)
+            if kind == 'in':
+                ids = labels.get_indexer(pd.Index(value))
+                matches = np.zeros(len(labels), dtype=bool)
+                matches[ids[ids >= 0]] = True
+            else:
+                prefix, case = value
+                text = labels.astype(str)
+                if not case:
+                    text, prefix = text.str.lower(), prefix.lower()
+                matches = np.asarray(text.str.startswith(prefix), dtype=bool)
+            # One lookup per row through the codes; the extra slot maps missing values (-1) to False
+            lookup = np.append(matches, False)
+            mask = lookup[codes]
+        else:
+            raise ValueError(f"Unsupported filter kind: {kind}")
+        return mask
+
+    @staticmethod
+    def _timestamp_ns(bound, tz):
+        if bound is None:
+            return None
+        bound = pd.Timestamp(bound)
+        if tz is not None and bound.tzinfo is None:
+            bound = bound.tz_localize(tz)
+        elif tz is None and bound.tzinfo is not None:
+            bound = bound.tz_convert(None)
+        return bound.as_unit('ns').value
+
+    def combined_mask(self, data, filters):
+        """AND of the masks of every predicate, or None when there are none"""
+        masks = [self.mask(data, row_filter) for row_filter in filters]
+        if not masks:
+            return None
+        combined = masks[0].copy()
+        for mask in masks[1:]:
+            np.logical_and(combined, mask, out=combined)
+        return combined
+
+    def apply(self, data, filters):
+        """Rows of data matching every filter, without copying where possible.
+
+        No filters (or all rows matching) returns data itself, and a contiguous match is returned as a
+        positional slice, which shares data's buffers; other matches are gathered once and cached."""
+        filters = tuple(row_filter for row_filter in filters if row_filter.column in data.columns)
+        if not filters:
+            return data
+        key = (dataset_fingerprint(data), frozenset(filters))
+        view = self._views.get(key)
+        if view is None:
+            view = self._views.put(key, self._select(data, self.combined_mask(data, filters)))
+        return view
+
+    def _select(self, data, mask):
+        positions = np.flatnonzero(mask)
+        if len(positions) == len(data):
+            return data
+        if len(positions) == 0:
+            return data.iloc[0:0]
+        if positions[-1] - positions[0] + 1 == len(positions):
+            return data.iloc[positions[0]:positions[-1] + 1]
+        return data.take(positions)
+
+
+# Shared engine so indexes and masks survive Streamlit reruns and are reused across sessions
+filter_engine = FilterEngine()
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+BIN_RULES = ['auto', 'fd', 'sturges', 'sqrt']
+MAX_BINS = 5000
+
+
+class HistogramEngine:
+    """Bins columns server-side, caching sorted values and bin edges between calls"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_edge_sets=512):
+        # (fingerprint, column) -> (sorted values, kind); values are float64 or int64 ns for dates
+        self._sorted = LRUCache(max_bytes=max_bytes)
+        # (fingerprint, column, bins, range, log) -> edges
+        self._edges = LRUCache(max_items=max_edge_sets)
+
+    def sorted_values(self, data, column):
+        """Return the sorted non-missing values of a column and its kind ('numeric' or 'datetime')"""
+        key = (dataset_fingerprint(data), column)
+        return self._sorted.get_or_compute(key, lambda: self._prepare(data[column]))
+
+    def _prepare(self, series):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dropna().to_numpy(dtype='datetime64[ns]').view('int64').copy()
+            kind = 'datetime'
+        else:
+            values = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            values = values[np.isfinite(values)]
+            kind = 'numeric'
+        values.sort(kind='stable')
+        return values, kind
+
+    def bin_edges(self, data, column, bins=30, value_range=None, log=False):
+        """Return cached bin edges for a column.
+
+        bins may be an integer, one of BIN_RULES, or a pandas frequency alias
+        (e.g. 'D', 'W', 'MS') for datetime columns.
+        """
+        if isinstance(bins, np.integer):
+            bins = int(bins)
+        if value_range is not None:
+            value_range = tuple(value_range)
+        key = (dataset_fingerprint(data), column, bins, value_range, log)
+        edges = self._edges.get(key)
+        if edges is None:
+            values, kind = self.sorted_values(data, column)
+            edges = self._edges.put(key, self._compute_edges(values, kind, bins, value_range, log))
+        return edges
+
+    def histogram(self, data, column, bins=30, value_range=None, log=False, backend=None):
+        """Return (counts, edges, kind) using binary search over the cached sorted column.
+
+        With a pushdown backend, plain numeric bin counts are computed by the backend without sorting."""
+        if isinstance(bins, np.integer):
+            bins = int(bins)
+        if (backend is not None and backend.pushdown and isinstance(bins, int) and value_range is None
+                and not log and not pd.api.types.is_datetime64_any_dtype(data[column])):
+            key = (dataset_fingerprint(data), column, bins, None, False)
+            edges = self._edges.get(key)
+            if edges is None:
+                bounds = backend.value_range(data, column)
+                edges = np.array([], dtype='float64') if bounds is None else _linear_edges(*bounds, bins)
+                edges = self._edges.put(key, edges)
+            if edges.size < 2:
+                return np.zeros(0, dtype='int64'), edges, 'numeric'
+            return backend.histogram_counts(data, column, edges), edges, 'numeric'
+
+        values, kind = self.sorted_values(data, column)
+        edges = self.bin_edges(data, column, bins, value_range, log)
+        if edges.size < 2:
+            return np.zeros(0, dtype='int64'), edges, kind
+
+        # Same semantics as np.histogram: half-open bins, last bin closed on the right
+        positions = np.searchsorted(values, edges, side='left')
+        positions[-1] = np.searchsorted(values, edges[-1], side='right')
+        counts = np.diff(positions)
+        return counts, edges, kind
+
+    def _compute_edges(self, values, kind, bins, value_range, log):
+        if value_range is not None:
+            lo, hi = value_range
+            if kind == 'datetime':
+                lo, hi = pd.Timestamp(lo).value, pd.Timestamp(hi).value
+            start = np.searchsorted(values, lo, side='left')
+            stop = np.searchsorted(values, hi, side='right')
+            values = values[start:stop]
+        else:
+            lo, hi = (values[0], values[-1]) if values.size else (0, 0)
+
+        if values.size == 0:
+            return np.array([], dtype='int64' if kind == 'datetime' else 'float64')
+
+        if kind == 'datetime' and isinstance(bins, str) and bins not in BIN_RULES:
+            return self._calendar_edges(lo, hi, bins)
+
+        if log:
+            if kind == 'datetime':
+                raise ValueError("Log bins are not supported for datetime columns")
+            values = values[values > 0]
+            if values.size == 0:
+                raise ValueError("Log bins require positive values")
+            lo = max(lo, values[0])
+            count = bins if isinstance(bins, int) else _rule_bin_count(np.log10(values), bins)
+            if lo == hi:
+                hi = lo * 10
+            return np.geomspace(lo, hi, min(count, MAX_BINS) + 1)
+
+        count = bins if isinstance(bins, int) else _rule_bin_count(values, bins)
+        edges = _linear_edges(lo, hi, count)
+        if kind == 'datetime':
+            # float64 cannot hold every ns timestamp exactly; keep the extremes inside the bins
+            edges = np.round(edges).astype('int64')
+            edges[0] = min(edges[0], int(lo))
+            edges[-1] = max(edges[-1], int(hi))
+        return edges
+
+    def _calendar_edges(self, lo, hi, freq):
+        offset = pd.tseries.frequencies.to_offset(freq)
+        start = offset.rollback(pd.Timestamp(lo).normalize())
+        end = offset.rollforward(pd.Timestamp(hi))
+        edges = pd.date_range(start, end, freq=offset)
+        if len(edges) < 2 or edges[-1] < pd.Timestamp(hi):
+            edges = edges.append(pd.DatetimeIndex([edges[-1] + offset]))
+        if len(edges) > MAX_BINS + 1:
+            raise ValueError(f"Frequency '{freq}' produces more than {MAX_BINS} bins")
+        return edges.as_unit('ns').asi8.copy()
+
+    def create_histogram_trace(self, data, column, bins=30, value_range=None, log=False, backend=None):
+        """Build a compact pre-binned bar trace for a column"""
+        counts, edges, kind = self.histogram(data, column, bins, value_range, log, backend)
+        if kind == 'datetime':
+            left = edges[:-1].astype('datetime64[ns]')
+            right = edges[1:].astype('datetime64[ns]')
+            # Date axes measure bar widths in milliseconds
+            widths = np.diff(edges) / 1e6
+            centers = (edges[:-1] + np.diff(edges) // 2).astype('datetime64[ns]')
+        elif log:
+            left, right = edges[:-1], edges[1:]
+            widths = None
+            centers = np.sqrt(left * right)
+        else:
+            left, right = edges[:-1], edges[1:]
+            widths = np.diff(edges)
+            centers = left + widths / 2
+
+        return go.Bar(
+            x=centers,
+            y=counts,
+            width=widths,
+            customdata=np.column_stack([left, right]) if len(counts) else None,
+            hovertemplate="%{customdata[0]} – %{customdata[1]}<br>Count: %{y}<extra></extra>",
+            name=column
+        )
+
+
+def _sorted_quantile(values, q):
+    """Linear-interpolated quantile of an already sorted array"""
+    position = q * (values.size - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, values.size - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _linear_edges(lo, hi, count):
+    """Evenly spaced float edges from lo to hi (a single value gets a unit-wide bin)"""
+    lo, hi = float(lo), float(hi)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, min(max(count, 1), MAX_BINS) + 1)
+
+
+def _rule_bin_count(values, rule):
+    """Number of bins for a sorted array under a named binning rule"""
+    if rule not in BIN_RULES:
+        raise ValueError(f"Unknown binning rule: {rule}")
+    n = values.size
+    span = float(values[-1] - values[0]) if n else 0.0
+    if n < 2 or span == 0:
+        return 1
+
+    sturges = int(np.ceil(np.log2(n))) + 1
+    if rule == 'sturges':
+        return sturges
+    if rule == 'sqrt':
+        return int(np.ceil(np.sqrt(n)))
+
+    iqr = float(_sorted_quantile(values, 0.75) - _sorted_quantile(values, 0.25))
+    fd = int(np.ceil(span / (2.0 * iqr * n ** (-1.0 / 3.0)))) if iqr > 0 else 0
+    if rule == 'fd':
+        return min(fd or sturges, MAX_BINS)
+    # 'auto' uses whichever of Freedman–Diaconis and Sturges gives the finer bins
+    return min(max(fd, sturges), MAX_BINS)
+
+
+# Shared engine so caches survive Streamlit reruns that recreate ChartGenerator
+histogram_engine = HistogramEngine()
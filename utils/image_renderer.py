@@ -0,0 +1,123 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.io as pio
+
+from utils.cache_utils import LRUCache
+
+IMAGE_FORMATS = ['png', 'svg', 'jpeg', 'webp', 'pdf']
+RENDER_TIMEOUT = 120
+
+logger = logging.getLogger(__name__)
+
+
+class ChartImageRenderer:
+    """Renders figures to static images with a warm kaleido browser, bounded concurrency and a byte cache"""
+
+    def __init__(self, max_workers=4, max_bytes=128 * 1024 * 1024):
+        self.max_workers = max_workers
+        self._images = LRUCache(max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._started = False
+        # kaleido >= 1.0: one browser with a tab per worker, driven from a private event loop
+        self._loop = None
+        self._kaleido = None
+        # Fallback (older kaleido or no browser yet): pio.to_image on a bounded thread pool
+        self._executor = None
+
+    def start(self):
+        """Start the renderer once and keep it warm for every later export"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            try:
+                import kaleido
+                if hasattr(kaleido, 'Kaleido'):
+                    self._loop = asyncio.new_event_loop()
+                    threading.Thread(target=self._loop.run_forever, name="kaleido-loop", daemon=True).start()
+                    self._kaleido = self._call(self._open_browser(kaleido.Kaleido))
+            except Exception as e:
+                # No browser available: pio.to_image reports the problem on each render
+                logger.warning("Persistent kaleido renderer unavailable: %s", e)
+                self._kaleido = None
+                if self._loop is not None:
+                    self._loop.call_soon_threadsafe(self._loop.stop)
+                    self._loop = None
+            if self._kaleido is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chart-image")
+            atexit.register(self.stop)
+
+    async def _open_browser(self, kaleido_class):
+        return await kaleido_class(n=self.max_workers)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(RENDER_TIMEOUT)
+
+    def stop(self):
+        with self._lock:
+            if self._kaleido is not None:
+                try:
+                    self._call(self._kaleido.close())
+                except Exception:
+                    pass
+                self._kaleido = None
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._started = False
+
+    def _as_json(self, fig):
+        if isinstance(fig, str):
+            return fig
+        if isinstance(fig, dict):
+            return pio.to_json(fig, validate=False)
+        return fig.to_json()
+
+    def _key(self, fig_json, image_format, width, height, scale):
+        digest = hashlib.blake2b(fig_json.encode(), digest_size=16).hexdigest()
+        return (digest, image_format, width, height, scale)
+
+    def _submit(self, fig_json, image_format, width, height, scale):
+        """Start one render and return a concurrent.futures.Future for its bytes"""
+        fig_dict = json.loads(fig_json)
+        if self._kaleido is not None:
+            opts = dict(format=image_format, width=width, height=height, scale=scale)
+            return asyncio.run_coroutine_threadsafe(self._kaleido.calc_fig(fig_dict, opts=opts), self._loop)
+        return self._executor.submit(pio.to_image, fig_dict, format=image_format, width=width,
+                                     height=height, scale=scale, validate=False)
+
+    def render(self, fig, image_format="png", width=600, height=400, scale=1):
+        """Render one figure (Figure, dict or JSON string), served from cache when already rendered"""
+        return self.render_many([fig], image_format, width, height, scale)[0]
+
+    def render_many(self, figs, image_format="png", width=600, height=400, scale=1):
+        """Render several figures concurrently; returns image bytes in input order"""
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.start()
+
+        fig_jsons = [self._as_json(fig) for fig in figs]
+        keys = [self._key(fig_json, image_format, width, height, scale) for fig_json in fig_jsons]
+        results = [self._images.get(key) for key in keys]
+
+        # Identical figures in one batch are rendered once; kaleido tabs / pool size bound concurrency
+        pending = {}
+        for i, (key, image) in enumerate(zip(keys, results)):
+            if image is None and key not in pending:
+                pending[key] = self._submit(fig_jsons[i], image_format, width, height, scale)
+
+        rendered = {key: self._images.put(key, future.result(RENDER_TIMEOUT)) for key, future in pending.items()}
+        return [image if image is not None else rendered[key] for key, image in zip(keys, results)]
+
+
+# Shared renderer so the browser stays warm across exports and sessions
+image_renderer = ChartImageRenderer()
@@ -1,8 +1,12 @@
 import pandas as pd
 
+from utils.execution_backend import get_backend
+
 class KPICalculator:
-    def __init__(self, data):
-        self.data = data.copy()
+    def __init__(self, data, backend=None):
+        # Shallow: nothing here writes to the frame, so filtered views are not copied again
+        self.data = data.copy(deep=False)
+        self.backend = backend or get_backend()
 
     def calculate_basic_kpis(self, columns):
         results = {}
@@ -32,10 +36,16 @@ class KPICalculator:
             return 0
 
     def calculate_grouped_kpis(self, kpi_columns, group_by_col):
-        grouped = self.data.groupby(group_by_col)[kpi_columns].agg(['sum', 'mean'])
-        # Flatten MultiIndex
-        grouped.columns = ['_'.join(col).strip() for col in grouped.columns.values]
-        return grouped
+        return self.backend.grouped_kpis(self.data, kpi_columns, group_by_col)
+
+    def calculate_data_quality(self):
+        """Share of non-missing cells and of distinct rows, in percent"""
+        rows, columns = self.data.shape
+        cells = rows * columns
+        return {
+            'completeness': (1 - self.data.isnull().sum().sum() / cells) * 100 if cells else 100.0,
+            'unique_ratio': len(self.data.drop_duplicates()) / rows * 100 if cells else 100.0
+        }
 
     def calculate_custom_kpi(self, formula, column_mapping):
         """Calculate custom KPI using user-defined formula"""
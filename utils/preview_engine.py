@@ -0,0 +1,261 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache
+
+DEFAULT_SAMPLE_ROWS = 100_000
+CONFIDENCE_LEVELS = [0.90, 0.95, 0.99]
+# Stratified draws loop over the strata; columns with more distinct values are not worth stratifying by
+MAX_STRATA = 1000
+
+
+def z_value(confidence):
+    """Two-sided normal critical value for a confidence level"""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def _allocate(strata_population, rows):
+    """Proportional allocation with at least two rows per stratum, so every stratum has a variance"""
+    total = strata_population.sum()
+    sampled = np.round(rows * strata_population / max(total, 1)).astype('int64')
+    sampled = np.maximum(sampled, np.minimum(strata_population, 2))
+    return np.minimum(sampled, strata_population)
+
+
+class PreviewSample:
+    """Sampled rows of a dataset with the stratum sizes needed to estimate totals and means.
+
+    Estimates use the stratified expansion estimator; mean intervals linearize the ratio of the
+    estimated sum to the estimated count of non-missing values."""
+
+    def __init__(self, data, population, strata_column, strata_population, strata_sampled, strata_codes,
+                 build_seconds=0.0):
+        self.data = data
+        self.population = population
+        self.strata_column = strata_column
+        # Rows per stratum in the dataset and in the sample; strata_codes: stratum of each sampled row
+        self.strata_population = strata_population.astype('float64')
+        self.strata_sampled = strata_sampled.astype('float64')
+        self.strata_codes = strata_codes
+        self.build_seconds = build_seconds
+
+    @property
+    def rows(self):
+        return len(self.data)
+
+    @property
+    def fraction(self):
+        return self.rows / self.population if self.population else 1.0
+
+    @property
+    def scale(self):
+        """Factor turning sample sums and counts into estimates for the whole dataset"""
+        return self.population / max(self.rows, 1)
+
+    @property
+    def nbytes(self):
+        return (int(self.data.memory_usage(deep=False).sum()) + self.strata_codes.nbytes
+                + self.strata_population.nbytes + self.strata_sampled.nbytes)
+
+    def _values(self, column):
+        return pd.to_numeric(self.data[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    def _stratum_sums(self, values, domain_codes=None, n_domains=1):
+        """Per stratum (and domain) sums of y, y² and of the non-missing indicator, strata x domains"""
+        present = ~np.isnan(values)
+        y = np.where(present, values, 0.0)
+        n_strata = len(self.strata_population)
+        ids = self.strata_codes if domain_codes is None else self.strata_codes * n_domains + domain_codes
+        keep = slice(None) if domain_codes is None else domain_codes >= 0
+        ids, y, present = ids[keep], y[keep], present[keep]
+        shape = (n_strata, n_domains)
+        size = n_strata * n_domains
+        return (np.bincount(ids, weights=y, minlength=size).reshape(shape),
+                np.bincount(ids, weights=y * y, minlength=size).reshape(shape),
+                np.bincount(ids, weights=present, minlength=size).reshape(shape))
+
+    def _total_variance(self, s1, s2):
+        """Variance of an estimated total from per-stratum sums of a variable and its square"""
+        population = self.strata_population[:, np.newaxis]
+        sampled = self.strata_sampled[:, np.newaxis]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spread = np.where(sampled > 1, (s2 - s1 * s1 / sampled) / (sampled - 1), 0.0)
+            # Finite population correction: a stratum sampled in full contributes no error
+            terms = np.where(sampled > 0, population ** 2 * (1 - sampled / population) * spread / sampled, 0.0)
+        return np.maximum(terms, 0.0).sum(axis=0)
+
+    def _estimate(self, s1, s2, counts, z):
+        """(sum, sum half-width, mean, mean half-width) per domain"""
+        weights = np.divide(self.strata_population, self.strata_sampled,
+                            out=np.zeros_like(self.strata_population), where=self.strata_sampled > 0)
+        total = weights @ s1
+        count = weights @ counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            # Residuals e = y - mean * present: sum(e) and sum(e²) follow from the same sums
+            e1 = s1 - mean * counts
+            e2 = s2 - 2 * mean * s1 + mean ** 2 * counts
+            mean_variance = self._total_variance(e1, e2) / count ** 2
+        return total, z * np.sqrt(self._total_variance(s1, s2)), mean, z * np.sqrt(mean_variance)
+
+    def estimate_kpis(self, columns, confidence=0.95):
+        """Same layout as KPICalculator.calculate_basic_kpis, plus 'sum_ci' and 'mean_ci' half-widths"""
+        z = z_value(confidence)
+        results = {}
+        for col in columns:
+            if not pd.api.types.is_numeric_dtype(self.data[col]):
+                continue
+            total, total_ci, mean, mean_ci = self._estimate(*self._stratum_sums(self._values(col)), z)
+            results[col] = {'sum': float(total[0]), 'mean': float(mean[0]),
+                            'sum_ci': float(total_ci[0]), 'mean_ci': float(mean_ci[0])}
+        return results
+
+    def estimate_grouped_kpis(self, kpi_columns, group_column, confidence=0.95):
+        """Same layout as KPICalculator.calculate_grouped_kpis, plus <column>_sum_ci and <column>_mean_ci.
+
+        Groups absent from the sample are missing from the result."""
+        z = z_value(confidence)
+        codes, labels = pd.factorize(self.data[group_column])
+        columns = {}
+        for col in kpi_columns:
+            total, total_ci, mean, mean_ci = self._estimate(
+                *self._stratum_sums(self._values(col), codes, len(labels)), z
+            )
+            columns.update({f"{col}_sum": total, f"{col}_sum_ci": total_ci,
+                            f"{col}_mean": mean, f"{col}_mean_ci": mean_ci})
+        frame = pd.DataFrame(columns, index=pd.Index(labels, name=group_column))
+        try:
+            return frame.sort_index()
+        except TypeError:
+            return frame
+
+    def estimate_completeness(self):
+        """Share of non-missing cells in percent (proportional allocation keeps the sample self-weighting)"""
+        cells = self.rows * len(self.data.columns)
+        return 100.0 * (1 - self.data.isnull().to_numpy().sum() / cells) if cells else 100.0
+
+
+class PreviewEngine:
+    """Draws cached samples for fast approximate KPIs and charts, and computes exact results in the background"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_workers=2, seed=0):
+        self.seed = seed
+        self._samples = LRUCache(max_bytes=max_bytes, sizeof=lambda sample: sample.nbytes)
+        self._results = LRUCache(max_bytes=max_bytes)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview-exact")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def sample(self, data, key, rows=DEFAULT_SAMPLE_ROWS, strata_column=None):
+        """Cached sample of data; key identifies the dataset (e.g. its content key) so its rows are never hashed"""
+        return self._samples.get_or_compute(
+            (key, rows, strata_column), lambda: self._draw(data, rows, strata_column)
+        )
+
+    def _draw(self, data, rows, strata_column):
+        started = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        population = len(data)
+        if strata_column is None:
+            sampled = min(rows, population)
+            positions = np.sort(rng.choice(population, sampled, replace=False))
+            strata_population = np.array([population])
+            strata_sampled = np.array([sampled])
+            strata_codes = np.zeros(sampled, dtype='int64')
+        else:
+            # Missing values form a stratum of their own
+            codes, labels = pd.factorize(data[strata_column], use_na_sentinel=False)
+            if len(labels) > MAX_STRATA:
+                raise ValueError(f"{strata_column} has too many distinct values to stratify by "
+                                 f"({len(labels):,} > {MAX_STRATA:,})")
+            strata_population = np.bincount(codes, minlength=len(labels))
+            strata_sampled = _allocate(strata_population, rows)
+            # int16 codes let the stable argsort use a linear-time radix sort
+            order = np.argsort(codes.astype('int16'), kind='stable')
+            starts = np.concatenate([[0], np.cumsum(strata_population)[:-1]])
+            picks = [order[start + rng.choice(size, count, replace=False)]
+                     for start, size, count in zip(starts, strata_population, strata_sampled)]
+            positions = np.sort(np.concatenate(picks)) if picks else np.zeros(0, dtype='int64')
+            strata_codes = codes[positions].astype('int64')
+        return PreviewSample(
+            data.take(positions), population, strata_column, strata_population, strata_sampled, strata_codes,
+            time.perf_counter() - started
+        )
+
+    def submit(self, key, compute):
+        """Start compute() in the background (once per key) and return key for status polling.
+
+        A failed job is final: its key keeps reporting the error until retry()."""
+        if key in self._results:
+            return key
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and ('error' in job or not job['future'].done()):
+                return key
+            job = {'message': "Computing exact results on all rows...", 'future': None}
+            self._jobs[key] = job
+            job['future'] = self._executor.submit(self._execute, key, job, compute)
+        return key
+
+    def retry(self, key):
+        """Forget a failed job so the next submit() starts it again"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and 'error' in job:
+                del self._jobs[key]
+
+    def compute(self, key, compute):
+        """Exact result for key: cached, awaited from a job already computing it, or computed in this thread"""
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            job = self._jobs.get(key)
+            owner = job is None or job['future'].done()
+            if owner:
+                # Registered like a background job, so status() and concurrent callers see it
+                job = {'message': "Computing exact results on all rows...", 'future': Future()}
+                self._jobs[key] = job
+        if not owner:
+            return job['future'].result()
+        try:
+            result = self._execute(key, job, compute)
+        except Exception as e:
+            job['future'].set_exception(e)
+            raise
+        job['future'].set_result(result)
+        return result
+
+    def _execute(self, key, job, compute):
+        try:
+            result = compute()
+        except Exception as e:
+            # Keep the failed job around so status() can report the error
+            job['error'] = str(e)
+            raise
+        self._results.put(key, result)
+        with self._lock:
+            self._jobs.pop(key, None)
+        return result
+
+    def status(self, key):
+        """Return {'state': 'done'|'running'|'error'|'missing', 'message'[, 'data']} for an exact job"""
+        cached = self._results.get(key)
+        if cached is not None:
+            return {'state': 'done', 'message': "Exact", 'data': cached}
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return {'state': 'missing', 'message': "Not started"}
+        if 'error' in job:
+            return {'state': 'error', 'message': job['error']}
+        return {'state': 'running', 'message': job['message']}
+
+
+# Shared engine so samples and exact results are reused across reruns and sessions
+preview_engine = PreviewEngine()
@@ -0,0 +1,178 @@
+import io
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, KeepTogether, PageBreak
+
+from utils.export_manager import ExportManager, EXCEL_SPOOL_MAX_SIZE, _report_progress
+from utils.figure_serializer import chart_data_frame, figure_to_json
+from utils.image_renderer import image_renderer as shared_image_renderer
+
+class DashboardReportBuilder:
+    """Assembles KPI sections and many charts into one PDF and one Excel workbook"""
+
+    def __init__(self, title="Dashboard Report", export_manager=None, image_renderer=None):
+        self.title = title
+        self.image_renderer = image_renderer or shared_image_renderer
+        self.export_manager = export_manager or ExportManager(image_renderer=self.image_renderer)
+        self.sections = []
+        self.timings = []
+
+    def add_kpi_section(self, title, kpis_data, grouped_kpis=None, export_data=None):
+        self.sections.append({'kind': 'kpi', 'title': title, 'kpis': kpis_data,
+                              'grouped': grouped_kpis, 'export_data': export_data})
+        return self
+
+    def add_chart(self, title, fig, data=None):
+        """Add a chart (Figure, dict or JSON string); its sheet uses data, or the trace arrays when None"""
+        fig_json = fig if isinstance(fig, str) else figure_to_json(fig)
+        self.sections.append({'kind': 'chart', 'title': title, 'fig_json': fig_json, 'data': data})
+        return self
+
+    @property
+    def charts(self):
+        return [section for section in self.sections if section['kind'] == 'chart']
+
+    def _record(self, section, step, started):
+        self.timings.append({'section': section, 'step': step, 'seconds': time.perf_counter() - started})
+
+    def render_images(self, width=600, height=400):
+        """Render every chart image in one concurrent batch; failed charts map to their exception"""
+        fig_jsons = [chart['fig_json'] for chart in self.charts]
+        if not fig_jsons:
+            return []
+        started = time.perf_counter()
+        try:
+            images = self.image_renderer.render_many(fig_jsons, "png", width=width, height=height)
+        except Exception:
+            # One bad chart should not sink the report: retry individually (successful renders are cached)
+            images = []
+            for fig_json in fig_jsons:
+                try:
+                    images.append(self.image_renderer.render(fig_json, "png", width=width, height=height))
+                except Exception as e:
+                    images.append(e)
+        self._record("All charts", f"render {len(fig_jsons)} images", started)
+        return images
+
+    def build_pdf(self, progress_callback=None):
+        """Single PDF with every section; chart images render while the KPI tables are laid out"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        styles = self.export_manager.styles
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            textColor=colors.darkblue
+        )
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-images") as executor:
+            images_future = executor.submit(self.render_images)
+
+            story = [Paragraph(self.title, title_style), Spacer(1, 12)]
+            report_info = f"""
+            <b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
+            <b>Sections:</b> {len(self.sections)} ({len(self.charts)} charts)
+            """
+            story.append(Paragraph(report_info, styles['Normal']))
+            story.append(Spacer(1, 20))
+
+            section_stories = []
+            for section in self.sections:
+                if section['kind'] == 'kpi':
+                    started = time.perf_counter()
+                    flowables = [Paragraph(section['title'], styles['Heading1'])]
+                    flowables.extend(self.export_manager.kpi_story(
+                        section['kpis'], section['grouped'], section['export_data'], doc.width
+                    ))
+                    flowables.append(PageBreak())
+                    self._record(section['title'], "pdf tables", started)
+                    section_stories.append(flowables)
+                else:
+                    section_stories.append(None)
+            _report_progress(progress_callback, 0.3, "Rendering chart images")
+
+            images = iter(images_future.result())
+
+        for section, flowables in zip(self.sections, section_stories):
+            if flowables is not None:
+                story.extend(flowables)
+                continue
+            image = next(images)
+            heading = Paragraph(section['title'], styles['Heading2'])
+            if isinstance(image, Exception):
+                body = Paragraph(f"Chart image could not be generated: {str(image)}", styles['Normal'])
+            else:
+                body = Image(io.BytesIO(image), width=6*inch, height=4*inch)
+            story.append(KeepTogether([heading, body, Spacer(1, 12)]))
+
+        _report_progress(progress_callback, 0.6, "Laying out PDF")
+        started = time.perf_counter()
+        doc.build(story)
+        self._record("Report", "pdf layout", started)
+        _report_progress(progress_callback, 1.0, "Done")
+        buffer.seek(0)
+        return buffer.getvalue()
+
+    def write_excel(self, output, progress_callback=None):
+        """Stream every section into one workbook: KPI sheets, then one data sheet per chart"""
+        manager = self.export_manager
+        workbook = manager._create_streaming_workbook(output)
+        formats = manager._add_excel_formats(workbook)
+        # Lower-cased names of every sheet written so far; all sheets, KPI ones included, are named against it
+        used = set()
+        kpi_sections = [section for section in self.sections if section['kind'] == 'kpi']
+        contents = []
+
+        for i, section in enumerate(self.sections):
+            started = time.perf_counter()
+            if section['kind'] == 'kpi':
+                prefix = f"{kpi_sections.index(section) + 1}. " if len(kpi_sections) > 1 else ""
+                worksheets = manager.write_kpi_sheets(workbook, formats, section['kpis'], section['grouped'],
+                                                      section['export_data'], sheet_prefix=prefix, used=used)
+            else:
+                data = section['data']
+                if data is None:
+                    data = chart_data_frame(section['fig_json'])
+                worksheets = manager._write_excel_table(workbook, section['title'], data, formats[0],
+                                                        column_width=15, used=used)
+            sheet = worksheets[0].name if worksheets else ""
+            self._record(section['title'], "excel sheets", started)
+            contents.append([section['title'], section['kind'].upper(), sheet])
+            _report_progress(progress_callback, 0.95 * (i + 1) / max(len(self.sections), 1),
+                             f"Wrote {section['title']}")
+
+        info_data = pd.DataFrame(contents, columns=['Section', 'Type', 'Sheet'])
+        worksheet = manager._write_excel_table(workbook, "Contents", info_data, formats[0], used=used)[0]
+        worksheet.set_column('A:A', 40)
+        worksheet.set_column('B:C', 20)
+
+        workbook.close()
+        _report_progress(progress_callback, 1.0, "Done")
+
+    def build_excel(self, progress_callback=None):
+        with tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE) as output:
+            self.write_excel(output, progress_callback=progress_callback)
+            output.seek(0)
+            return output.read()
+
+    def build(self):
+        """Build both reports and return {'pdf', 'excel', 'timings'}"""
+        self.timings = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="report") as executor:
+            pdf_future = executor.submit(self.build_pdf)
+            excel_future = executor.submit(self.build_excel)
+            result = {'pdf': pdf_future.result(), 'excel': excel_future.result()}
+        self._record("Report", "total", started)
+        result['timings'] = pd.DataFrame(self.timings)
+        return result
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import LRUCache, dataset_fingerprint
+
+RANK_METRICS = ['sum', 'mean', 'count']
+OTHER_LABEL = "Other"
+
+
+class TopNEngine:
+    """Aggregates a category/value pair once and answers Top-N queries from the cached vectors"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        # (fingerprint, category, value, group) -> aggregate dict
+        self._aggregates = LRUCache(max_bytes=max_bytes)
+
+    def aggregate(self, data, category_column, value_column, group_column=None, backend=None):
+        """Return per-category (or per group/category pair) sums and counts, cached per dataset.
+
+        A pushdown backend (DuckDB, Polars) computes the grouped sums; ranking stays here."""
+        if backend is not None and backend.pushdown:
+            key = (dataset_fingerprint(data), category_column, value_column, group_column, backend.name)
+            return self._aggregates.get_or_compute(
+                key, lambda: self._from_frame(
+                    backend.category_aggregate(data, category_column, value_column, group_column),
+                    category_column, group_column
+                )
+            )
+        key = (dataset_fingerprint(data), category_column, value_column, group_column)
+        return self._aggregates.get_or_compute(
+            key, lambda: self._aggregate(data, category_column, value_column, group_column)
+        )
+
+    def _from_frame(self, frame, category_column, group_column):
+        """Aggregate dict from a backend's [group,] category, sum, count frame (no per-row codes)"""
+        result = {
+            'sum': frame['sum'].to_numpy(dtype='float64'),
+            'count': frame['count'].to_numpy(dtype='float64')
+        }
+        if group_column is not None:
+            pair_group, result['group_labels'] = pd.factorize(frame[group_column])
+            pair_category, result['labels'] = pd.factorize(frame[category_column])
+            result['pair_group'] = pair_group.astype('int64')
+            result['pair_category'] = pair_category.astype('int64')
+        else:
+            result['labels'] = pd.Index(frame[category_column])
+        return result
+
+    def _aggregate(self, data, category_column, value_column, group_column):
+        codes, labels = pd.factorize(data[category_column])
+        values = pd.to_numeric(data[value_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+        result = {'labels': labels}
+        if group_column is not None:
+            group_codes, group_labels = pd.factorize(data[group_column])
+            valid_rows = (codes >= 0) & (group_codes >= 0)
+            pair_keys = group_codes[valid_rows].astype('int64') * len(labels) + codes[valid_rows]
+            pair_codes, pair_keys = pd.factorize(pair_keys)
+            codes = np.full(len(codes), -1, dtype='int64')
+            codes[valid_rows] = pair_codes
+            result['group_labels'] = group_labels
+            result['pair_group'] = pair_keys // len(labels)
+            result['pair_category'] = pair_keys % len(labels)
+            size = len(pair_keys)
+        else:
+            size = len(labels)
+
+        # Single pass over the rows: groupby().sum() semantics, NaN values skipped
+        valid = (codes >= 0) & ~np.isnan(values)
+        result['codes'] = codes
+        result['sum'] = np.bincount(codes[valid], weights=values[valid], minlength=size)
+        result['count'] = np.bincount(codes[valid], minlength=size).astype('float64')
+        return result
+
+    @staticmethod
+    def value_label(value_column, by='sum'):
+        """Name of the value column in Top-N results for a ranking metric"""
+        return value_column if by == 'sum' else f"{value_column} ({by})"
+
+    def top_n(self, data, category_column, value_column, n=10, by='sum', group_column=None, include_other=False,
+              backend=None):
+        """Return the top N categories (per group if group_column is set) as a DataFrame"""
+        if by not in RANK_METRICS:
+            raise ValueError(f"Unsupported ranking metric: {by}")
+        agg = self.aggregate(data, category_column, value_column, group_column, backend)
+        scores = _metric(agg['sum'], agg['count'], by)
+        value_name = self.value_label(value_column, by)
+
+        if group_column is None:
+            top = _top_indices(scores, n)
+            frame = pd.DataFrame({
+                category_column: agg['labels'].take(top),
+                value_name: scores[top]
+            })
+            if include_other and len(top) < len(scores):
+                rest = np.ones(len(scores), dtype=bool)
+                rest[top] = False
+                other = _metric(agg['sum'][rest].sum(), agg['count'][rest].sum(), by)
+                frame = pd.concat(
+                    [frame.astype({category_column: object}),
+                     pd.DataFrame({category_column: [OTHER_LABEL], value_name: [other]})],
+                    ignore_index=True
+                )
+            return frame
+
+        # Rank pairs inside each group: sort by (group, -score) and keep the first n of each run
+        pair_group = agg['pair_group']
+        order = np.lexsort((-np.nan_to_num(scores, nan=-np.inf), pair_group))
+        sorted_groups = pair_group[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        run_lengths = np.diff(np.r_[starts, len(order)])
+        rank = np.arange(len(order)) - np.repeat(starts, run_lengths)
+        keep = order[rank < n]
+
+        frame = pd.DataFrame({
+            group_column: agg['group_labels'].take(pair_group[keep]),
+            category_column: agg['labels'].take(agg['pair_category'][keep]),
+            value_name: scores[keep]
+        })
+        if include_other:
+            dropped = order[rank >= n]
+            if dropped.size:
+                n_groups = len(agg['group_labels'])
+                other_sum = np.bincount(pair_group[dropped], weights=agg['sum'][dropped], minlength=n_groups)
+                other_count = np.bincount(pair_group[dropped], weights=agg['count'][dropped], minlength=n_groups)
+                has_other = np.bincount(pair_group[dropped], minlength=n_groups) > 0
+                other = pd.DataFrame({
+                    group_column: agg['group_labels'][has_other],
+                    category_column: OTHER_LABEL,
+                    value_name: _metric(other_sum[has_other], other_count[has_other], by)
+                })
+                frame = pd.concat([frame.astype({category_column: object}), other], ignore_index=True)
+                frame = frame.sort_values(group_column, kind='stable', ignore_index=True)
+        return frame
+
+    def top_n_rows(self, data, category_column, value_column, n=10, by='sum', backend=None):
+        """Return the raw rows belonging to the top N categories, using the cached category codes"""
+        agg = self.aggregate(data, category_column, value_column, backend=backend)
+        top = _top_indices(_metric(agg['sum'], agg['count'], by), n)
+        if 'codes' not in agg:
+            return data[data[category_column].isin(agg['labels'].take(top))]
+        return data[np.isin(agg['codes'], top)]
+
+
+def _metric(sums, counts, by):
+    if by == 'sum':
+        return sums
+    if by == 'count':
+        return counts
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.divide(sums, counts)
+
+
+def _top_indices(scores, n):
+    """Indices of the n largest scores in descending order; O(len) selection via argpartition"""
+    ranked = np.nan_to_num(scores, nan=-np.inf)
+    if n <= 0:
+        return np.array([], dtype='int64')
+    if n < ranked.size:
+        candidates = np.argpartition(-ranked, n - 1)[:n]
+    else:
+        candidates = np.arange(ranked.size)
+    return candidates[np.argsort(-ranked[candidates], kind='stable')]
+
+
+# Shared engine so the aggregated vectors survive Streamlit reruns
+top_n_engine = TopNEngine()
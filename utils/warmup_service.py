@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache_utils import LRUCache
+
+
+class WarmupService:
+    """Runs the work an upload is likely to need next in a background thread pool, filling the shared caches.
+
+    A warm-up is an ordered list of named steps for one dataset. Steps run one after another in a
+    worker, so later steps can rely on earlier ones (the fingerprint, the profile); cancelling stops
+    the run before its next step."""
+
+    def __init__(self, max_workers=2, max_runs=16):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup")
+        # dataset key -> run state; finished runs are kept for their results and timings
+        self._runs = LRUCache(max_items=max_runs, sizeof=lambda run: 0)
+        self._lock = threading.Lock()
+
+    def start(self, key, steps, keep=()):
+        """Warm up the dataset identified by key with steps [(name, label, fn)]; a run in progress is shared.
+
+        Steps fill caches as a side effect; only the results of the steps named in keep are stored.
+        Every start() should be matched by a cancel() when the caller moves on to another dataset."""
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None and run['state'] in ('queued', 'running'):
+                run['owners'] += 1
+                return key
+            if run is not None and run['state'] == 'done':
+                return key
+            run = {'state': 'queued', 'owners': 1, 'cancel': threading.Event(), 'steps': [name for name, _, _ in steps],
+                   'keep': set(keep), 'step': None, 'results': {}, 'errors': {}, 'timings': {}}
+            self._runs.put(key, run)
+            run['future'] = self._executor.submit(self._run, run, steps)
+        return key
+
+    def _run(self, run, steps):
+        run['state'] = 'running'
+        for name, label, fn in steps:
+            if run['cancel'].is_set():
+                run['state'] = 'cancelled'
+                return
+            run['step'] = label
+            started = time.perf_counter()
+            try:
+                result = fn()
+                if name in run['keep']:
+                    run['results'][name] = result
+            except Exception as e:
+                # A failed prediction only means that view computes on demand; keep warming the rest
+                run['errors'][name] = str(e)
+            run['timings'][name] = time.perf_counter() - started
+        run['step'] = None
+        run['state'] = 'done'
+
+    def cancel(self, key):
+        """Release the caller's interest in a warm-up; the run stops once no caller is left"""
+        if key is None:
+            return
+        with self._lock:
+            run = self._runs.get(key)
+            if run is None or run['state'] not in ('queued', 'running'):
+                return
+            run['owners'] -= 1
+            if run['owners'] > 0:
+                return
+            run['cancel'].set()
+            run['future'].cancel()
+            # A cancelled run is not worth keeping: the next start() begins afresh
+            self._runs.pop(key)
+
+    def result(self, key, name):
+        """Result of a finished step, or None"""
+        run = self._runs.get(key)
+        return None if run is None else run['results'].get(name)
+
+    def pending(self, key, name):
+        """True while a step of an active run has not finished yet"""
+        run = self._runs.get(key)
+        return (run is not None and run['state'] in ('queued', 'running')
+                and name in run['steps'] and name not in run['timings'])
+
+    def status(self, key):
+        """Return {'state': 'queued'|'running'|'done'|'missing', 'progress', 'message'[, 'timings', 'errors']}"""
+        run = self._runs.get(key)
+        if run is None:
+            return {'state': 'missing', 'progress': 0.0, 'message': "Not started"}
+        progress = len(run['timings']) / max(len(run['steps']), 1)
+        if run['state'] == 'done':
+            return {'state': 'done', 'progress': 1.0, 'message': "Ready",
+                    'timings': dict(run['timings']), 'errors': dict(run['errors'])}
+        return {'state': run['state'], 'progress': progress, 'message': run['step'] or "Queued"}
+
+
+# Shared service so sessions opening the same dataset share one warm-up
+warmup_service = WarmupService()